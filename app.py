@@ -3,28 +3,35 @@ MindMentor - AI-driven JEE Preparation System
 Main Application Entry Point
 """
 
+import importlib
+
 import streamlit as st
 from src.core.auth import SessionManager
-from src.pages.login import show_login_page
-from src.pages.register import show_registration_page
-from src.pages.dashboard import show_dashboard
-from src.pages.learn import main as show_learn_page
-from src.pages.quiz import main as show_quiz_page
-from src.pages.schedule import show_schedule_page
 
-# Initialize database on startup
-from src.data.init_db import init_database_silent
-from src.data.seed_jee_data import seed_jee_topics_silent
+from src.core.bootstrap import prepare_database, prewarm_llm
 
 # Ensure database is ready
 try:
-    if init_database_silent():
-        seed_jee_topics_silent()
+    prepare_database()
 except Exception as e:
     st.error(f"Database initialization error: {e}")
     st.stop()
 
 
+# Route name -> (page module, render function). Page modules are imported on
+# first visit only, so a rerun never pays for pages the user isn't viewing.
+PAGE_ROUTES = {
+    'login': ('src.pages.login', 'show_login_page'),
+    'register': ('src.pages.register', 'show_registration_page'),
+    'dashboard': ('src.pages.dashboard', 'show_dashboard'),
+    'learn': ('src.pages.learn', 'main'),
+    'quiz': ('src.pages.quiz', 'main'),
+    'schedule': ('src.pages.schedule', 'show_schedule_page'),
+}
+
+_PAGE_CACHE = {}
+
+
 # Page configuration
 st.set_page_config(
     page_title="MindMentor - JEE Preparation",
@@ -49,16 +56,22 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+SESSION_DEFAULTS = {
+    'show_login': True,
+    'authenticated': False,
+    'current_page': 'dashboard',
+}
+
+
 def init_session_state():
-    """Initialize session state variables"""
-    if 'show_login' not in st.session_state:
-        st.session_state.show_login = True
+    """Initialize session state variables (once per session)"""
+    if st.session_state.get('_init_done'):
+        return
     
-    if 'authenticated' not in st.session_state:
-        st.session_state.authenticated = False
+    for key, value in SESSION_DEFAULTS.items():
+        st.session_state.setdefault(key, value)
     
-    if 'current_page' not in st.session_state:
-        st.session_state.current_page = 'dashboard'
+    st.session_state._init_done = True
 
 
 def show_sidebar():
@@ -113,8 +126,24 @@ def show_sidebar():
             """)
 
 
+def render_page(route: str):
+    """Import (on first use) and render the page registered for a route"""
+    module_name, func_name = PAGE_ROUTES[route]
+    
+    mod = _PAGE_CACHE.get(route)
+    if mod is None:
+        mod = _PAGE_CACHE.setdefault(route, importlib.import_module(module_name))
+    
+    getattr(mod, func_name)()
+
+
 def main():
     """Main application logic"""
+    # Open the Gemini connection in the background while the page renders
+    # (after set_page_config). A missing API key is skipped by prewarm_llm
+    # and network errors are ignored on the prewarm thread.
+    prewarm_llm()
+    
     init_session_state()
     show_sidebar()
     
@@ -123,21 +152,17 @@ def main():
         # User is logged in - route to appropriate page
         current_page = st.session_state.get('current_page', 'dashboard')
         
-        if current_page == 'learn':
-            show_learn_page()
-        elif current_page == 'quiz':
-            show_quiz_page()
-        elif current_page == 'schedule':
-            show_schedule_page()
-        else:
-            show_dashboard()
+        if current_page not in PAGE_ROUTES or current_page in ('login', 'register'):
+            current_page = 'dashboard'
+        
+        render_page(current_page)
     
     else:
         # User is not logged in - show login or registration
         if st.session_state.show_login:
-            show_login_page()
+            render_page('login')
         else:
-            show_registration_page()
+            render_page('register')
 
 
 if __name__ == "__main__":
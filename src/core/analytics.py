@@ -4,24 +4,81 @@ Analytics Engine - Generate insights and statistics from student data
 
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import Counter, defaultdict, namedtuple
+import numpy as np
 from src.data.db import Database
 
 
+# Row returned by AnalyticsEngine.get_recent_activity
+Activity = namedtuple('Activity', ['timestamp', 'topic_name', 'subject', 'activity_type'])
+
+
+# Labels of the mastery buckets returned by Database.get_mastery_bucket_counts
+MASTERY_BUCKET_LABELS = (
+    'Beginner (0-30%)',
+    'Learning (30-60%)',
+    'Proficient (60-80%)',
+    'Mastered (80-100%)'
+)
+
+
+def _weight(row: Dict) -> float:
+    """Exam weight of a topic/profile row (1.0 when absent)"""
+    weight = row.get('exam_weight')
+    return 1.0 if weight is None else weight
+
+
+def _top_k_indices(scores: np.ndarray, k: int, descending: bool = False) -> np.ndarray:
+    """
+    Indices of the k smallest (or largest) scores, in sorted order
+    
+    Uses argpartition to avoid a full sort. Ties keep their original order,
+    matching a stable list.sort().
+    """
+    if k <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.intp)
+    
+    keys = -scores if descending else scores
+    
+    if k >= len(keys):
+        return np.argsort(keys, kind='stable')
+    
+    kth = keys[np.argpartition(keys, k - 1)[:k]].max()
+    
+    # Everything strictly before the k-th value, plus the earliest ties
+    before = np.flatnonzero(keys < kth)
+    ties = np.flatnonzero(keys == kth)[:k - len(before)]
+    selected = np.concatenate([before, ties])
+    
+    return selected[np.argsort(keys[selected], kind='stable')]
+
+
 class AnalyticsEngine:
     """Generate learning analytics and insights"""
     
     def __init__(self, db: Database):
         self.db = db
     
-    def get_learning_overview(self, user_id: int) -> Dict:
+    def get_profiles(self, user_id: int) -> List[Dict]:
+        """
+        Fetch all of a user's profiles once, for sharing between the
+        profile-based analytics methods via their ``profiles`` argument
+        """
+        return self.db.get_all_student_profiles(user_id)
+    
+    def get_learning_overview(self, user_id: int, profiles: Optional[List[Dict]] = None) -> Dict:
         """
         Get comprehensive learning overview
         
+        Args:
+            user_id: User ID
+            profiles: Pre-fetched profiles from get_profiles() (fetched if None)
+        
         Returns:
             Dictionary with overview statistics
         """
-        profiles = self.db.get_all_student_profiles(user_id)
+        if profiles is None:
+            profiles = self.get_profiles(user_id)
         
         if not profiles:
             return {
@@ -36,19 +93,26 @@ class AnalyticsEngine:
                 'average_topics_count': 0
             }
         
-        # Calculate statistics
+        # Count strength levels in C, then sum the numeric fields in one pass
+        levels = Counter(p.get('strength_level') for p in profiles)
+        topics_mastered = levels['MASTERED']
+        strong_count = levels['STRONG'] + levels['MASTERED']
+        weak_count = levels['WEAK']
+        average_count = levels['AVERAGE']
+        
+        mastery_sum = 0
+        total_attempts = 0
+        total_correct = 0
+        
+        for p in profiles:
+            mastery_sum += p['mastery_score']
+            total_attempts += p['total_attempts']
+            total_correct += p['correct_attempts']
+        
         topics_started = len(profiles)
-        topics_mastered = len([p for p in profiles if p.get('strength_level') == 'MASTERED'])
-        avg_mastery = sum(p['mastery_score'] for p in profiles) / len(profiles)
-        total_attempts = sum(p['total_attempts'] for p in profiles)
-        total_correct = sum(p['correct_attempts'] for p in profiles)
+        avg_mastery = mastery_sum / topics_started
         overall_accuracy = (total_correct / total_attempts * 100) if total_attempts > 0 else 0
         
-        # Count by strength level
-        strong_count = len([p for p in profiles if p.get('strength_level') in ['STRONG', 'MASTERED']])
-        weak_count = len([p for p in profiles if p.get('strength_level') == 'WEAK'])
-        average_count = len([p for p in profiles if p.get('strength_level') == 'AVERAGE'])
-        
         return {
             'topics_started': topics_started,
             'topics_mastered': topics_mastered,
@@ -61,22 +125,28 @@ class AnalyticsEngine:
             'average_topics_count': average_count
         }
     
-    def get_subject_breakdown(self, user_id: int) -> Dict[str, Dict]:
+    def get_subject_breakdown(self, user_id: int, profiles: Optional[List[Dict]] = None) -> Dict[str, Dict]:
         """
         Get statistics broken down by subject
         
+        Args:
+            user_id: User ID
+            profiles: Pre-fetched profiles from get_profiles() (fetched if None)
+        
         Returns:
             Dictionary with subject-wise statistics
         """
-        profiles = self.db.get_all_student_profiles(user_id)
+        if profiles is None:
+            profiles = self.get_profiles(user_id)
         
         subjects = {}
         
         for profile in profiles:
             subject = profile.get('subject', 'Unknown')
             
-            if subject not in subjects:
-                subjects[subject] = {
+            data = subjects.get(subject)
+            if data is None:
+                data = subjects[subject] = {
                     'topics_started': 0,
                     'topics_mastered': 0,
                     'total_mastery': 0,
@@ -84,21 +154,16 @@ class AnalyticsEngine:
                     'correct_attempts': 0
                 }
             
-            subjects[subject]['topics_started'] += 1
+            data['topics_started'] += 1
             if profile.get('strength_level') == 'MASTERED':
-                subjects[subject]['topics_mastered'] += 1
-            subjects[subject]['total_mastery'] += profile['mastery_score']
-            subjects[subject]['total_attempts'] += profile['total_attempts']
-            subjects[subject]['correct_attempts'] += profile['correct_attempts']
-        
-        # Calculate averages
-        for subject in subjects:
-            data = subjects[subject]
-            if data['topics_started'] > 0:
-                data['average_mastery'] = data['total_mastery'] / data['topics_started']
-            else:
-                data['average_mastery'] = 0
+                data['topics_mastered'] += 1
+            data['total_mastery'] += profile['mastery_score']
+            data['total_attempts'] += profile['total_attempts']
+            data['correct_attempts'] += profile['correct_attempts']
             
+            # Keep derived averages current as we go (every entry has
+            # topics_started >= 1), so no second pass is needed
+            data['average_mastery'] = data['total_mastery'] / data['topics_started']
             if data['total_attempts'] > 0:
                 data['accuracy'] = data['correct_attempts'] / data['total_attempts'] * 100
             else:
@@ -108,25 +173,13 @@ class AnalyticsEngine:
     
     def get_weak_topics(self, user_id: int, limit: int = 10) -> List[Dict]:
         """Get topics that need attention"""
-        profiles = self.db.get_all_student_profiles(user_id)
-        
-        # Sort by mastery score (ascending) and filter weak topics
-        weak = [p for p in profiles if p['mastery_score'] < 0.6]
-        weak.sort(key=lambda x: x['mastery_score'])
-        
-        return weak[:limit]
+        return self.db.get_weak_profiles(user_id, threshold=0.6, limit=limit)
     
     def get_strong_topics(self, user_id: int, limit: int = 10) -> List[Dict]:
         """Get topics where student is strong"""
-        profiles = self.db.get_all_student_profiles(user_id)
-        
-        # Sort by mastery score (descending) and filter strong topics
-        strong = [p for p in profiles if p['mastery_score'] >= 0.6]
-        strong.sort(key=lambda x: x['mastery_score'], reverse=True)
-        
-        return strong[:limit]
+        return self.db.get_strong_profiles(user_id, threshold=0.6, limit=limit)
     
-    def get_recent_activity(self, user_id: int, days: int = 7) -> List[Dict]:
+    def get_recent_activity(self, user_id: int, days: int = 7) -> List[Activity]:
         """
         Get recent learning activity
         
@@ -135,9 +188,9 @@ class AnalyticsEngine:
             days: Number of days to look back
             
         Returns:
-            List of recent activities
+            List of Activity tuples (timestamp, topic_name, subject, activity_type)
         """
-        with self.db.get_connection() as conn:
+        with self.db.get_read_connection() as conn:
             cursor = conn.cursor()
             
             cutoff_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
@@ -158,11 +211,7 @@ class AnalyticsEngine:
                 LIMIT 20
             """, (user_id, cutoff_date))
             
-            activities = []
-            for row in cursor.fetchall():
-                activities.append(dict(row))
-            
-            return activities
+            return [Activity(*row) for row in cursor.fetchall()]
     
     def get_study_streak(self, user_id: int) -> Dict:
         """
@@ -171,53 +220,50 @@ class AnalyticsEngine:
         Returns:
             Dictionary with current streak and longest streak
         """
-        with self.db.get_connection() as conn:
+        # Gaps-and-islands: consecutive days share the same
+        # julianday(day) - row_number value, so each group is one run.
+        # "today" is bound from Python so it follows local time, like the
+        # timestamps written by the learn page.
+        today = datetime.now().date().isoformat()
+        
+        with self.db.get_read_connection() as conn:
             cursor = conn.cursor()
-            
-            # Get all unique study dates from chat history
             cursor.execute("""
-                SELECT DISTINCT DATE(timestamp) as study_date
-                FROM chat_history
-                WHERE user_id = ?
-                ORDER BY study_date DESC
-            """, (user_id,))
+                WITH days AS (
+                    SELECT DATE(timestamp) AS study_date
+                    FROM chat_history
+                    WHERE user_id = ? AND DATE(timestamp) IS NOT NULL
+                    GROUP BY study_date
+                ),
+                grouped AS (
+                    SELECT study_date,
+                           julianday(study_date) - ROW_NUMBER() OVER (ORDER BY study_date) AS grp
+                    FROM days
+                ),
+                runs AS (
+                    SELECT COUNT(*) AS length, MAX(study_date) AS last_day
+                    FROM grouped
+                    GROUP BY grp
+                )
+                SELECT
+                    MAX(length) AS longest_streak,
+                    MAX(last_day) AS last_study_date,
+                    COALESCE((
+                        SELECT length FROM runs
+                        WHERE last_day = ? AND last_day = (SELECT MAX(last_day) FROM runs)
+                    ), 0) AS current_streak
+                FROM runs
+            """, (user_id, today))
             
-            dates = [row['study_date'] for row in cursor.fetchall()]
+            row = cursor.fetchone()
             
-            if not dates:
+            if not row or row['last_study_date'] is None:
                 return {'current_streak': 0, 'longest_streak': 0, 'last_study_date': None}
             
-            # Calculate current streak
-            current_streak = 0
-            today = datetime.now().date()
-            
-            for i, date_str in enumerate(dates):
-                date = datetime.strptime(date_str, '%Y-%m-%d').date()
-                expected_date = today - timedelta(days=i)
-                
-                if date == expected_date:
-                    current_streak += 1
-                else:
-                    break
-            
-            # Calculate longest streak
-            longest_streak = 1
-            current_run = 1
-            
-            for i in range(1, len(dates)):
-                prev_date = datetime.strptime(dates[i-1], '%Y-%m-%d').date()
-                curr_date = datetime.strptime(dates[i], '%Y-%m-%d').date()
-                
-                if (prev_date - curr_date).days == 1:
-                    current_run += 1
-                    longest_streak = max(longest_streak, current_run)
-                else:
-                    current_run = 1
-            
             return {
-                'current_streak': current_streak,
-                'longest_streak': longest_streak,
-                'last_study_date': dates[0] if dates else None
+                'current_streak': row['current_streak'],
+                'longest_streak': row['longest_streak'],
+                'last_study_date': row['last_study_date']
             }
     
     def get_mastery_distribution(self, user_id: int) -> Dict[str, int]:
@@ -227,36 +273,23 @@ class AnalyticsEngine:
         Returns:
             Dictionary with counts by mastery range
         """
-        profiles = self.db.get_all_student_profiles(user_id)
-        
-        distribution = {
-            'Beginner (0-30%)': 0,
-            'Learning (30-60%)': 0,
-            'Proficient (60-80%)': 0,
-            'Mastered (80-100%)': 0
-        }
+        counts = self.db.get_mastery_bucket_counts(user_id)
         
-        for profile in profiles:
-            mastery = profile['mastery_score'] * 100
-            
-            if mastery < 30:
-                distribution['Beginner (0-30%)'] += 1
-            elif mastery < 60:
-                distribution['Learning (30-60%)'] += 1
-            elif mastery < 80:
-                distribution['Proficient (60-80%)'] += 1
-            else:
-                distribution['Mastered (80-100%)'] += 1
-        
-        return distribution
+        return {label: counts.get(bucket, 0) for bucket, label in enumerate(MASTERY_BUCKET_LABELS)}
     
-    def get_topic_recommendations(self, user_id: int, limit: int = 5) -> List[Dict]:
+    def get_topic_recommendations(self, user_id: int, limit: int = 5,
+                                  profiles: Optional[List[Dict]] = None) -> List[Dict]:
         """
         Recommend topics to study next based on:
         - JEE importance (exam_weight)
         - Current weakness (low mastery)
         - Not yet started topics
         
+        Args:
+            user_id: User ID
+            limit: Maximum number of recommendations
+            profiles: Pre-fetched profiles from get_profiles() (fetched if None)
+        
         Returns:
             List of recommended topics with reasons
         """
@@ -264,34 +297,52 @@ class AnalyticsEngine:
         all_topics = self.db.get_all_topics()
         
         # Get user's profiles
-        profiles = self.db.get_all_student_profiles(user_id)
+        if profiles is None:
+            profiles = self.get_profiles(user_id)
         studied_topic_ids = {p['topic_id'] for p in profiles}
         
-        # Get weak topics (already started but need work)
-        weak_topics = []
-        for profile in profiles:
-            if profile['mastery_score'] < 0.5:  # Weak threshold
-                topic = self.db.get_topic_by_id(profile['topic_id'])
-                if topic:
-                    weak_topics.append({
-                        'topic': topic,
-                        'reason': f"Low mastery ({profile['mastery_score']*100:.0f}%)",
-                        'priority': profile.get('exam_weight', 1.0) * (1 - profile['mastery_score'])
-                    })
+        # Candidates: weak topics (already started but need work) followed
+        # by unstudied topics
+        weak_profiles = [p for p in profiles if p['mastery_score'] < 0.5]  # Weak threshold
+        topic_map = self.db.get_topics_by_ids(p['topic_id'] for p in weak_profiles)
+        weak_profiles = [p for p in weak_profiles if p['topic_id'] in topic_map]
+        unstudied = [t for t in all_topics if t['id'] not in studied_topic_ids]
+        
+        n_weak = len(weak_profiles)
+        if n_weak + len(unstudied) == 0:
+            return []
+        
+        # Priorities: weight * (1 - mastery) for weak topics, exam weight
+        # for unstudied ones, computed as one array
+        weights = np.fromiter(
+            (_weight(p) for p in weak_profiles),
+            dtype=np.float64, count=n_weak
+        )
+        mastery = np.fromiter(
+            (p['mastery_score'] for p in weak_profiles),
+            dtype=np.float64, count=n_weak
+        )
+        unstudied_weights = np.fromiter(
+            (_weight(t) for t in unstudied),
+            dtype=np.float64, count=len(unstudied)
+        )
+        priorities = np.concatenate([weights * (1 - mastery), unstudied_weights])
         
-        # Get high-priority unstudied topics
-        unstudied = []
-        for topic in all_topics:
-            if topic['id'] not in studied_topic_ids:
-                priority = topic.get('exam_weight', 1.0)
-                unstudied.append({
-                    'topic': topic,
+        # Highest priorities first; ties keep weak-before-unstudied order
+        recommendations = []
+        for i in _top_k_indices(priorities, limit, descending=True):
+            if i < n_weak:
+                profile = weak_profiles[i]
+                recommendations.append({
+                    'topic': topic_map[profile['topic_id']],
+                    'reason': f"Low mastery ({profile['mastery_score']*100:.0f}%)",
+                    'priority': float(priorities[i])
+                })
+            else:
+                recommendations.append({
+                    'topic': unstudied[i - n_weak],
                     'reason': "Not started yet - High JEE importance",
-                    'priority': priority
+                    'priority': float(priorities[i])
                 })
         
-        # Combine and sort by priority
-        recommendations = weak_topics + unstudied
-        recommendations.sort(key=lambda x: x['priority'], reverse=True)
-        
-        return recommendations[:limit]
+        return recommendations
@@ -4,25 +4,80 @@ Handles user registration, login, and password management
 """
 
 import bcrypt
+import re
+import secrets
+import time
 from typing import Optional, Dict, Tuple
 from datetime import datetime
 
 
+# Same rules as the original str checks, in one regex pass each:
+# usernames are all letters/digits (str.isalnum) or contain an underscore,
+# and emails contain both '@' and '.'
+_USERNAME_CHARS_RE = re.compile(r'[^\W_]+\Z|.*_', re.DOTALL)
+_EMAIL_RE = re.compile(r'(?=.*@).*\.', re.DOTALL)
+
+
 class AuthService:
     """Service for authentication operations"""
     
+    # bcrypt cost bounds for calibration; the floor is bcrypt's default
+    # cost, so calibration can only make hashes stronger
+    MIN_BCRYPT_ROUNDS = 12
+    MAX_BCRYPT_ROUNDS = 14
+    TARGET_HASH_MS = 100
+    
+    # Calibrated cost, computed on first use
+    _bcrypt_rounds: Optional[int] = None
+    
+    @classmethod
+    def calibrate_rounds(cls, target_ms: float = None) -> int:
+        """
+        Find the bcrypt cost whose hash time is closest to the target
+        without exceeding it, but never below MIN_BCRYPT_ROUNDS
+        
+        Each extra round doubles the work, so one timed hash at the
+        minimum cost is enough to extrapolate.
+        
+        Args:
+            target_ms: Target hashing time in milliseconds
+            
+        Returns:
+            Number of bcrypt rounds (also stored for later hash_password calls)
+        """
+        if target_ms is None:
+            target_ms = cls.TARGET_HASH_MS
+        
+        rounds = cls.MIN_BCRYPT_ROUNDS
+        start = time.perf_counter()
+        bcrypt.hashpw(b'calibration', bcrypt.gensalt(rounds))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        while rounds < cls.MAX_BCRYPT_ROUNDS and elapsed_ms * 2 <= target_ms:
+            rounds += 1
+            elapsed_ms *= 2
+        
+        cls._bcrypt_rounds = rounds
+        return rounds
+    
     @staticmethod
-    def hash_password(password: str) -> str:
+    def hash_password(password: str, rounds: Optional[int] = None) -> str:
         """
         Hash a password using bcrypt
         
         Args:
             password: Plain text password
+            rounds: bcrypt cost factor (default: calibrated for this machine;
+                never below MIN_BCRYPT_ROUNDS)
             
         Returns:
             Hashed password as string
         """
-        salt = bcrypt.gensalt()
+        if rounds is None:
+            rounds = AuthService._bcrypt_rounds or AuthService.calibrate_rounds()
+        rounds = max(rounds, AuthService.MIN_BCRYPT_ROUNDS)
+        
+        salt = bcrypt.gensalt(rounds)
         hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
         return hashed.decode('utf-8')
     
@@ -39,10 +94,7 @@ class AuthService:
             True if password matches, False otherwise
         """
         try:
-            return bcrypt.checkpw(
-                password.encode('utf-8'),
-                hashed_password.encode('utf-8')
-            )
+            return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
         except Exception:
             return False
     
@@ -86,7 +138,7 @@ class AuthService:
         if len(username) > 50:
             return False, "Username must be less than 50 characters"
         
-        if not username.isalnum() and '_' not in username:
+        if not _USERNAME_CHARS_RE.match(username):
             return False, "Username can only contain letters, numbers, and underscores"
         
         if not username[0].isalpha():
@@ -108,7 +160,7 @@ class AuthService:
         if not email:
             return True, ""  # Email is optional
         
-        if '@' not in email or '.' not in email:
+        if not _EMAIL_RE.match(email):
             return False, "Invalid email format"
         
         if len(email) > 255:
@@ -118,7 +170,14 @@ class AuthService:
 
 
 class SessionManager:
-    """Manage user sessions in Streamlit"""
+    """
+    Manage user sessions in Streamlit
+    
+    Invariant: bcrypt runs only in AuthService.verify_password, called once
+    by the login page. Session checks (is_authenticated/require_auth) run on
+    every rerun and must stay O(1) session-state lookups - never add
+    password or hash verification to them.
+    """
     
     @staticmethod
     def create_session(session_state, user_data: Dict):
@@ -135,6 +194,10 @@ class SessionManager:
         session_state.user_name = user_data['name']
         session_state.exam_target = user_data.get('exam_target')
         session_state.login_time = datetime.now()
+        
+        # Random session token issued after the one-time bcrypt check;
+        # later checks only test for its presence
+        session_state.auth_token = secrets.token_urlsafe(32)
     
     @staticmethod
     def clear_session(session_state):
@@ -145,7 +208,7 @@ class SessionManager:
             session_state: Streamlit session state
         """
         for key in ['authenticated', 'user_id', 'username', 'user_name', 
-                    'exam_target', 'login_time']:
+                    'exam_target', 'login_time', 'auth_token']:
             if key in session_state:
                 del session_state[key]
     
@@ -160,7 +223,8 @@ class SessionManager:
         Returns:
             True if authenticated, False otherwise
         """
-        return getattr(session_state, 'authenticated', False)
+        return (getattr(session_state, 'authenticated', False)
+                and getattr(session_state, 'auth_token', None) is not None)
     
     @staticmethod
     def get_user_id(session_state) -> Optional[int]:
@@ -187,5 +251,7 @@ class SessionManager:
         Raises:
             Exception: If user is not authenticated
         """
-        if not SessionManager.is_authenticated(session_state):
-            raise Exception("Authentication required")
+        if SessionManager.is_authenticated(session_state):
+            return
+        
+        raise Exception("Authentication required")
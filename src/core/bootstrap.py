@@ -0,0 +1,77 @@
+"""
+Shared service instances for Streamlit pages
+Cached with st.cache_resource so they survive script reruns
+"""
+
+import streamlit as st
+from src.data.db import Database
+from src.data.init_db import get_db_path, init_database_silent
+from src.data.seed_jee_data import seed_jee_topics_silent
+from src.data.tuning import open_connection
+from src.core.analytics import AnalyticsEngine
+
+
+@st.cache_resource(show_spinner=False)
+def prepare_database() -> bool:
+    """
+    Create or upgrade the database and seed the syllabus, once per server
+    process
+    
+    Both steps share one tuned connection, so a cold start opens the
+    database file once. A failure raises (and is not cached), so the next
+    rerun tries again.
+    
+    Returns:
+        True once the database is ready
+    """
+    db_path = get_db_path()
+    conn = open_connection(db_path)
+    try:
+        if not (init_database_silent(db_path, conn=conn)
+                and seed_jee_topics_silent(db_path, conn=conn)):
+            raise RuntimeError(f"Could not initialize the database at {db_path}")
+    finally:
+        conn.close()
+    return True
+
+
+@st.cache_resource(show_spinner=False)
+def get_db() -> Database:
+    """
+    Get the process-wide Database instance
+    
+    Its connection pool and WAL setup are created once per server
+    process instead of on every rerun.
+    """
+    return Database()
+
+
+@st.cache_resource(show_spinner=False)
+def get_analytics(_db: Database) -> AnalyticsEngine:
+    """
+    Get the AnalyticsEngine bound to a Database
+    
+    Args:
+        _db: Database instance (underscore: excluded from the cache key)
+    """
+    return AnalyticsEngine(_db)
+
+
+@st.cache_resource(show_spinner=False)
+def prewarm_llm() -> bool:
+    """
+    Warm the Gemini connection pool once per server process
+    
+    The client module is imported here rather than at the top so pages that
+    never call the LLM (and deployments without an API key) don't load it.
+    
+    Returns:
+        True if a prewarm was started
+    """
+    try:
+        from src.llm.client import gemini_client
+    except ValueError:  # No API key configured
+        return False
+    
+    gemini_client.prewarm(background=True)
+    return True
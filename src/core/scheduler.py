@@ -3,14 +3,60 @@ Study Scheduler - Generates personalized study schedules using SM-2 spaced repet
 """
 
 from datetime import datetime, timedelta, date
+import threading
+from pathlib import Path
 from typing import List, Dict, Optional, Tuple
-import json
 from dataclasses import dataclass
+import numpy as np
 
 from src.data.db import Database
+from src.core.sm2_numba import sm2_batch
+from src.utils import fastjson
 
 
-@dataclass
+# Study preferences by (database file, user id); see StudyScheduler.invalidate_user
+_user_info_cache: Dict[Tuple[str, int], Dict] = {}
+_user_info_lock = threading.Lock()
+USER_INFO_CACHE_SIZE = 1024
+
+
+def _user_info_key(db_path, user_id: int) -> Tuple[str, int]:
+    return (str(Path(db_path).resolve()), user_id)
+
+
+def _load_user_info(db: Database, user_id: int) -> Dict:
+    """Load a user's study preferences (cached; see StudyScheduler.invalidate_user)"""
+    key = _user_info_key(db.db_path, user_id)
+    with _user_info_lock:
+        info = _user_info_cache.get(key)
+    if info is not None:
+        return info
+    
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT daily_hours, exam_target FROM users WHERE id = ?",
+            (user_id,)
+        )
+        user = cursor.fetchone()
+    
+    if user:
+        info = {
+            'daily_hours': user['daily_hours'] or 4.0,
+            'exam_target': user['exam_target'] or 'BOTH'
+        }
+    else:
+        info = {'daily_hours': 4.0, 'exam_target': 'BOTH'}
+    
+    with _user_info_lock:
+        if len(_user_info_cache) >= USER_INFO_CACHE_SIZE:
+            # Evict the oldest entry (dicts keep insertion order)
+            del _user_info_cache[next(iter(_user_info_cache))]
+        _user_info_cache[key] = info
+    return info
+
+
+@dataclass(slots=True)
 class ScheduledItem:
     """Represents a single scheduled study item"""
     topic_id: int
@@ -23,7 +69,7 @@ class ScheduledItem:
     reason: str  # Why this topic is scheduled
 
 
-@dataclass
+@dataclass(slots=True)
 class DailySchedule:
     """Represents a complete day's schedule"""
     date: date
@@ -46,6 +92,9 @@ class StudyScheduler:
     DEFAULT_EASE_FACTOR = 2.5
     MIN_EASE_FACTOR = 1.3
     
+    # Subjects scheduled when no focus subjects are given
+    ALL_SUBJECTS = ('Physics', 'Chemistry', 'Mathematics')
+    
     # Activity durations (in minutes)
     LEARN_DURATION = 60  # New topic learning
     REVISE_DURATION = 30  # Revision of learned topic
@@ -54,25 +103,47 @@ class StudyScheduler:
     def __init__(self, db: Database, user_id: int):
         self.db = db
         self.user_id = user_id
+        
+        # Hold one connection for the scheduler's lifetime instead of
+        # entering get_connection() in every method; call close() when done
+        self._conn_ctx = db.get_connection()
+        self._conn = self._conn_ctx.__enter__()
+        self._conn.create_function("sm2_interval", 3, self.sm2_interval, deterministic=True)
+        
         self.user_info = self._get_user_info()
         self.daily_minutes = int((self.user_info.get('daily_hours') or 4) * 60)
     
+    def close(self):
+        """Release the scheduler's database connection"""
+        if self._conn_ctx is not None:
+            self._conn_ctx.__exit__(None, None, None)
+            self._conn_ctx = None
+            self._conn = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
     def _get_user_info(self) -> Dict:
         """Get user's study preferences and constraints"""
-        with self.db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT daily_hours, exam_target FROM users WHERE id = ?",
-                (self.user_id,)
-            )
-            user = cursor.fetchone()
-            
-            if user:
-                return {
-                    'daily_hours': user['daily_hours'] or 4.0,
-                    'exam_target': user['exam_target'] or 'BOTH'
-                }
-            return {'daily_hours': 4.0, 'exam_target': 'BOTH'}
+        return dict(_load_user_info(self.db, self.user_id))
+    
+    @staticmethod
+    def invalidate_user(db_path, user_id: int) -> None:
+        """
+        Drop a user's cached study preferences after their profile changes
+        
+        Registered with Database.add_profile_listener(), so it runs after
+        every Database.update_user_profile() call.
+        
+        Args:
+            db_path: Path of the database the profile lives in
+            user_id: User whose profile changed
+        """
+        with _user_info_lock:
+            _user_info_cache.pop(_user_info_key(db_path, user_id), None)
     
     def generate_schedule(
         self,
@@ -91,12 +162,22 @@ class StudyScheduler:
         Returns:
             List of DailySchedule objects
         """
+        if num_days <= 0:
+            return []
+        
+        end_date = start_date + timedelta(days=num_days - 1)
+        
+        # Fetch every candidate for the whole range up front and pick per
+        # day in Python, instead of querying three times per day
+        candidates = self._fetch_all_candidates(end_date, focus_subjects)
+        existing_schedules = self._get_existing_schedules(start_date, end_date)
+        
         schedules = []
         scheduled_topic_ids = set()  # Track topics already scheduled this week
         
         for day_offset in range(num_days):
             current_date = start_date + timedelta(days=day_offset)
-            daily_items = self._generate_daily_items(current_date, focus_subjects, scheduled_topic_ids)
+            daily_items = self._generate_daily_items(current_date, candidates, scheduled_topic_ids)
             
             # Add newly scheduled topic IDs to the set
             for item in daily_items:
@@ -106,7 +187,7 @@ class StudyScheduler:
             total_time = sum(item.duration_minutes for item in daily_items)
             
             # Get existing schedule if any
-            existing = self._get_existing_schedule(current_date)
+            existing = existing_schedules.get(current_date.isoformat())
             completion = existing.get('completion_percentage', 0.0) if existing else 0.0
             notes = existing.get('notes', '') if existing else ''
             
@@ -123,10 +204,17 @@ class StudyScheduler:
     def _generate_daily_items(
         self,
         schedule_date: date,
-        focus_subjects: Optional[List[str]] = None,
+        candidates: Dict[str, List[Dict]],
         exclude_topic_ids: Optional[set] = None
     ) -> List[ScheduledItem]:
-        """Generate study items for a single day"""
+        """
+        Generate study items for a single day
+        
+        Args:
+            schedule_date: Date being scheduled
+            candidates: Candidate rows from _fetch_all_candidates()
+            exclude_topic_ids: Topics already scheduled on earlier days
+        """
         items = []
         remaining_minutes = self.daily_minutes
         
@@ -134,60 +222,69 @@ class StudyScheduler:
             exclude_topic_ids = set()
         
         # 1. Get items due for revision (SM-2 based)
-        revision_items = self._get_revision_due_topics(schedule_date, focus_subjects, exclude_topic_ids)
-        for item in revision_items:
+        due_by = schedule_date.isoformat()
+        revision_rows = [
+            row for row in candidates['revise']
+            if row['next_review_date'] <= due_by and row['topic_id'] not in exclude_topic_ids
+        ][:5]
+        for row in revision_rows:
             if remaining_minutes >= self.REVISE_DURATION:
-                items.append(item)
-                remaining_minutes -= item.duration_minutes
+                items.append(self._make_revision_item(row))
+                remaining_minutes -= self.REVISE_DURATION
         
         # 2. Get weak topics that need practice
         if remaining_minutes >= self.PRACTICE_DURATION:
-            practice_items = self._get_practice_topics(focus_subjects, exclude_topic_ids, limit=2)
-            for item in practice_items:
+            practice_rows = self._take(candidates['practice'], exclude_topic_ids, limit=2)
+            for row in practice_rows:
                 if remaining_minutes >= self.PRACTICE_DURATION:
-                    items.append(item)
-                    remaining_minutes -= item.duration_minutes
+                    items.append(self._make_practice_item(row))
+                    remaining_minutes -= self.PRACTICE_DURATION
         
         # 3. Add new topics to learn (prioritized by JEE weight)
         if remaining_minutes >= self.LEARN_DURATION:
-            learn_items = self._get_new_topics_to_learn(focus_subjects, exclude_topic_ids, limit=3)
-            for item in learn_items:
+            learn_rows = self._take(candidates['learn'], exclude_topic_ids, limit=3)
+            for row in learn_rows:
                 if remaining_minutes >= self.LEARN_DURATION:
-                    items.append(item)
-                    remaining_minutes -= item.duration_minutes
-        
-        # Sort by priority (revision > practice > new learning)
-        priority_order = {'revise': 3, 'practice': 2, 'learn': 1}
-        items.sort(key=lambda x: priority_order.get(x.activity_type, 0), reverse=True)
+                    items.append(self._make_learn_item(row))
+                    remaining_minutes -= self.LEARN_DURATION
         
+        # Items are appended in priority order (revision > practice > new
+        # learning), so no sort is needed
         return items
     
-    def _get_revision_due_topics(
+    @staticmethod
+    def _take(rows: List[Dict], exclude_topic_ids: set, limit: int) -> List[Dict]:
+        """First `limit` rows whose topic is not excluded"""
+        taken = []
+        for row in rows:
+            if row['topic_id'] not in exclude_topic_ids:
+                taken.append(row)
+                if len(taken) == limit:
+                    break
+        return taken
+    
+    def _fetch_all_candidates(
         self,
-        schedule_date: date,
-        focus_subjects: Optional[List[str]] = None,
-        exclude_topic_ids: Optional[set] = None
-    ) -> List[ScheduledItem]:
-        """Get topics due for revision using SM-2 algorithm"""
-        if exclude_topic_ids is None:
-            exclude_topic_ids = set()
-            
-        subject_filter = ""
-        params = [self.user_id, schedule_date.isoformat()]
-        
-        if focus_subjects:
-            placeholders = ','.join('?' * len(focus_subjects))
-            subject_filter = f"AND t.subject IN ({placeholders})"
-            params.extend(focus_subjects)
-        
-        # Add exclusion filter for already scheduled topics
-        exclude_filter = ""
-        if exclude_topic_ids:
-            placeholders = ','.join('?' * len(exclude_topic_ids))
-            exclude_filter = f"AND sp.topic_id NOT IN ({placeholders})"
-            params.extend(list(exclude_topic_ids))
-        
-        query = f"""
+        end_date: date,
+        focus_subjects: Optional[List[str]] = None
+    ) -> Dict[str, List[Dict]]:
+        """
+        Fetch revision, practice and new-topic candidates for a date range
+        
+        Each list is in the order the per-day selection uses. Revision
+        candidates include everything due by end_date; callers filter by
+        next_review_date for each day.
+        
+        Returns:
+            Dictionary with 'revise', 'practice' and 'learn' row lists
+        """
+        # The subject filter is bound as one JSON array and exposed to each
+        # query as the same "focus" CTE, so the SQL text never changes and
+        # sqlite3's statement cache hits
+        subjects_json = fastjson.dumps(list(focus_subjects or self.ALL_SUBJECTS))
+        
+        revision_query = """
+            WITH focus(subject) AS (SELECT value FROM json_each(?))
             SELECT 
                 sp.topic_id,
                 t.topic_name,
@@ -202,60 +299,12 @@ class StudyScheduler:
             WHERE sp.user_id = ?
                 AND sp.next_review_date <= ?
                 AND sp.mastery_score < 1.0
-                {subject_filter}
-                {exclude_filter}
-            ORDER BY sp.next_review_date ASC, t.exam_weight DESC
-            LIMIT 5
+                AND t.subject IN focus
+            ORDER BY sp.next_review_date ASC, t.exam_weight DESC, t.id
         """
         
-        with self.db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, tuple(params))
-            topics = [dict(row) for row in cursor.fetchall()]
-        
-        items = []
-        for topic in topics:
-            items.append(ScheduledItem(
-                topic_id=topic['topic_id'],
-                topic_name=topic['topic_name'],
-                subject=topic['subject'],
-                activity_type='revise',
-                duration_minutes=self.REVISE_DURATION,
-                priority=3.0 + topic['exam_weight'],  # Highest priority
-                difficulty=topic['difficulty_level'],
-                reason=f"Due for revision (Mastery: {int(topic['mastery_score']*100)}%)"
-            ))
-        
-        return items
-    
-    def _get_practice_topics(
-        self,
-        focus_subjects: Optional[List[str]] = None,
-        exclude_topic_ids: Optional[set] = None,
-        limit: int = 2
-    ) -> List[ScheduledItem]:
-        """Get weak topics that need more practice"""
-        if exclude_topic_ids is None:
-            exclude_topic_ids = set()
-            
-        subject_filter = ""
-        params = [self.user_id, 0.6]  # Mastery < 60% = needs practice
-        
-        if focus_subjects:
-            placeholders = ','.join('?' * len(focus_subjects))
-            subject_filter = f"AND t.subject IN ({placeholders})"
-            params.extend(focus_subjects)
-        
-        # Add exclusion filter for already scheduled topics
-        exclude_filter = ""
-        if exclude_topic_ids:
-            placeholders = ','.join('?' * len(exclude_topic_ids))
-            exclude_filter = f"AND sp.topic_id NOT IN ({placeholders})"
-            params.extend(list(exclude_topic_ids))
-        
-        params.append(limit)
-        
-        query = f"""
+        practice_query = """
+            WITH focus(subject) AS (SELECT value FROM json_each(?))
             SELECT 
                 sp.topic_id,
                 t.topic_name,
@@ -269,60 +318,12 @@ class StudyScheduler:
             WHERE sp.user_id = ?
                 AND sp.mastery_score < ?
                 AND sp.mastery_score > 0
-                {subject_filter}
-                {exclude_filter}
-            ORDER BY sp.mastery_score ASC, t.exam_weight DESC
-            LIMIT ?
+                AND t.subject IN focus
+            ORDER BY sp.mastery_score ASC, t.exam_weight DESC, t.id
         """
         
-        with self.db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, tuple(params))
-            topics = [dict(row) for row in cursor.fetchall()]
-        
-        items = []
-        for topic in topics:
-            items.append(ScheduledItem(
-                topic_id=topic['topic_id'],
-                topic_name=topic['topic_name'],
-                subject=topic['subject'],
-                activity_type='practice',
-                duration_minutes=self.PRACTICE_DURATION,
-                priority=2.0 + topic['exam_weight'],
-                difficulty=topic['difficulty_level'],
-                reason=f"Weak area (Mastery: {int(topic['mastery_score']*100)}%, Accuracy: {int(topic['accuracy']*100)}%)"
-            ))
-        
-        return items
-    
-    def _get_new_topics_to_learn(
-        self,
-        focus_subjects: Optional[List[str]] = None,
-        exclude_topic_ids: Optional[set] = None,
-        limit: int = 3
-    ) -> List[ScheduledItem]:
-        """Get new topics to learn, prioritized by JEE exam weight"""
-        if exclude_topic_ids is None:
-            exclude_topic_ids = set()
-            
-        subject_filter = ""
-        params = [self.user_id]
-        
-        if focus_subjects:
-            placeholders = ','.join('?' * len(focus_subjects))
-            subject_filter = f"AND t.subject IN ({placeholders})"
-            params.extend(focus_subjects)
-        
-        # Add exclusion filter for already scheduled topics
-        exclude_filter = ""
-        if exclude_topic_ids:
-            placeholders = ','.join('?' * len(exclude_topic_ids))
-            exclude_filter = f"AND t.id NOT IN ({placeholders})"
-            params.extend(list(exclude_topic_ids))
-        
-        params.append(limit)
-        
-        query = f"""
+        learn_query = """
+            WITH focus(subject) AS (SELECT value FROM json_each(?))
             SELECT 
                 t.id as topic_id,
                 t.topic_name,
@@ -334,111 +335,186 @@ class StudyScheduler:
                 SELECT 1 FROM student_profiles sp 
                 WHERE sp.user_id = ? AND sp.topic_id = t.id
             )
-            {subject_filter}
-            {exclude_filter}
-            ORDER BY t.exam_weight DESC, t.difficulty_level ASC
-            LIMIT ?
+            AND t.subject IN focus
+            ORDER BY t.exam_weight DESC, t.difficulty_level ASC, t.id
         """
         
-        with self.db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, tuple(params))
-            topics = [dict(row) for row in cursor.fetchall()]
+        conn = self._conn
+        cursor = conn.cursor()
         
-        items = []
-        for topic in topics:
-            items.append(ScheduledItem(
-                topic_id=topic['topic_id'],
-                topic_name=topic['topic_name'],
-                subject=topic['subject'],
-                activity_type='learn',
-                duration_minutes=self.LEARN_DURATION,
-                priority=1.0 + topic['exam_weight'],
-                difficulty=topic['difficulty_level'],
-                reason=f"High priority topic (JEE weight: {topic['exam_weight']:.1f})"
-            ))
+        # Rows stay sqlite3.Row: they are only read by key here, so copying
+        # each into a dict would be wasted work
+        cursor.execute(revision_query, (subjects_json, self.user_id, end_date.isoformat()))
+        revise = cursor.fetchall()
         
-        return items
+        # Mastery < 60% = needs practice
+        cursor.execute(practice_query, (subjects_json, self.user_id, 0.6))
+        practice = cursor.fetchall()
+        
+        cursor.execute(learn_query, (subjects_json, self.user_id))
+        learn = cursor.fetchall()
+        
+        return {'revise': revise, 'practice': practice, 'learn': learn}
+    
+    def _make_revision_item(self, topic: Dict) -> ScheduledItem:
+        """Build a revision item from a candidate row"""
+        return ScheduledItem(
+            topic_id=topic['topic_id'],
+            topic_name=topic['topic_name'],
+            subject=topic['subject'],
+            activity_type='revise',
+            duration_minutes=self.REVISE_DURATION,
+            priority=3.0 + topic['exam_weight'],  # Highest priority
+            difficulty=topic['difficulty_level'],
+            reason=f"Due for revision (Mastery: {int(topic['mastery_score']*100)}%)"
+        )
+    
+    def _make_practice_item(self, topic: Dict) -> ScheduledItem:
+        """Build a practice item from a candidate row"""
+        return ScheduledItem(
+            topic_id=topic['topic_id'],
+            topic_name=topic['topic_name'],
+            subject=topic['subject'],
+            activity_type='practice',
+            duration_minutes=self.PRACTICE_DURATION,
+            priority=2.0 + topic['exam_weight'],
+            difficulty=topic['difficulty_level'],
+            reason=f"Weak area (Mastery: {int(topic['mastery_score']*100)}%, Accuracy: {int(topic['accuracy']*100)}%)"
+        )
+    
+    def _make_learn_item(self, topic: Dict) -> ScheduledItem:
+        """Build a new-topic item from a candidate row"""
+        return ScheduledItem(
+            topic_id=topic['topic_id'],
+            topic_name=topic['topic_name'],
+            subject=topic['subject'],
+            activity_type='learn',
+            duration_minutes=self.LEARN_DURATION,
+            priority=1.0 + topic['exam_weight'],
+            difficulty=topic['difficulty_level'],
+            reason=f"High priority topic (JEE weight: {topic['exam_weight']:.1f})"
+        )
+    
+    def _get_existing_schedules(self, start_date: date, end_date: date) -> Dict[str, Dict]:
+        """Get existing schedules in a date range, keyed by ISO date"""
+        conn = self._conn
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id, date, completed, completion_percentage, notes
+            FROM schedules
+            WHERE user_id = ? AND date BETWEEN ? AND ?
+            """,
+            (self.user_id, start_date.isoformat(), end_date.isoformat())
+        )
+        
+        return {
+            row['date']: {
+                'id': row['id'],
+                'completed': row['completed'],
+                'completion_percentage': row['completion_percentage'],
+                'notes': row['notes']
+            }
+            for row in cursor.fetchall()
+        }
     
     def _get_existing_schedule(self, schedule_date: date) -> Optional[Dict]:
         """Get existing schedule for a date if it exists"""
-        with self.db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT planned_items, completed, completion_percentage, notes
-                FROM schedules
-                WHERE user_id = ? AND date = ?
-                """,
-                (self.user_id, schedule_date.isoformat())
-            )
-            result = cursor.fetchone()
-            
-            if result:
-                return {
-                    'planned_items': result['planned_items'],
-                    'completed': result['completed'],
-                    'completion_percentage': result['completion_percentage'],
-                    'notes': result['notes']
-                }
-            return None
+        conn = self._conn
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id, completed, completion_percentage, notes
+            FROM schedules
+            WHERE user_id = ? AND date = ?
+            """,
+            (self.user_id, schedule_date.isoformat())
+        )
+        result = cursor.fetchone()
+        
+        if result:
+            return {
+                'id': result['id'],
+                'completed': result['completed'],
+                'completion_percentage': result['completion_percentage'],
+                'notes': result['notes']
+            }
+        return None
     
     def save_schedule(self, daily_schedule: DailySchedule) -> bool:
         """Save or update a daily schedule in the database"""
-        # Convert items to JSON
-        items_json = json.dumps([
-            {
-                'topic_id': item.topic_id,
-                'topic_name': item.topic_name,
-                'subject': item.subject,
-                'activity_type': item.activity_type,
-                'duration_minutes': item.duration_minutes,
-                'priority': item.priority,
-                'difficulty': item.difficulty,
-                'reason': item.reason
-            }
-            for item in daily_schedule.items
-        ])
+        conn = self._conn
+        self.db.begin_immediate(conn)
         
         # Check if schedule exists
         existing = self._get_existing_schedule(daily_schedule.date)
         
-        with self.db.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            if existing:
-                # Update existing schedule
-                query = """
-                    UPDATE schedules
-                    SET planned_items = ?,
-                        completion_percentage = ?,
-                        notes = ?,
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE user_id = ? AND date = ?
+        cursor = conn.cursor()
+        
+        if existing:
+            # Update existing schedule
+            schedule_id = existing['id']
+            cursor.execute(
                 """
-                params = (
-                    items_json,
-                    daily_schedule.completion_percentage,
-                    daily_schedule.notes,
-                    self.user_id,
-                    daily_schedule.date.isoformat()
-                )
-            else:
-                # Insert new schedule
-                query = """
-                    INSERT INTO schedules (user_id, date, planned_items, completion_percentage, notes)
-                    VALUES (?, ?, ?, ?, ?)
+                UPDATE schedules
+                SET planned_items = NULL,
+                    completion_percentage = ?,
+                    notes = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+                """,
+                (daily_schedule.completion_percentage, daily_schedule.notes, schedule_id)
+            )
+        else:
+            # Insert new schedule
+            cursor.execute(
                 """
-                params = (
+                INSERT INTO schedules (user_id, date, completion_percentage, notes)
+                VALUES (?, ?, ?, ?)
+                """,
+                (
                     self.user_id,
                     daily_schedule.date.isoformat(),
-                    items_json,
                     daily_schedule.completion_percentage,
                     daily_schedule.notes
                 )
-            
-            cursor.execute(query, params)
-            conn.commit()
+            )
+            schedule_id = cursor.lastrowid
+        
+        # Replace the day's items, keeping topics already ticked off
+        cursor.execute(
+            "SELECT topic_id FROM schedule_items WHERE schedule_id = ? AND completed = 1",
+            (schedule_id,)
+        )
+        completed_ids = {row['topic_id'] for row in cursor.fetchall()}
+        
+        cursor.execute("DELETE FROM schedule_items WHERE schedule_id = ?", (schedule_id,))
+        cursor.executemany(
+            """
+            INSERT INTO schedule_items (
+                schedule_id, position, topic_id, topic_name, subject, activity_type,
+                duration_minutes, priority, difficulty, reason, completed
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    schedule_id,
+                    position,
+                    item.topic_id,
+                    item.topic_name,
+                    item.subject,
+                    item.activity_type,
+                    item.duration_minutes,
+                    item.priority,
+                    item.difficulty,
+                    item.reason,
+                    1 if item.topic_id in completed_ids else 0
+                )
+                for position, item in enumerate(daily_schedule.items)
+            ]
+        )
+        conn.commit()
         
         return True
     
@@ -456,64 +532,128 @@ class StudyScheduler:
                 4: Correct response, hesitation
                 5: Perfect response
         """
-        # Get current student profile
-        with self.db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT mastery_score, revision_count, next_review_date
-                FROM student_profiles
-                WHERE user_id = ? AND topic_id = ?
-                """,
-                (self.user_id, topic_id)
-            )
-            profile = cursor.fetchone()
+        # Compute the new revision count and review date in SQL from the
+        # row's current values, so the read and write are one statement
+        conn = self._conn
+        conn.execute(
+            """
+            UPDATE student_profiles
+            SET revision_count = CASE WHEN ? < 3 THEN 0 ELSE COALESCE(revision_count, 0) + 1 END,
+                last_interval_days = sm2_interval(COALESCE(revision_count, 0), ?, last_interval_days),
+                next_review_date = DATE(?, '+' || sm2_interval(COALESCE(revision_count, 0), ?, last_interval_days) || ' days'),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE user_id = ? AND topic_id = ?
+            """,
+            (quality, quality, datetime.now().date().isoformat(), quality, self.user_id, topic_id)
+        )
+        conn.commit()
+    
+    def bulk_update_next_review_date(self, reviews: List[Tuple[int, int]]) -> None:
+        """
+        Update next review dates for many topics at once using SM-2
         
-            if not profile:
-                return
-            
-            revision_count = profile['revision_count'] or 0
-            
-            # Calculate ease factor (EF)
-            # EF' = EF + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
-            ease_factor = self.DEFAULT_EASE_FACTOR
-            ease_factor = max(
-                self.MIN_EASE_FACTOR,
-                ease_factor + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
-            )
-            
-            # Calculate interval
-            if quality < 3:
-                # Reset if recall was poor
-                interval_days = 1
-                revision_count = 0
-            else:
-                if revision_count == 0:
-                    interval_days = 1
-                elif revision_count == 1:
-                    interval_days = 6
-                else:
-                    # I(n) = I(n-1) * EF
-                    last_interval = 6 if revision_count == 1 else int(6 * (ease_factor ** (revision_count - 1)))
-                    interval_days = int(last_interval * ease_factor)
-                
-                revision_count += 1
-            
-            # Calculate next review date
-            next_review = datetime.now().date() + timedelta(days=interval_days)
-            
-            # Update database
-            cursor.execute(
-                """
-                UPDATE student_profiles
-                SET revision_count = ?,
-                    next_review_date = ?,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE user_id = ? AND topic_id = ?
-                """,
-                (revision_count, next_review.isoformat(), self.user_id, topic_id)
-            )
-            conn.commit()
+        Intervals are computed in one batch by sm2_batch (Numba-compiled when
+        numba is installed) and written with a single executemany in one
+        transaction. Each topic should appear once; if a
+        topic is repeated, its last rating wins.
+        
+        Args:
+            reviews: (topic_id, quality) pairs, quality as in
+                update_next_review_date
+        """
+        if not reviews:
+            return
+        
+        conn = self._conn
+        self.db.begin_immediate(conn)
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT topic_id,
+                   COALESCE(revision_count, 0) AS revision_count,
+                   COALESCE(last_interval_days, 0) AS last_interval_days
+            FROM student_profiles
+            WHERE user_id = ? AND topic_id IN (SELECT value FROM json_each(?))
+            """,
+            (self.user_id, fastjson.dumps([topic_id for topic_id, _ in reviews]))
+        )
+        current = {
+            row['topic_id']: (row['revision_count'], row['last_interval_days'])
+            for row in cursor.fetchall()
+        }
+        
+        reviews = [(topic_id, quality) for topic_id, quality in reviews if topic_id in current]
+        if not reviews:
+            conn.rollback()
+            return
+        
+        topic_ids = [topic_id for topic_id, _ in reviews]
+        quality = np.array([q for _, q in reviews], dtype=np.float64)
+        revision_count = np.array([current[t][0] for t in topic_ids], dtype=np.int64)
+        stored_interval = np.array([current[t][1] for t in topic_ids], dtype=np.float64)
+        
+        # Same math as sm2_interval, for every row at once
+        interval_days, new_revision_count = sm2_batch(
+            revision_count, quality, stored_interval,
+            self.DEFAULT_EASE_FACTOR, self.MIN_EASE_FACTOR
+        )
+        
+        today = datetime.now().date()
+        cursor.executemany(
+            """
+            UPDATE student_profiles
+            SET revision_count = ?,
+                last_interval_days = ?,
+                next_review_date = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE user_id = ? AND topic_id = ?
+            """,
+            [
+                (count, days, (today + timedelta(days=days)).isoformat(), self.user_id, topic_id)
+                for topic_id, count, days in zip(
+                    topic_ids, new_revision_count.tolist(), interval_days.tolist()
+                )
+            ]
+        )
+        conn.commit()
+    
+    @classmethod
+    def sm2_interval(cls, revision_count: int, quality: int,
+                     last_interval: Optional[int] = None) -> int:
+        """
+        Days until the next review under SM-2
+        
+        Args:
+            revision_count: Successful revisions so far
+            quality: Quality of recall (0-5)
+            last_interval: Stored interval of the previous review (0/None
+                for profiles reviewed before it was recorded)
+        
+        Returns:
+            Interval in days
+        """
+        # Calculate ease factor (EF)
+        # EF' = EF + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        ease_factor = cls.DEFAULT_EASE_FACTOR
+        ease_factor = max(
+            cls.MIN_EASE_FACTOR,
+            ease_factor + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        )
+        
+        # Reset if recall was poor
+        if quality < 3:
+            return 1
+        
+        if revision_count == 0:
+            return 1
+        if revision_count == 1:
+            return 6
+        
+        # I(n) = I(n-1) * EF, estimating I(n-1) = 6 * EF^(n-2) when it was
+        # never stored (the estimate must not include this review's factor)
+        if not last_interval:
+            last_interval = int(6 * (ease_factor ** (revision_count - 2)))
+        return int(last_interval * ease_factor)
     
     def mark_item_completed(
         self,
@@ -528,44 +668,30 @@ class StudyScheduler:
             schedule_date: Date of the schedule
             topic_id: Topic ID that was completed
             quality: Optional quality rating (0-5) for SM-2 algorithm
-        """
-        # Get the schedule
-        existing = self._get_existing_schedule(schedule_date)
-        if not existing:
-            return False
-        
-        # Parse planned items
-        planned_items = json.loads(existing['planned_items'])
-        
-        # Remove the completed item
-        updated_items = [item for item in planned_items if item['topic_id'] != topic_id]
-        
-        # Calculate completion percentage
-        total_items = len(planned_items)
-        completed_items = total_items - len(updated_items)
-        completion_pct = (completed_items / total_items * 100) if total_items > 0 else 0
         
-        # Update schedule
-        with self.db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                UPDATE schedules
-                SET planned_items = ?,
-                    completion_percentage = ?,
-                    completed = ?,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE user_id = ? AND date = ?
-                """,
-                (
-                    json.dumps(updated_items),
-                    completion_pct,
-                    1 if completion_pct >= 100 else 0,
-                    self.user_id,
-                    schedule_date.isoformat()
-                )
+        Returns:
+            False if no schedule is saved for that date
+        """
+        # One-row update; trg_schedule_items_completed refreshes the
+        # schedule's completion_percentage and completed flag. Items that
+        # are already completed are skipped so the trigger does not re-run.
+        conn = self._conn
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            UPDATE schedule_items
+            SET completed = 1
+            WHERE topic_id = ? AND NOT completed AND schedule_id = (
+                SELECT id FROM schedules WHERE user_id = ? AND date = ?
             )
-            conn.commit()
+            """,
+            (topic_id, self.user_id, schedule_date.isoformat())
+        )
+        updated = cursor.rowcount > 0
+        conn.commit()
+        
+        if not updated and not self._get_existing_schedule(schedule_date):
+            return False
         
         # Update next review date if quality provided
         if quality is not None:
@@ -575,24 +701,29 @@ class StudyScheduler:
     
     def get_schedule_stats(self, start_date: date, end_date: date) -> Dict:
         """Get statistics about schedules in a date range"""
-        with self.db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT 
-                    date,
-                    completion_percentage,
-                    completed,
-                    planned_items
+        conn = self._conn
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            WITH days AS (
+                SELECT id, completed, completion_percentage
                 FROM schedules
                 WHERE user_id = ? AND date BETWEEN ? AND ?
-                ORDER BY date
-                """,
-                (self.user_id, start_date.isoformat(), end_date.isoformat())
             )
-            schedules = [dict(row) for row in cursor.fetchall()]
-        
-        if not schedules:
+            SELECT 
+                (SELECT COUNT(*) FROM days) AS total_days,
+                (SELECT COALESCE(SUM(completed), 0) FROM days) AS completed_days,
+                (SELECT AVG(completion_percentage) FROM days) AS avg_completion,
+                COUNT(si.id) AS total_topics_scheduled,
+                COALESCE(SUM(si.completed), 0) AS total_topics_completed
+            FROM days d
+            JOIN schedule_items si ON si.schedule_id = d.id
+            """,
+            (self.user_id, start_date.isoformat(), end_date.isoformat())
+        )
+        row = cursor.fetchone()
+        
+        if not row['total_days']:
             return {
                 'total_days': 0,
                 'completed_days': 0,
@@ -601,22 +732,13 @@ class StudyScheduler:
                 'total_topics_completed': 0
             }
         
-        total_days = len(schedules)
-        completed_days = sum(1 for s in schedules if s['completed'])
-        avg_completion = sum(s['completion_percentage'] for s in schedules) / total_days
-        
-        total_scheduled = 0
-        total_completed = 0
-        for schedule in schedules:
-            items = json.loads(schedule['planned_items'])
-            total_scheduled += len(items)
-            completed = int(len(items) * schedule['completion_percentage'] / 100)
-            total_completed += completed
-        
         return {
-            'total_days': total_days,
-            'completed_days': completed_days,
-            'avg_completion': round(avg_completion, 1),
-            'total_topics_scheduled': total_scheduled,
-            'total_topics_completed': total_completed
+            'total_days': row['total_days'],
+            'completed_days': row['completed_days'],
+            'avg_completion': round(row['avg_completion'], 1),
+            'total_topics_scheduled': row['total_topics_scheduled'],
+            'total_topics_completed': row['total_topics_completed']
         }
+
+
+Database.add_profile_listener(StudyScheduler.invalidate_user)
@@ -6,11 +6,97 @@ Generates MCQ questions and handles grading
 from dataclasses import dataclass
 from typing import List, Dict, Optional
 from datetime import datetime
+import asyncio
 import json
 
 from src.data.db import Database
-from src.llm.client import GeminiClient
+from src.llm.client import gemini_client, extract_json_text
 from src.llm.models import TaskType
+from src.utils import fastjson
+
+
+# Default cap on concurrent LLM calls in SimpleQuizGenerator.agenerate_many
+MAX_CONCURRENT_QUIZZES = 4
+
+# Prompt for MCQ generation, split so the long instruction block is an
+# identical prefix on every call (provider-side prompt caches only match
+# on prefixes). STATIC_PREAMBLE has no placeholders - its braces are
+# doubled only because the joined template goes through str.format - and
+# must not be edited casually: any change restarts the provider's cache.
+STATIC_PREAMBLE = """Generate multiple choice questions for JEE preparation.
+
+For each question, provide:
+1. A clear question
+2. Four options (A, B, C, D)
+3. The correct answer (just the letter: A, B, C, or D)
+4. A brief explanation
+
+Format your response as a JSON array with this exact structure:
+[
+  {{
+    "question": "What is the formula for kinetic energy?",
+    "option_a": "KE = 1/2 * m * v",
+    "option_b": "KE = 1/2 * m * v^2",
+    "option_c": "KE = m * v^2",
+    "option_d": "KE = m * g * h",
+    "correct_answer": "B",
+    "explanation": "Kinetic energy is half of mass times velocity squared."
+  }}
+]
+
+IMPORTANT:
+- Return ONLY the JSON array, no other text
+- Use simple text, NO LaTeX symbols or special formatting
+- For math: use ^ for power (x^2), * for multiply, / for divide
+- Correct answer must be exactly one letter: A, B, C, or D
+"""
+
+# Per-quiz fields, filled by _quiz_params
+DYNAMIC_SUFFIX = "\nTopics: {topics}\nDifficulty: {difficulty}\nGenerate exactly {num_questions} questions."
+
+QUIZ_PROMPT_TEMPLATE = STATIC_PREAMBLE + DYNAMIC_SUFFIX
+
+
+# Most quiz specs combined into one LLM call by generate_quizzes_batched
+# (bigger batches save requests but make each call slower)
+MAX_ROWS_PER_CALL = 4
+
+# Prompt for several quizzes in one call; {requests} holds one line per spec
+BATCHED_QUIZ_PROMPT_TEMPLATE = """Generate multiple choice questions for JEE preparation for each of the following quiz requests.
+
+Requests:
+{requests}
+
+For each question, provide:
+1. A clear question
+2. Four options (A, B, C, D)
+3. The correct answer (just the letter: A, B, C, or D)
+4. A brief explanation
+
+Format your response as a JSON array with one object per request, using this exact structure:
+[
+  {{
+    "spec_index": 0,
+    "questions": [
+      {{
+        "question": "What is the formula for kinetic energy?",
+        "option_a": "KE = 1/2 * m * v",
+        "option_b": "KE = 1/2 * m * v^2",
+        "option_c": "KE = m * v^2",
+        "option_d": "KE = m * g * h",
+        "correct_answer": "B",
+        "explanation": "Kinetic energy is half of mass times velocity squared."
+      }}
+    ]
+  }}
+]
+
+IMPORTANT:
+- Return ONLY the JSON array, no other text
+- Use simple text, NO LaTeX symbols or special formatting
+- For math: use ^ for power (x^2), * for multiply, / for divide
+- Correct answer must be exactly one letter: A, B, C, or D
+- spec_index must match the request number, and each request must get exactly the number of questions it asks for"""
 
 
 @dataclass
@@ -42,7 +128,55 @@ class SimpleQuizGenerator:
     
     def __init__(self, db: Database):
         self.db = db
-        self.llm = GeminiClient()
+        self.llm = gemini_client  # Shared, so its HTTP connections are reused
+    
+    def _load_topics(self, topic_ids: List[int]) -> List[Dict]:
+        """Topics for the given IDs in request order (one query for all topics)"""
+        topic_map = self.db.get_topics_by_ids(topic_ids)
+        return [topic_map[topic_id] for topic_id in topic_ids if topic_id in topic_map]
+    
+    @staticmethod
+    def _quiz_params(topics: List[Dict], num_questions: int, difficulty: str) -> Dict:
+        """Parameters for QUIZ_PROMPT_TEMPLATE"""
+        return {
+            'num_questions': num_questions,
+            'topics': ', '.join(t['topic_name'] for t in topics),
+            'difficulty': difficulty
+        }
+    
+    @staticmethod
+    def _build_questions(response_data, topics: List[Dict], num_questions: int) -> List[Question]:
+        """Convert a parsed LLM response into Question objects"""
+        # Handle response - should be a list or dict with questions
+        if isinstance(response_data, list):
+            questions_data = response_data
+        elif isinstance(response_data, dict) and 'questions' in response_data:
+            questions_data = response_data['questions']
+        else:
+            print(f"Unexpected response format: {type(response_data)}")
+            return []
+        
+        # Convert to Question objects
+        questions = []
+        for idx, q_data in enumerate(questions_data[:num_questions]):  # Limit to requested number
+            # Assign to first topic (simple approach)
+            topic = topics[idx % len(topics)]
+            
+            question = Question(
+                id=idx + 1,
+                topic_id=topic['id'],
+                topic_name=topic['topic_name'],
+                question_text=q_data['question'],
+                option_a=q_data['option_a'],
+                option_b=q_data['option_b'],
+                option_c=q_data['option_c'],
+                option_d=q_data['option_d'],
+                correct_answer=q_data['correct_answer'].upper(),
+                explanation=q_data.get('explanation', 'No explanation provided')
+            )
+            questions.append(question)
+        
+        return questions
     
     def generate_quiz(
         self,
@@ -63,101 +197,182 @@ class SimpleQuizGenerator:
         Returns:
             List of Question objects
         """
-        # Get topic information
-        topics = []
-        for topic_id in topic_ids:
-            topic = self.db.get_topic_by_id(topic_id)
-            if topic:
-                topics.append(topic)
+        topics = self._load_topics(topic_ids)
         
         if not topics:
             return []
         
-        # Create simple, reliable prompt
-        topic_names = [t['topic_name'] for t in topics]
-        prompt_template = """Generate {num_questions} multiple choice questions for JEE preparation.
-
-Topics: {topics}
-Difficulty: {difficulty}
-
-For each question, provide:
-1. A clear question
-2. Four options (A, B, C, D)
-3. The correct answer (just the letter: A, B, C, or D)
-4. A brief explanation
-
-Format your response as a JSON array with this exact structure:
-[
-  {{
-    "question": "What is the formula for kinetic energy?",
-    "option_a": "KE = 1/2 * m * v",
-    "option_b": "KE = 1/2 * m * v^2",
-    "option_c": "KE = m * v^2",
-    "option_d": "KE = m * g * h",
-    "correct_answer": "B",
-    "explanation": "Kinetic energy is half of mass times velocity squared."
-  }}
-]
-
-IMPORTANT:
-- Return ONLY the JSON array, no other text
-- Use simple text, NO LaTeX symbols or special formatting
-- For math: use ^ for power (x^2), * for multiply, / for divide
-- Correct answer must be exactly one letter: A, B, C, or D
-- Generate exactly {num_questions} questions"""
-
         # Generate questions with LLM
         try:
-            response_data, was_cached = self.llm.generate_json(
+            # Parse as the response streams in: accumulate the chunks and
+            # only try to decode once the text could end a JSON document
+            chunks = []
+            response_data = None
+            for chunk in self.llm.generate_json_stream(
                 task_type=TaskType.QUESTION_GENERATION,
-                prompt_template=prompt_template,
-                params={
-                    'num_questions': num_questions,
-                    'topics': ', '.join(topic_names),
-                    'difficulty': difficulty
-                },
+                prompt_template=QUIZ_PROMPT_TEMPLATE,
+                params=self._quiz_params(topics, num_questions, difficulty),
                 temperature=0.7,
                 max_tokens=4096
-            )
+            ):
+                chunks.append(chunk)
+                if chunk.rstrip().endswith(('}', ']')):
+                    try:
+                        response_data = fastjson.loads(extract_json_text(''.join(chunks)))
+                        break
+                    except json.JSONDecodeError:
+                        continue
             
-            # Handle response - should be a list or dict with questions
-            if isinstance(response_data, list):
-                questions_data = response_data
-            elif isinstance(response_data, dict) and 'questions' in response_data:
-                questions_data = response_data['questions']
-            else:
-                print(f"Unexpected response format: {type(response_data)}")
-                return []
+            if response_data is None:
+                # Stream ended without a closing bracket (e.g. a closing
+                # code fence), so parse the full text
+                response_data = fastjson.loads(extract_json_text(''.join(chunks)))
             
-            # Convert to Question objects
-            questions = []
-            for idx, q_data in enumerate(questions_data[:num_questions]):  # Limit to requested number
-                # Assign to first topic (simple approach)
-                topic = topics[idx % len(topics)]
-                
-                question = Question(
-                    id=idx + 1,
-                    topic_id=topic['id'],
-                    topic_name=topic['topic_name'],
-                    question_text=q_data['question'],
-                    option_a=q_data['option_a'],
-                    option_b=q_data['option_b'],
-                    option_c=q_data['option_c'],
-                    option_d=q_data['option_d'],
-                    correct_answer=q_data['correct_answer'].upper(),
-                    explanation=q_data.get('explanation', 'No explanation provided')
+            return self._build_questions(response_data, topics, num_questions)
+            
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"JSON Parse Error: {e}")
+            return []
+        except Exception as e:
+            print(f"Error generating quiz: {e}")
+            return []
+    
+    def generate_quizzes_batched(self, specs: List[Dict]) -> List[List[Question]]:
+        """
+        Generate several quizzes with one LLM call per MAX_ROWS_PER_CALL specs
+        
+        The specs are combined into one prompt asking for a JSON array of
+        {spec_index, questions} objects, which is split back per spec. This
+        spends fewer requests than generate_quiz per spec, at the cost of a
+        slower call.
+        
+        Args:
+            specs: generate_quiz keyword arguments (topic_ids, and optionally
+                num_questions and difficulty), one dict per quiz
+        
+        Returns:
+            One list of Question objects per spec, in spec order (empty for
+            specs whose topics are unknown or missing from the response)
+        """
+        results: List[List[Question]] = [[] for _ in specs]
+        
+        # Resolve topics up front; specs without known topics stay empty
+        rows = []
+        for index, spec in enumerate(specs):
+            topics = self._load_topics(spec['topic_ids'])
+            if topics:
+                rows.append((
+                    index,
+                    topics,
+                    spec.get('num_questions', 5),
+                    spec.get('difficulty', 'Medium')
+                ))
+        
+        for start in range(0, len(rows), MAX_ROWS_PER_CALL):
+            batch = rows[start:start + MAX_ROWS_PER_CALL]
+            
+            requests = '\n'.join(
+                f"{index}. {num_questions} questions on "
+                f"{', '.join(t['topic_name'] for t in topics)} (Difficulty: {difficulty})"
+                for index, topics, num_questions, difficulty in batch
+            )
+            
+            try:
+                response_data, was_cached = self.llm.generate_json(
+                    task_type=TaskType.QUESTION_GENERATION,
+                    prompt_template=BATCHED_QUIZ_PROMPT_TEMPLATE,
+                    params={'requests': requests},
+                    temperature=0.7,
+                    max_tokens=4096 * len(batch)
                 )
-                questions.append(question)
+            except Exception as e:
+                print(f"Error generating quiz batch: {e}")
+                continue
             
-            return questions
+            if not isinstance(response_data, list):
+                print(f"Unexpected batch response format: {type(response_data)}")
+                continue
             
-        except json.JSONDecodeError as e:
-            print(f"JSON Parse Error: {e}")
+            # Demultiplex by spec_index
+            by_index = {
+                entry.get('spec_index'): entry.get('questions', [])
+                for entry in response_data
+                if isinstance(entry, dict)
+            }
+            
+            for index, topics, num_questions, difficulty in batch:
+                try:
+                    results[index] = self._build_questions(
+                        by_index.get(index, []), topics, num_questions
+                    )
+                except Exception as e:
+                    print(f"Error parsing quiz {index} of batch: {e}")
+        
+        return results
+    
+    async def agenerate_quiz(
+        self,
+        user_id: int,
+        topic_ids: List[int],
+        num_questions: int = 5,
+        difficulty: str = "Medium"
+    ) -> List[Question]:
+        """
+        Async counterpart of generate_quiz, for generating several quizzes
+        concurrently (see agenerate_many)
+        
+        Args:
+            user_id: User ID
+            topic_ids: List of topic IDs to include
+            num_questions: Number of questions to generate
+            difficulty: Easy, Medium, or Hard
+        
+        Returns:
+            List of Question objects
+        """
+        topics = self._load_topics(topic_ids)
+        
+        if not topics:
             return []
+        
+        try:
+            response_data, was_cached = await self.llm.agenerate_json(
+                task_type=TaskType.QUESTION_GENERATION,
+                prompt_template=QUIZ_PROMPT_TEMPLATE,
+                params=self._quiz_params(topics, num_questions, difficulty),
+                temperature=0.7,
+                max_tokens=4096
+            )
+            return self._build_questions(response_data, topics, num_questions)
+        
         except Exception as e:
             print(f"Error generating quiz: {e}")
             return []
     
+    async def agenerate_many(
+        self,
+        specs: List[Dict],
+        max_concurrency: int = MAX_CONCURRENT_QUIZZES
+    ) -> List[List[Question]]:
+        """
+        Generate several quizzes concurrently
+        
+        Args:
+            specs: agenerate_quiz keyword arguments, one dict per quiz
+            max_concurrency: Most LLM calls in flight at once (keeps
+                bursts under the provider's rate limit)
+        
+        Returns:
+            One list of Question objects per spec, in spec order
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def bounded(spec: Dict) -> List[Question]:
+            async with semaphore:
+                return await self.agenerate_quiz(**spec)
+        
+        return await asyncio.gather(*(bounded(spec) for spec in specs))
+    
     def grade_quiz(
         self,
         questions: List[Question],
@@ -173,28 +388,24 @@ IMPORTANT:
         Returns:
             QuizResult object
         """
-        correct_count = 0
-        question_results = []
-        
-        for question in questions:
-            user_answer = user_answers.get(question.id, '')
-            is_correct = (user_answer.upper() == question.correct_answer.upper())
-            
-            if is_correct:
-                correct_count += 1
-            
-            question_results.append({
+        # correct_answer is uppercased when questions are built, so only
+        # the user's answer needs normalising
+        question_results = [
+            {
                 'question_id': question.id,
                 'question_text': question.question_text,
-                'user_answer': user_answer,
+                'user_answer': (user_answer := user_answers.get(question.id, '')),
                 'correct_answer': question.correct_answer,
-                'is_correct': is_correct,
+                'is_correct': user_answer.upper() == question.correct_answer,
                 'explanation': question.explanation,
                 'option_a': question.option_a,
                 'option_b': question.option_b,
                 'option_c': question.option_c,
                 'option_d': question.option_d
-            })
+            }
+            for question in questions
+        ]
+        correct_count = sum(qr['is_correct'] for qr in question_results)
         
         total = len(questions)
         percentage = (correct_count / total * 100) if total > 0 else 0
@@ -214,91 +425,92 @@ IMPORTANT:
         time_taken_minutes: int
     ):
         """Save quiz attempt to database"""
+        # An empty quiz has no attempts to record, and its accuracy and
+        # per-question time would divide by zero
+        if result.total_questions == 0:
+            return
+        
+        now = datetime.now()
+        now_iso = now.isoformat()
+        today_iso = now.date().isoformat()
+        
+        # One attempts row per question, assembled before touching SQLite
+        per_question_seconds = time_taken_minutes * 60 / result.total_questions
+        attempt_rows = [
+            (
+                user_id,
+                topic_ids[0] if topic_ids else None,  # Use first topic
+                qr['question_id'],
+                qr['user_answer'],
+                1 if qr['is_correct'] else 0,
+                1.0 if qr['is_correct'] else 0.0,
+                per_question_seconds,
+                now_iso
+            )
+            for qr in result.question_results
+        ]
+        
+        # Each topic is updated once, even if listed twice
+        topic_ids = list(dict.fromkeys(topic_ids))
+        
         with self.db.get_connection() as conn:
+            self.db.begin_immediate(conn)
             cursor = conn.cursor()
             
             # Save to attempts table for each question
-            for qr in result.question_results:
-                cursor.execute(
-                    """
-                    INSERT INTO attempts (
-                        user_id, topic_id, question_id, user_answer,
-                        correctness, score, time_taken_seconds, timestamp
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
+            cursor.executemany(
+                """
+                INSERT INTO attempts (
+                    user_id, topic_id, question_id, user_answer,
+                    correctness, score, time_taken_seconds, timestamp
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                attempt_rows
+            )
+            
+            # Create or update each topic's profile in one statement; on
+            # conflict the bare column names refer to the stored row, so the
+            # running totals and derived scores are computed inside SQLite
+            accuracy = result.correct_answers / result.total_questions
+            mastery = min(accuracy * 1.2, 1.0)  # Boost accuracy slightly for mastery
+            
+            cursor.executemany(
+                """
+                INSERT INTO student_profiles (
+                    user_id, topic_id, mastery_score, last_attempt_date,
+                    total_attempts, correct_attempts, accuracy,
+                    updated_at, next_review_date
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(user_id, topic_id) DO UPDATE SET
+                    total_attempts = COALESCE(total_attempts, 0) + excluded.total_attempts,
+                    correct_attempts = COALESCE(correct_attempts, 0) + excluded.correct_attempts,
+                    accuracy = COALESCE(
+                        CAST(COALESCE(correct_attempts, 0) + excluded.correct_attempts AS REAL)
+                        / NULLIF(COALESCE(total_attempts, 0) + excluded.total_attempts, 0),
+                        0
+                    ),
+                    mastery_score = MIN(1.0, 1.2 * COALESCE(
+                        CAST(COALESCE(correct_attempts, 0) + excluded.correct_attempts AS REAL)
+                        / NULLIF(COALESCE(total_attempts, 0) + excluded.total_attempts, 0),
+                        0
+                    )),
+                    last_attempt_date = excluded.last_attempt_date,
+                    updated_at = excluded.updated_at
+                """,
+                [
                     (
                         user_id,
-                        topic_ids[0] if topic_ids else None,  # Use first topic
-                        qr['question_id'],
-                        qr['user_answer'],
-                        1 if qr['is_correct'] else 0,
-                        1.0 if qr['is_correct'] else 0.0,
-                        time_taken_minutes * 60 / result.total_questions,
-                        datetime.now().isoformat()
-                    )
-                )
-            
-            # Update student profiles
-            for topic_id in topic_ids:
-                # Get current profile
-                profile = self.db.get_student_profile(user_id, topic_id)
-                
-                if profile:
-                    # Update existing
-                    old_attempts = profile['total_attempts'] or 0
-                    old_correct = profile['correct_attempts'] or 0
-                    
-                    new_attempts = old_attempts + result.total_questions
-                    new_correct = old_correct + result.correct_answers
-                    new_accuracy = new_correct / new_attempts if new_attempts > 0 else 0
-                    new_mastery = min(new_accuracy * 1.2, 1.0)  # Boost accuracy slightly for mastery
-                    
-                    cursor.execute(
-                        """
-                        UPDATE student_profiles
-                        SET total_attempts = ?,
-                            correct_attempts = ?,
-                            accuracy = ?,
-                            mastery_score = ?,
-                            last_attempt_date = ?,
-                            updated_at = ?
-                        WHERE user_id = ? AND topic_id = ?
-                        """,
-                        (
-                            new_attempts,
-                            new_correct,
-                            new_accuracy,
-                            new_mastery,
-                            datetime.now().date().isoformat(),
-                            datetime.now().isoformat(),
-                            user_id,
-                            topic_id
-                        )
-                    )
-                else:
-                    # Create new profile
-                    accuracy = result.correct_answers / result.total_questions
-                    mastery = min(accuracy * 1.2, 1.0)
-                    
-                    cursor.execute(
-                        """
-                        INSERT INTO student_profiles (
-                            user_id, topic_id, mastery_score, last_attempt_date,
-                            total_attempts, correct_attempts, accuracy,
-                            updated_at, next_review_date
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """,
-                        (
-                            user_id,
-                            topic_id,
-                            mastery,
-                            datetime.now().date().isoformat(),
-                            result.total_questions,
-                            result.correct_answers,
-                            accuracy,
-                            datetime.now().isoformat(),
-                            datetime.now().date().isoformat()
-                        )
+                        topic_id,
+                        mastery,
+                        today_iso,
+                        result.total_questions,
+                        result.correct_answers,
+                        accuracy,
+                        now_iso,
+                        today_iso
                     )
+                    for topic_id in topic_ids
+                ]
+            )
             
             conn.commit()
@@ -4,15 +4,49 @@ Handles all database interactions
 """
 
 import sqlite3
-from typing import Optional, Dict, List
-from datetime import datetime
+import threading
+import queue
+import atexit
+import weakref
+from typing import Optional, Dict, List, Tuple, Union
+from datetime import datetime, timedelta
 from pathlib import Path
 from contextlib import contextmanager
+from functools import lru_cache
+
+from src.data.tuning import tune_connection, add_topics_listener
+from src.utils import fastjson
 
 
 class Database:
     """Database connection and operations manager"""
     
+    # Maximum number of pooled read-only and read-write connections
+    READ_POOL_SIZE = 4
+    RW_POOL_SIZE = 8
+    
+    # Prepared statements kept per connection (sqlite3 default is 128 on
+    # 3.11, but older Pythons default to 100)
+    STATEMENT_CACHE_SIZE = 128
+    
+    # UPDATE ... RETURNING needs SQLite 3.35+
+    HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+    
+    # Fields update_user_profile may change, in the order its UPDATE sets them
+    PROFILE_FIELDS = ('name', 'email', 'exam_target', 'daily_hours')
+    
+    # Database files already switched to WAL by this process (shared by all
+    # Database instances, e.g. the module singleton and get_db())
+    _wal_set = set()
+    _wal_lock = threading.Lock()
+    
+    # Live instances, for invalidate_topic_caches()
+    _instances = weakref.WeakSet()
+    
+    # Callbacks run as fn(db_path, user_id) after update_user_profile(),
+    # so caches of profile data can drop that user's entry
+    _profile_listeners = []
+    
     def __init__(self, db_path: Optional[Path] = None):
         """
         Initialize database connection
@@ -26,15 +60,256 @@ class Database:
             db_path = project_root / "mindmentor.db"
         
         self.db_path = db_path
+        
+        # Bounded pools of long-lived read-write connections and of
+        # read-only connections for analytics queries. The pools are LIFO
+        # so the most recently used (warmest) connection is reused.
+        # _local only tracks the connection a thread has checked out.
+        self._local = threading.local()
+        self._rw_pool = queue.LifoQueue(maxsize=self.RW_POOL_SIZE)
+        self._rw_created = 0
+        self._rw_lock = threading.Lock()
+        self._read_pool = queue.LifoQueue(maxsize=self.READ_POOL_SIZE)
+        self._read_created = 0
+        self._read_lock = threading.Lock()
+        self._generation = 0  # Bumped by close(); stale connections are closed on return
+        
+        # Topics are reference data seeded at startup, so topic queries are
+        # memoized per instance; see invalidate_topic_cache()
+        self._topic_query = lru_cache(maxsize=1024)(self._query_topics)
+        self._instances.add(self)
+        
+        self._enable_wal()
+        atexit.register(self.close)
+    
+    def _enable_wal(self):
+        """
+        Switch the database to WAL journal mode
+        
+        journal_mode=WAL is persistent in the database file, so this only
+        needs to run once per process and file. WAL lets readers (analytics)
+        proceed while a writer (quiz/learn) commits.
+        """
+        key = str(Path(self.db_path).resolve())
+        with self._wal_lock:
+            if key in self._wal_set:
+                return
+            self._wal_set.add(key)
+        
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                conn.execute("PRAGMA journal_mode = WAL")
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            # Fall back to the default journal mode (e.g. read-only media)
+            pass
+    
+    @classmethod
+    def add_profile_listener(cls, callback):
+        """
+        Register a callback to run after any user's profile is updated
+        
+        Args:
+            callback: Called as callback(db_path, user_id)
+        """
+        cls._profile_listeners.append(callback)
+    
+    @classmethod
+    def _configure(cls, conn: sqlite3.Connection):
+        """Apply per-connection PRAGMA tuning (WAL is set by _enable_wal)"""
+        tune_connection(conn, wal=False)
+    
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open a new read-write connection (shareable across threads)"""
+        conn = sqlite3.connect(
+            self.db_path, check_same_thread=False,
+            cached_statements=self.STATEMENT_CACHE_SIZE
+        )
+        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+        self._configure(conn)
+        return conn
+    
+    def _acquire_connection(self) -> sqlite3.Connection:
+        """Take a read-write connection from the pool, opening one if allowed"""
+        try:
+            return self._rw_pool.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._rw_lock:
+            can_open = self._rw_created < self.RW_POOL_SIZE
+            if can_open:
+                self._rw_created += 1
+        
+        if not can_open:
+            # Pool is at capacity - wait for a connection to be returned
+            return self._rw_pool.get()
+        
+        try:
+            return self._open_connection()
+        except sqlite3.Error:
+            with self._rw_lock:
+                self._rw_created -= 1
+            raise
+    
+    def _release_connection(self, conn: sqlite3.Connection, generation: int):
+        """Roll back unfinished work and return a connection to the pool"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            with self._rw_lock:
+                if generation == self._generation:
+                    self._rw_created -= 1
+            return
+        
+        if generation != self._generation:
+            # close() ran while the connection was checked out
+            conn.close()
+            return
+        self._rw_pool.put(conn)
     
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+        """
+        Context manager for a pooled read-write connection
+        
+        Nested uses on one thread share the same connection. When the
+        outermost block exits, any work that was not committed is rolled
+        back (matching the old open/close behaviour) and the connection goes
+        back to the pool, so at most RW_POOL_SIZE connections stay open no
+        matter how many threads (e.g. Streamlit reruns) use the database.
+        """
+        local = self._local
+        conn = getattr(local, 'conn', None)
+        if conn is not None:
+            local.depth += 1
+            try:
+                yield conn
+            finally:
+                local.depth -= 1
+            return
+        
+        generation = self._generation
+        conn = self._acquire_connection()
+        local.conn = conn
+        local.depth = 1
         try:
             yield conn
         finally:
+            local.conn = None
+            local.depth = 0
+            self._release_connection(conn, generation)
+    
+    @staticmethod
+    def begin_immediate(conn: sqlite3.Connection):
+        """
+        Start a write transaction that takes the write lock up front
+        
+        Use before a read-modify-write sequence so it runs atomically and
+        commits (one WAL append) once. No-op if a transaction is already open.
+        """
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+    
+    def _open_read_connection(self) -> sqlite3.Connection:
+        """Open a new read-only connection"""
+        uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(
+            uri, uri=True, check_same_thread=False,
+            cached_statements=self.STATEMENT_CACHE_SIZE
+        )
+        conn.row_factory = sqlite3.Row
+        self._configure(conn)
+        return conn
+    
+    def _acquire_read_connection(self) -> Optional[sqlite3.Connection]:
+        """Take a read-only connection from the pool, opening one if allowed"""
+        try:
+            return self._read_pool.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._read_lock:
+            can_open = self._read_created < self.READ_POOL_SIZE
+            if can_open:
+                self._read_created += 1
+        
+        if not can_open:
+            # Pool is at capacity - wait for a connection to be returned
+            return self._read_pool.get()
+        
+        try:
+            return self._open_read_connection()
+        except sqlite3.Error:
+            with self._read_lock:
+                self._read_created -= 1
+            return None
+    
+    @contextmanager
+    def get_read_connection(self):
+        """
+        Context manager for a pooled read-only connection
+        
+        Use for queries that never write. Under WAL these do not contend
+        with writers. Falls back to the read-write connection if the
+        database cannot be opened read-only.
+        """
+        generation = self._generation
+        conn = self._acquire_read_connection()
+        
+        if conn is None:
+            with self.get_connection() as rw_conn:
+                yield rw_conn
+            return
+        
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            if generation != self._generation:
+                conn.close()  # close() ran while it was checked out
+            else:
+                self._read_pool.put(conn)
+    
+    def close(self):
+        """
+        Close the pooled read-only and read-write connections
+        
+        Registered with atexit. Runs PRAGMA optimize before closing.
+        Connections checked out by still-running threads are closed when
+        they are returned.
+        """
+        with self._rw_lock:
+            self._generation += 1
+            self._rw_created = 0
+        with self._read_lock:
+            self._read_created = 0
+        
+        while True:
+            try:
+                self._read_pool.get_nowait().close()
+            except queue.Empty:
+                break
+        
+        # PRAGMA optimize refreshes planner statistics that have gone stale;
+        # once per database file is enough, on the first usable connection
+        optimized = False
+        while True:
+            try:
+                conn = self._rw_pool.get_nowait()
+            except queue.Empty:
+                break
+            if not optimized:
+                try:
+                    conn.execute("PRAGMA optimize")
+                    optimized = True
+                except sqlite3.OperationalError:
+                    pass
             conn.close()
     
     # ===== USER OPERATIONS =====
@@ -141,26 +416,62 @@ class Database:
             user_id: User ID
             **kwargs: Fields to update (name, email, exam_target, daily_hours)
         """
-        allowed_fields = {'name', 'email', 'exam_target', 'daily_hours'}
-        updates = {k: v for k, v in kwargs.items() if k in allowed_fields}
-        
-        if not updates:
+        if not any(field in kwargs for field in self.PROFILE_FIELDS):
             return
         
-        set_clause = ', '.join(f"{k} = ?" for k in updates.keys())
-        values = list(updates.values()) + [user_id]
+        # Fixed SQL text so the statement cache always hits: each field gets
+        # a "was passed" flag and a value, and keeps its current value when
+        # the flag is 0 (an explicit None still sets NULL)
+        values = []
+        for field in self.PROFILE_FIELDS:
+            values.append(field in kwargs)
+            values.append(kwargs.get(field))
+        values.append(user_id)
         
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(f"""
+            cursor.execute("""
                 UPDATE users
-                SET {set_clause}
+                SET name = CASE WHEN ? THEN ? ELSE name END,
+                    email = CASE WHEN ? THEN ? ELSE email END,
+                    exam_target = CASE WHEN ? THEN ? ELSE exam_target END,
+                    daily_hours = CASE WHEN ? THEN ? ELSE daily_hours END
                 WHERE id = ?
             """, values)
             conn.commit()
+        
+        for callback in self._profile_listeners:
+            callback(self.db_path, user_id)
     
     # ===== TOPIC OPERATIONS =====
     
+    def _query_topics(self, query: str, params: tuple) -> tuple:
+        """Run a topics query; results are cached by _topic_query"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return tuple(dict(row) for row in cursor.fetchall())
+    
+    def invalidate_topic_cache(self):
+        """Forget cached topic lookups (call after inserting/editing topics)"""
+        self._topic_query.cache_clear()
+    
+    @classmethod
+    def invalidate_topic_caches(cls, db_path):
+        """
+        Forget cached topic lookups of every instance using a database file
+        
+        Registered with tuning.add_topics_listener(), so it runs when the
+        init and seed scripts change topics.
+        
+        Args:
+            db_path: Path to database file
+        """
+        key = Path(db_path).resolve()
+        for instance in list(cls._instances):
+            if Path(instance.db_path).resolve() == key:
+                instance.invalidate_topic_cache()
+    
     def get_all_topics(self, subject: Optional[str] = None) -> List[Dict]:
         """
         Get all topics, optionally filtered by subject
@@ -171,26 +482,24 @@ class Database:
         Returns:
             List of topic dictionaries
         """
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            if subject:
-                cursor.execute("""
-                    SELECT id, subject, chapter_name, topic_name, 
-                           exam_weight, difficulty_level
-                    FROM topics
-                    WHERE subject = ?
-                    ORDER BY subject, chapter_name, topic_name
-                """, (subject,))
-            else:
-                cursor.execute("""
-                    SELECT id, subject, chapter_name, topic_name,
-                           exam_weight, difficulty_level
-                    FROM topics
-                    ORDER BY subject, chapter_name, topic_name
-                """)
-            
-            return [dict(row) for row in cursor.fetchall()]
+        if subject:
+            rows = self._topic_query("""
+                SELECT id, subject, chapter_name, topic_name, 
+                       exam_weight, difficulty_level
+                FROM topics
+                WHERE subject = ?
+                ORDER BY subject, chapter_name, topic_name
+            """, (subject,))
+        else:
+            rows = self._topic_query("""
+                SELECT id, subject, chapter_name, topic_name,
+                       exam_weight, difficulty_level
+                FROM topics
+                ORDER BY subject, chapter_name, topic_name
+            """, ())
+        
+        # Copies, so callers cannot modify the cached rows
+        return [dict(row) for row in rows]
     
     def get_topic_by_id(self, topic_id: int) -> Optional[Dict]:
         """
@@ -202,17 +511,38 @@ class Database:
         Returns:
             Topic data as dictionary, or None if not found
         """
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, subject, chapter_name, topic_name,
-                       exam_weight, difficulty_level, prerequisites
-                FROM topics
-                WHERE id = ?
-            """, (topic_id,))
+        rows = self._topic_query("""
+            SELECT id, subject, chapter_name, topic_name,
+                   exam_weight, difficulty_level, prerequisites
+            FROM topics
+            WHERE id = ?
+        """, (topic_id,))
+        
+        return dict(rows[0]) if rows else None
+    
+    def get_topics_by_ids(self, topic_ids) -> Dict[int, Dict]:
+        """
+        Get several topics in a single query
+        
+        Args:
+            topic_ids: Iterable of topic IDs (duplicates are ignored)
             
-            row = cursor.fetchone()
-            return dict(row) if row else None
+        Returns:
+            Dictionary mapping topic ID to topic data; missing IDs are omitted
+        """
+        ids = list(dict.fromkeys(topic_ids))
+        if not ids:
+            return {}
+        
+        # IDs are bound as one JSON array so the SQL text is constant
+        rows = self._topic_query("""
+            SELECT id, subject, chapter_name, topic_name,
+                   exam_weight, difficulty_level, prerequisites
+            FROM topics
+            WHERE id IN (SELECT value FROM json_each(?))
+        """, (fastjson.dumps(ids),))
+        
+        return {row['id']: dict(row) for row in rows}
     
     def get_topics_by_chapter(self, subject: str, chapter_name: str) -> List[Dict]:
         """
@@ -225,21 +555,19 @@ class Database:
         Returns:
             List of topic dictionaries
         """
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, subject, chapter_name, topic_name,
-                       exam_weight, difficulty_level
-                FROM topics
-                WHERE subject = ? AND chapter_name = ?
-                ORDER BY topic_name
-            """, (subject, chapter_name))
-            
-            return [dict(row) for row in cursor.fetchall()]
+        rows = self._topic_query("""
+            SELECT id, subject, chapter_name, topic_name,
+                   exam_weight, difficulty_level
+            FROM topics
+            WHERE subject = ? AND chapter_name = ?
+            ORDER BY topic_name
+        """, (subject, chapter_name))
+        
+        return [dict(row) for row in rows]
     
     # ===== STUDENT PROFILE OPERATIONS =====
     
-    def get_student_profile(self, user_id: int, topic_id: int) -> Optional[Dict]:
+    def get_student_profile(self, user_id: int, topic_id: int) -> Optional[sqlite3.Row]:
         """
         Get student's learning profile for a topic
         
@@ -248,7 +576,7 @@ class Database:
             topic_id: Topic ID
             
         Returns:
-            Profile data as dictionary, or None if not found
+            Profile row (keyed like a dict, read-only), or None if not found
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
@@ -260,8 +588,7 @@ class Database:
                 WHERE user_id = ? AND topic_id = ?
             """, (user_id, topic_id))
             
-            row = cursor.fetchone()
-            return dict(row) if row else None
+            return cursor.fetchone()
     
     def get_all_student_profiles(self, user_id: int) -> List[Dict]:
         """
@@ -273,7 +600,7 @@ class Database:
         Returns:
             List of profile dictionaries
         """
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT sp.*, t.subject, t.chapter_name, t.topic_name
@@ -285,58 +612,269 @@ class Database:
             
             return [dict(row) for row in cursor.fetchall()]
     
+    def get_profiles_version(self, user_id: int) -> Tuple:
+        """
+        Get a value that changes whenever a user's profiles change
+        
+        Used in cache keys for profile-derived analytics. updated_at only
+        has second resolution when set by CURRENT_TIMESTAMP, so the row
+        count and attempt/revision totals are included as well.
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            Tuple of (latest updated_at, profile count, total attempts,
+            total revisions)
+        """
+        with self.get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT MAX(updated_at), COUNT(*),
+                       TOTAL(total_attempts), TOTAL(revision_count)
+                FROM student_profiles
+                WHERE user_id = ?
+            """, (user_id,))
+            
+            return tuple(cursor.fetchone())
+    
+    def get_weak_profiles(self, user_id: int, threshold: float = 0.6,
+                          limit: int = 10) -> List[Dict]:
+        """
+        Get the lowest-mastery profiles below a threshold
+        
+        Args:
+            user_id: User ID
+            threshold: Profiles with mastery_score below this are weak
+            limit: Maximum number of profiles to return
+            
+        Returns:
+            List of profile dictionaries, weakest first
+        """
+        with self.get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT sp.*, t.subject, t.chapter_name, t.topic_name
+                FROM student_profiles sp
+                JOIN topics t ON sp.topic_id = t.id
+                WHERE sp.user_id = ? AND sp.mastery_score < ?
+                ORDER BY sp.mastery_score ASC, t.subject, t.chapter_name
+                LIMIT ?
+            """, (user_id, threshold, limit))
+            
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_strong_profiles(self, user_id: int, threshold: float = 0.6,
+                            limit: int = 10) -> List[Dict]:
+        """
+        Get the highest-mastery profiles at or above a threshold
+        
+        Args:
+            user_id: User ID
+            threshold: Profiles with mastery_score at or above this are strong
+            limit: Maximum number of profiles to return
+            
+        Returns:
+            List of profile dictionaries, strongest first
+        """
+        with self.get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT sp.*, t.subject, t.chapter_name, t.topic_name
+                FROM student_profiles sp
+                JOIN topics t ON sp.topic_id = t.id
+                WHERE sp.user_id = ? AND sp.mastery_score >= ?
+                ORDER BY sp.mastery_score DESC, t.subject, t.chapter_name
+                LIMIT ?
+            """, (user_id, threshold, limit))
+            
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_mastery_bucket_counts(self, user_id: int) -> Dict[int, int]:
+        """
+        Count a user's profiles per mastery bucket
+        
+        Buckets: 0 = below 30%, 1 = below 60%, 2 = below 80%, 3 = 80% and up
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            Dictionary mapping bucket number to profile count (empty buckets omitted)
+        """
+        with self.get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT
+                    CASE
+                        WHEN sp.mastery_score * 100 < 30 THEN 0
+                        WHEN sp.mastery_score * 100 < 60 THEN 1
+                        WHEN sp.mastery_score * 100 < 80 THEN 2
+                        ELSE 3
+                    END AS bucket,
+                    COUNT(*) AS count
+                FROM student_profiles sp
+                JOIN topics t ON sp.topic_id = t.id
+                WHERE sp.user_id = ?
+                GROUP BY bucket
+            """, (user_id,))
+            
+            return {row['bucket']: row['count'] for row in cursor.fetchall()}
+    
     # ===== LLM CACHE OPERATIONS =====
     
-    def get_from_cache(self, cache_key: str) -> Optional[Dict]:
+    def get_from_cache(self, cache_key: str,
+                       ttl_days: Optional[int] = None) -> Optional[Union[sqlite3.Row, Dict]]:
         """
         Get cached LLM response
         
         Args:
             cache_key: Unique cache key
+            ttl_days: Ignore entries created more than this many days ago
+                (no age limit if None)
             
         Returns:
-            Cache entry as dictionary, or None if not found
+            Cache entry (sqlite3.Row or dict, read by key; access fields
+            already include this hit), or None if not found or expired
         """
+        now = datetime.now()
+        now_iso = now.isoformat()
+        
+        # created_at is written as a local ISO timestamp by store_in_cache,
+        # so a cutoff in the same format compares correctly as text
+        if ttl_days is None:
+            cutoff_iso = ''
+        else:
+            cutoff_iso = (now - timedelta(days=ttl_days)).isoformat()
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            
+            if self.HAS_RETURNING:
+                # Record the access and fetch the entry in one statement
+                cursor.execute("""
+                    UPDATE llm_cache
+                    SET last_accessed = ?,
+                        access_count = access_count + 1
+                    WHERE cache_key = ? AND created_at >= ?
+                    RETURNING id, cache_key, model_used, response_content, compressed_content,
+                              created_at, last_accessed, access_count, content_type
+                """, (now_iso, cache_key, cutoff_iso))
+                rows = cursor.fetchall()
+                conn.commit()
+                return rows[0] if rows else None
+            
             cursor.execute("""
-                SELECT id, cache_key, model_used, response_content, 
+                SELECT id, cache_key, model_used, response_content, compressed_content,
                        created_at, last_accessed, access_count, content_type
                 FROM llm_cache
-                WHERE cache_key = ?
-            """, (cache_key,))
+                WHERE cache_key = ? AND created_at >= ?
+            """, (cache_key, cutoff_iso))
             
             row = cursor.fetchone()
             
             if row:
                 # Update access tracking
-                cache_id = row['id']
                 cursor.execute("""
                     UPDATE llm_cache
                     SET last_accessed = ?,
                         access_count = access_count + 1
                     WHERE id = ?
-                """, (datetime.now().isoformat(), cache_id))
+                """, (now_iso, row['id']))
                 conn.commit()
+                
+                entry = dict(row)
+                entry['last_accessed'] = now_iso
+                entry['access_count'] += 1
+                return entry
             
-            return dict(row) if row else None
+            return None
+    
+    def get_many_from_cache(self, cache_keys: List[str],
+                            ttl_days: Optional[int] = None) -> Dict[str, Dict]:
+        """
+        Get several cached LLM responses in one statement
+        
+        Args:
+            cache_keys: Unique cache keys (duplicates are ignored)
+            ttl_days: Ignore entries created more than this many days ago
+                (no age limit if None)
+            
+        Returns:
+            Dictionary mapping cache key to entry, as get_from_cache returns
+            it; keys not found or expired are omitted
+        """
+        keys = list(dict.fromkeys(cache_keys))
+        if not keys:
+            return {}
+        
+        now = datetime.now()
+        now_iso = now.isoformat()
+        cutoff_iso = '' if ttl_days is None else (now - timedelta(days=ttl_days)).isoformat()
+        keys_json = fastjson.dumps(keys)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            if self.HAS_RETURNING:
+                cursor.execute("""
+                    UPDATE llm_cache
+                    SET last_accessed = ?,
+                        access_count = access_count + 1
+                    WHERE cache_key IN (SELECT value FROM json_each(?))
+                      AND created_at >= ?
+                    RETURNING id, cache_key, model_used, response_content, compressed_content,
+                              created_at, last_accessed, access_count, content_type
+                """, (now_iso, keys_json, cutoff_iso))
+                rows = cursor.fetchall()
+                conn.commit()
+                return {row['cache_key']: dict(row) for row in rows}
+            
+            cursor.execute("""
+                SELECT id, cache_key, model_used, response_content, compressed_content,
+                       created_at, last_accessed, access_count, content_type
+                FROM llm_cache
+                WHERE cache_key IN (SELECT value FROM json_each(?))
+                  AND created_at >= ?
+            """, (keys_json, cutoff_iso))
+            entries = {row['cache_key']: dict(row) for row in cursor.fetchall()}
+            
+            if entries:
+                cursor.execute("""
+                    UPDATE llm_cache
+                    SET last_accessed = ?,
+                        access_count = access_count + 1
+                    WHERE id IN (SELECT value FROM json_each(?))
+                """, (now_iso, fastjson.dumps([e['id'] for e in entries.values()])))
+                conn.commit()
+                
+                for entry in entries.values():
+                    entry['last_accessed'] = now_iso
+                    entry['access_count'] += 1
+            
+            return entries
     
     def store_in_cache(self, cache_key: str, model_used: str, 
                       response_content: str, prompt_template: Optional[str] = None,
-                      content_type: Optional[str] = None) -> int:
+                      content_type: Optional[str] = None,
+                      compressed_content: Optional[bytes] = None) -> int:
         """
         Store LLM response in cache
         
         Args:
             cache_key: Unique cache key
             model_used: Model name that generated the response
-            response_content: The LLM response to cache
+            response_content: The LLM response to cache ('' if compressed)
             prompt_template: Optional prompt template used
             content_type: Optional type of content (lesson, question, etc.)
+            compressed_content: The response compressed with
+                src.utils.compression.compress_text, if it was
             
         Returns:
             Cache entry ID
         """
+        now_iso = datetime.now().isoformat()
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
@@ -344,10 +882,11 @@ class Database:
                 cursor.execute("""
                     INSERT INTO llm_cache 
                     (cache_key, model_used, prompt_template, response_content, 
-                     content_type, created_at, last_accessed, access_count)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+                     compressed_content, content_type, created_at, last_accessed,
+                     access_count)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
                 """, (cache_key, model_used, prompt_template, response_content,
-                     content_type, datetime.now().isoformat(), datetime.now().isoformat()))
+                     compressed_content, content_type, now_iso, now_iso))
                 
                 conn.commit()
                 return cursor.lastrowid
@@ -359,47 +898,124 @@ class Database:
                 row = cursor.fetchone()
                 return row['id'] if row else -1
     
+    def store_many_in_cache(self, entries: List[Tuple]) -> int:
+        """
+        Store several LLM responses in cache in one transaction
+        
+        Args:
+            entries: (cache_key, model_used, response_content,
+                compressed_content, prompt_template, content_type) tuples;
+                keys already cached are left unchanged, as with store_in_cache
+            
+        Returns:
+            Number of entries inserted
+        """
+        if not entries:
+            return 0
+        
+        now_iso = datetime.now().isoformat()
+        
+        with self.get_connection() as conn:
+            before = conn.total_changes
+            conn.executemany("""
+                INSERT OR IGNORE INTO llm_cache 
+                (cache_key, model_used, response_content, compressed_content,
+                 prompt_template, content_type, created_at, last_accessed,
+                 access_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
+            """, [entry + (now_iso, now_iso) for entry in entries])
+            conn.commit()
+            return conn.total_changes - before
+    
+    def add_cache_lookups(self, hits: int, misses: int):
+        """
+        Add to the persistent cache hit/miss counters
+        
+        Args:
+            hits: Cache hits to add
+            misses: Cache misses to add
+        """
+        with self.get_connection() as conn:
+            conn.executemany(
+                "UPDATE cache_counters SET value = value + ? WHERE name = ?",
+                ((hits, 'hits'), (misses, 'misses'))
+            )
+            conn.commit()
+    
     def get_cache_stats(self) -> Dict:
         """
         Get cache statistics
         
         Returns:
-            Dictionary with cache stats
+            Dictionary with cache stats, including the stored size in bytes
+            and the hit rate from the cache_counters table
         """
-        with self.get_connection() as conn:
+        # Everything in one statement over one pass of llm_cache: the totals
+        # are summed from the per-model groups, and the breakdowns come back
+        # as JSON arrays of objects. Hits and misses are exact counts kept in
+        # cache_counters.
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
-            
-            # Total entries
-            cursor.execute("SELECT COUNT(*) as total FROM llm_cache")
-            total = cursor.fetchone()['total']
-            
-            # Total accesses
-            cursor.execute("SELECT SUM(access_count) as total_accesses FROM llm_cache")
-            total_accesses = cursor.fetchone()['total_accesses'] or 0
-            
-            # By model
             cursor.execute("""
-                SELECT model_used, COUNT(*) as count, SUM(access_count) as accesses
-                FROM llm_cache
-                GROUP BY model_used
-            """)
-            by_model = [dict(row) for row in cursor.fetchall()]
-            
-            # By content type
-            cursor.execute("""
-                SELECT content_type, COUNT(*) as count, SUM(access_count) as accesses
-                FROM llm_cache
-                WHERE content_type IS NOT NULL
-                GROUP BY content_type
+                WITH by_model AS (
+                    SELECT model_used, COUNT(*) AS count, SUM(access_count) AS accesses,
+                           SUM(LENGTH(CAST(response_content AS BLOB))
+                               + IFNULL(LENGTH(compressed_content), 0)) AS bytes
+                    FROM llm_cache
+                    GROUP BY model_used
+                    ORDER BY model_used
+                ),
+                by_type AS (
+                    SELECT content_type, COUNT(*) AS count, SUM(access_count) AS accesses
+                    FROM llm_cache
+                    WHERE content_type IS NOT NULL
+                    GROUP BY content_type
+                    ORDER BY content_type
+                ),
+                totals AS (
+                    SELECT COALESCE(SUM(count), 0) AS total,
+                           COALESCE(SUM(accesses), 0) AS total_accesses,
+                           COALESCE(SUM(bytes), 0) AS total_bytes
+                    FROM by_model
+                ),
+                lookups AS (
+                    SELECT COALESCE(MAX(CASE WHEN name = 'hits' THEN value END), 0) AS hits,
+                           COALESCE(MAX(CASE WHEN name = 'misses' THEN value END), 0) AS misses
+                    FROM cache_counters
+                )
+                SELECT
+                    total,
+                    total_accesses,
+                    total_bytes,
+                    CASE WHEN total > 0 THEN total_accesses * 1.0 / total ELSE 0 END
+                        AS avg_accesses_per_entry,
+                    hits,
+                    misses,
+                    CASE WHEN hits + misses > 0
+                         THEN ROUND(hits * 100.0 / (hits + misses), 2)
+                         ELSE 0.0
+                    END AS hit_rate_percent,
+                    (SELECT json_group_array(json_object(
+                        'model_used', model_used, 'count', count, 'accesses', accesses
+                    )) FROM by_model) AS by_model,
+                    (SELECT json_group_array(json_object(
+                        'content_type', content_type, 'count', count, 'accesses', accesses
+                    )) FROM by_type) AS by_type
+                FROM totals, lookups
             """)
-            by_type = [dict(row) for row in cursor.fetchall()]
+            row = cursor.fetchone()
             
             return {
-                'total_entries': total,
-                'total_accesses': total_accesses,
-                'by_model': by_model,
-                'by_type': by_type,
-                'avg_accesses_per_entry': total_accesses / total if total > 0 else 0
+                'total_entries': row['total'],
+                'total_accesses': row['total_accesses'],
+                'total_bytes': row['total_bytes'],
+                'by_model': fastjson.loads(row['by_model']),
+                'by_type': fastjson.loads(row['by_type']),
+                'avg_accesses_per_entry': row['avg_accesses_per_entry'],
+                'cache_hits': row['hits'],
+                'cache_misses': row['misses'],
+                # Exact now; the old name is kept for existing callers
+                'estimated_hit_rate_percent': row['hit_rate_percent']
             }
     
     def clear_old_cache(self, days: int = 30) -> int:
@@ -412,17 +1028,24 @@ class Database:
         Returns:
             Number of entries deleted
         """
+        # last_accessed is a local ISO timestamp written from Python, so a
+        # cutoff in the same format compares correctly against the bare
+        # column and the range can use idx_llm_cache_accessed
+        cutoff_iso = (datetime.now() - timedelta(days=days)).isoformat()
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 DELETE FROM llm_cache
-                WHERE datetime(last_accessed) < datetime('now', '-' || ? || ' days')
-            """, (days,))
+                WHERE last_accessed < ?
+            """, (cutoff_iso,))
             
             deleted = cursor.rowcount
             conn.commit()
             return deleted
 
 
+add_topics_listener(Database.invalidate_topic_caches)
+
 # Singleton instance
 db = Database()
@@ -4,10 +4,14 @@ Creates the SQLite database and applies schema
 """
 
 import sqlite3
-import os
 from pathlib import Path
 import sys
 
+try:
+    from src.data.tuning import tune_connection, topics_changed
+except ImportError:  # Run as a script (python src/data/<name>.py)
+    from tuning import tune_connection, topics_changed
+
 
 def get_db_path():
     """Get the database file path"""
@@ -20,6 +24,101 @@ def get_schema_path():
     return Path(__file__).parent / "schema.sql"
 
 
+# Database paths already initialized (or upgraded) by this process. app.py
+# calls init_database_silent() on every Streamlit rerun, so after the first
+# call it is a set lookup instead of a connect and schema check.
+_INITIALIZED = set()
+
+
+def _has_tables(conn) -> bool:
+    """Check whether the database on this connection already has tables"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' LIMIT 1"
+    ).fetchone() is not None
+
+
+# Columns added to existing tables after their first release. CREATE TABLE
+# IF NOT EXISTS cannot add them, so upgrade_database() ALTERs them in.
+ADDED_COLUMNS = [
+    ('student_profiles', 'last_interval_days', 'INTEGER DEFAULT 0'),
+    ('llm_cache', 'compressed_content', 'BLOB'),
+]
+
+# Statements run once, right after the column is added, to move existing
+# data into it
+COLUMN_BACKFILLS = {
+    # Compressed responses used to be stored as blobs in response_content
+    ('llm_cache', 'compressed_content'): """
+        UPDATE llm_cache
+        SET compressed_content = response_content, response_content = ''
+        WHERE typeof(response_content) = 'blob'
+    """,
+}
+
+
+def _add_missing_columns(cursor) -> bool:
+    """Add any ADDED_COLUMNS missing from existing tables"""
+    added = False
+    for table, column, definition in ADDED_COLUMNS:
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cursor.fetchall()}
+        if existing and column not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            backfill = COLUMN_BACKFILLS.get((table, column))
+            if backfill:
+                cursor.execute(backfill)
+            added = True
+    return added
+
+
+def _upgrade_schema(conn, schema_sql) -> bool:
+    """
+    Apply schema additions (new tables/indexes/columns) on an open connection
+    
+    The schema only uses IF NOT EXISTS statements, so re-applying it is
+    idempotent. When new objects were created, ANALYZE is run so the
+    query planner has statistics for them.
+    
+    Returns:
+        True if new schema objects were added
+    """
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT COUNT(*) FROM sqlite_master")
+    before = cursor.fetchone()[0]
+    
+    columns_added = _add_missing_columns(cursor)
+    cursor.executescript(schema_sql)
+    
+    cursor.execute("SELECT COUNT(*) FROM sqlite_master")
+    after = cursor.fetchone()[0]
+    
+    changed = columns_added or after > before
+    if changed:
+        cursor.execute("ANALYZE")
+    conn.commit()
+    return changed
+
+
+def upgrade_database(db_path, schema_sql) -> bool:
+    """
+    Apply schema additions (new tables/indexes/columns) to an existing database
+    
+    Returns:
+        True if new schema objects were added
+    """
+    conn = sqlite3.connect(db_path)
+    tune_connection(conn, db_path)
+    try:
+        changed = _upgrade_schema(conn, schema_sql)
+    finally:
+        conn.close()
+    
+    if changed:
+        topics_changed(db_path)
+    return changed
+
+
 def init_database(db_path=None, schema_path=None):
     """
     Initialize the database with schema
@@ -34,35 +133,29 @@ def init_database(db_path=None, schema_path=None):
     if schema_path is None:
         schema_path = get_schema_path()
     
-    # Check if database already exists and has tables
-    db_exists = os.path.exists(db_path)
-    
-    if db_exists:
-        # Check if it has tables (to see if it's already initialized)
-        try:
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-            tables = cursor.fetchall()
-            conn.close()
-            
-            if len(tables) > 0:
-                # Database already initialized
-                return True
-        except:
-            pass
-    
     # Read schema SQL
     with open(schema_path, 'r') as f:
         schema_sql = f.read()
     
-    # Create database and apply schema
+    # One connection for the existence check and the create/upgrade
     conn = sqlite3.connect(db_path)
+    tune_connection(conn, db_path)
     cursor = conn.cursor()
     
     try:
+        # Database already initialized - only apply new tables/indexes
+        if _has_tables(conn):
+            if _upgrade_schema(conn, schema_sql):
+                topics_changed(db_path)
+                print(f"✅ Database schema updated at {db_path}")
+            _INITIALIZED.add(str(db_path))
+            return True
+        
+        # Create database and apply schema
         cursor.executescript(schema_sql)
         conn.commit()
+        topics_changed(db_path)
+        _INITIALIZED.add(str(db_path))
         print(f"✅ Database created successfully at {db_path}")
         
         # Verify tables were created
@@ -75,40 +168,36 @@ def init_database(db_path=None, schema_path=None):
         return True
     
     except sqlite3.Error as e:
-        print(f"❌ Error creating database: {e}", file=sys.stderr)
+        print(f"❌ Error initializing database: {e}", file=sys.stderr)
         return False
     
     finally:
         conn.close()
 
 
-def init_database_silent(db_path=None, schema_path=None):
+def init_database_silent(db_path=None, schema_path=None, conn=None):
     """
     Initialize the database silently (for production/Streamlit Cloud)
     Returns True if successful or already initialized
+    
+    Args:
+        db_path: Path to database file (also names conn's database when
+            conn is given)
+        schema_path: Path to schema SQL file
+        conn: Open connection to use instead of opening one (no transaction
+            in progress); it is left open, e.g. for seed_jee_topics_silent in
+            bootstrap.prepare_database
     """
     if db_path is None:
         db_path = get_db_path()
     
+    # Already initialized by this process - nothing to check
+    if str(db_path) in _INITIALIZED:
+        return True
+    
     if schema_path is None:
         schema_path = get_schema_path()
     
-    # Check if database already exists and has tables
-    db_exists = os.path.exists(db_path)
-    
-    if db_exists:
-        try:
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-            tables = cursor.fetchall()
-            conn.close()
-            
-            if len(tables) > 0:
-                return True  # Already initialized
-        except:
-            pass
-    
     # Read schema SQL
     try:
         with open(schema_path, 'r') as f:
@@ -117,17 +206,32 @@ def init_database_silent(db_path=None, schema_path=None):
         print(f"❌ Schema file not found at {schema_path}", file=sys.stderr)
         return False
     
-    # Create database and apply schema
+    # One connection for the existence check and the create/upgrade
+    owns_conn = conn is None
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.executescript(schema_sql)
-        conn.commit()
-        conn.close()
-        return True
+        if owns_conn:
+            conn = sqlite3.connect(db_path)
+            tune_connection(conn, db_path)
+        try:
+            if _has_tables(conn):
+                # Database already initialized - only apply new tables/indexes
+                changed = _upgrade_schema(conn, schema_sql)
+            else:
+                # Create database and apply schema
+                conn.executescript(schema_sql)
+                conn.commit()
+                changed = True
+        finally:
+            if owns_conn:
+                conn.close()
     except sqlite3.Error as e:
-        print(f"❌ Error creating database: {e}", file=sys.stderr)
+        print(f"❌ Error initializing database: {e}", file=sys.stderr)
         return False
+    
+    if changed:
+        topics_changed(db_path)
+    _INITIALIZED.add(str(db_path))
+    return True
 
 
 if __name__ == "__main__":
@@ -2,18 +2,26 @@
 Database migration to add quiz_attempts and quiz_questions tables
 """
 
-import sqlite3
 import os
 
+try:
+    from src.data.tuning import open_connection
+except ImportError:  # Run as a script (python src/data/<name>.py)
+    from tuning import open_connection
+
 def migrate():
     """Add missing quiz-related tables"""
     
     db_path = os.path.join(os.path.dirname(__file__), '../../mindmentor.db')
     
-    conn = sqlite3.connect(db_path)
+    # Autocommit mode so both CREATE TABLEs run in one explicit
+    # BEGIN IMMEDIATE transaction (SQLite DDL is transactional)
+    conn = open_connection(db_path)
     cursor = conn.cursor()
     
     try:
+        cursor.execute("BEGIN IMMEDIATE")
+        
         # Add quiz_attempts table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS quiz_attempts (
@@ -31,10 +39,11 @@ def migrate():
             )
         """)
         
-        # Add quiz_questions junction table
+        # Add quiz_questions junction table, keyed by its natural
+        # (quiz_id, question_number) key so rows live in the primary B-tree
+        # instead of a rowid table plus a UNIQUE index
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS quiz_questions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
                 quiz_id INTEGER NOT NULL,
                 question_number INTEGER NOT NULL,
                 question_type TEXT NOT NULL,
@@ -45,19 +54,35 @@ def migrate():
                 marks REAL DEFAULT 4.0,
                 topic_id INTEGER NOT NULL,
                 difficulty TEXT,
+                PRIMARY KEY (quiz_id, question_number),
                 FOREIGN KEY (quiz_id) REFERENCES quizzes(id),
-                FOREIGN KEY (topic_id) REFERENCES topics(id),
-                UNIQUE(quiz_id, question_number)
-            )
+                FOREIGN KEY (topic_id) REFERENCES topics(id)
+            ) WITHOUT ROWID
         """)
         
+        # Indexes for the foreign keys and per-user history. quiz_id lookups
+        # on quiz_questions use its (quiz_id, question_number) primary key,
+        # and (user_id, attempted_at) also serves plain user_id lookups.
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_quiz_attempts_quiz ON quiz_attempts(quiz_id)")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_quiz_attempts_user_time
+            ON quiz_attempts(user_id, attempted_at DESC)
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_quiz_questions_topic ON quiz_questions(topic_id)")
+        
         conn.commit()
+        
+        # Analyze whatever the planner lacks statistics for (including the
+        # new indexes); cheap when nothing changed
+        cursor.execute("PRAGMA optimize")
         print("✅ Migration successful!")
         print("   - Added quiz_attempts table")
         print("   - Added quiz_questions table")
+        print("   - Added quiz table indexes")
         
     except Exception as e:
-        conn.rollback()
+        if conn.in_transaction:
+            conn.rollback()
         print(f"❌ Migration failed: {e}")
         raise
     
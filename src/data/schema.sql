@@ -28,23 +28,43 @@ CREATE TABLE IF NOT EXISTS topics (
     UNIQUE(subject, chapter_name, topic_name)
 );
 
+-- Index for weight-ordered topic selection (new topics to learn)
+CREATE INDEX IF NOT EXISTS idx_topics_weight ON topics(exam_weight DESC, difficulty_level ASC);
+
 -- LLM response cache (CRITICAL for API cost control)
 CREATE TABLE IF NOT EXISTS llm_cache (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     cache_key TEXT UNIQUE NOT NULL,
     model_used TEXT NOT NULL,
     prompt_template TEXT,
-    response_content TEXT NOT NULL,
+    response_content TEXT NOT NULL, -- '' when compressed_content is set
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     access_count INTEGER DEFAULT 1,
-    content_type TEXT -- 'lesson', 'question', 'explanation', 'grading'
+    content_type TEXT, -- 'lesson', 'question', 'explanation', 'grading'
+    compressed_content BLOB -- zstd or zlib frame of large responses, else NULL
 );
 
--- Index for faster cache lookups
-CREATE INDEX IF NOT EXISTS idx_llm_cache_key ON llm_cache(cache_key);
+-- Index for faster cache lookups (cache_key lookups use the UNIQUE
+-- constraint's index; a second index on it only slowed down inserts)
+DROP INDEX IF EXISTS idx_llm_cache_key;
 CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(last_accessed);
 
+-- Cache keys start with a format version (CACHE_KEY_VERSION in
+-- src/llm/cache.py). Entries keyed in an older format can never be hit
+-- again, so drop them; written as a key range so it is an index lookup,
+-- and a no-op once they are gone (';' sorts right after ':')
+DELETE FROM llm_cache WHERE cache_key < 'v2:' OR cache_key >= 'v2;';
+
+-- Exact LLM cache lookup counts ('hits', 'misses'), kept up to date by
+-- CacheManager so stats don't have to infer them from access_count
+CREATE TABLE IF NOT EXISTS cache_counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+INSERT OR IGNORE INTO cache_counters (name, value) VALUES ('hits', 0), ('misses', 0);
+
 -- Cached lesson content
 CREATE TABLE IF NOT EXISTS lessons (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -124,6 +144,63 @@ CREATE TABLE IF NOT EXISTS schedules (
     UNIQUE(user_id, date)
 );
 
+-- Items planned for each schedule day (replaces schedules.planned_items)
+CREATE TABLE IF NOT EXISTS schedule_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    schedule_id INTEGER NOT NULL,
+    position INTEGER NOT NULL DEFAULT 0,
+    topic_id INTEGER NOT NULL,
+    topic_name TEXT,
+    subject TEXT,
+    activity_type TEXT CHECK(activity_type IN ('learn', 'revise', 'practice')),
+    duration_minutes INTEGER,
+    priority REAL,
+    difficulty TEXT,
+    reason TEXT,
+    completed BOOLEAN DEFAULT 0,
+    FOREIGN KEY (schedule_id) REFERENCES schedules(id),
+    FOREIGN KEY (topic_id) REFERENCES topics(id),
+    UNIQUE(schedule_id, position)
+);
+
+-- Keep the day's completion in sync when an item is ticked off
+CREATE TRIGGER IF NOT EXISTS trg_schedule_items_completed
+AFTER UPDATE OF completed ON schedule_items
+BEGIN
+    UPDATE schedules
+    SET completion_percentage = (
+            SELECT 100.0 * SUM(completed) / COUNT(*)
+            FROM schedule_items WHERE schedule_id = NEW.schedule_id
+        ),
+        completed = NOT EXISTS (
+            SELECT 1 FROM schedule_items
+            WHERE schedule_id = NEW.schedule_id AND NOT completed
+        ),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE id = NEW.schedule_id;
+END;
+
+-- Move items from legacy planned_items JSON into schedule_items
+INSERT OR IGNORE INTO schedule_items (
+    schedule_id, position, topic_id, topic_name, subject, activity_type,
+    duration_minutes, priority, difficulty, reason
+)
+SELECT
+    s.id,
+    CAST(j.key AS INTEGER),
+    json_extract(j.value, '$.topic_id'),
+    json_extract(j.value, '$.topic_name'),
+    json_extract(j.value, '$.subject'),
+    json_extract(j.value, '$.activity_type'),
+    json_extract(j.value, '$.duration_minutes'),
+    json_extract(j.value, '$.priority'),
+    json_extract(j.value, '$.difficulty'),
+    json_extract(j.value, '$.reason')
+FROM schedules s, json_each(s.planned_items) j
+WHERE s.planned_items IS NOT NULL
+    AND json_valid(s.planned_items)
+    AND NOT EXISTS (SELECT 1 FROM schedule_items si WHERE si.schedule_id = s.id);
+
 -- Student learning profiles (tracks mastery per topic)
 CREATE TABLE IF NOT EXISTS student_profiles (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -136,6 +213,7 @@ CREATE TABLE IF NOT EXISTS student_profiles (
     accuracy REAL DEFAULT 0.0,
     avg_time_seconds REAL,
     revision_count INTEGER DEFAULT 0,
+    last_interval_days INTEGER DEFAULT 0, -- SM-2 interval of the last review
     next_review_date DATE,
     weak_concepts TEXT, -- JSON array of specific concepts
     strength_level TEXT CHECK(strength_level IN ('WEAK', 'AVERAGE', 'STRONG', 'MASTERED')),
@@ -148,6 +226,7 @@ CREATE TABLE IF NOT EXISTS student_profiles (
 -- Index for analytics queries
 CREATE INDEX IF NOT EXISTS idx_student_profiles_user ON student_profiles(user_id);
 CREATE INDEX IF NOT EXISTS idx_student_profiles_mastery ON student_profiles(user_id, mastery_score);
+CREATE INDEX IF NOT EXISTS idx_sp_user_review ON student_profiles(user_id, next_review_date, mastery_score);
 
 -- Chat history for conversational learning
 CREATE TABLE IF NOT EXISTS chat_history (
@@ -163,6 +242,8 @@ CREATE TABLE IF NOT EXISTS chat_history (
 
 -- Index for retrieving chat history
 CREATE INDEX IF NOT EXISTS idx_chat_history_user_topic ON chat_history(user_id, topic_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_chat_history_user_time ON chat_history(user_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_chat_history_user_date ON chat_history(user_id, DATE(timestamp));
 
 -- API usage tracking (to monitor costs)
 CREATE TABLE IF NOT EXISTS api_usage (
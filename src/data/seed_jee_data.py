@@ -8,6 +8,11 @@ from pathlib import Path
 import json
 import sys
 
+try:
+    from src.data.tuning import open_connection, topics_changed
+except ImportError:  # Run as a script (python src/data/<name>.py)
+    from tuning import open_connection, topics_changed
+
 
 def get_db_path():
     """Get the database file path"""
@@ -15,77 +20,94 @@ def get_db_path():
     return project_root / "mindmentor.db"
 
 
-# JEE Syllabus Data
-JEE_TOPICS = [
+# JEE Syllabus Data, as (subject, chapter, topic, exam weight, difficulty)
+# rows in INSERT_TOPIC_SQL parameter order
+JEE_TOPIC_ROWS = (
     # PHYSICS
-    {"subject": "Physics", "chapter": "Mechanics", "topic": "Kinematics", "weight": 1.5, "difficulty": "Medium"},
-    {"subject": "Physics", "chapter": "Mechanics", "topic": "Laws of Motion", "weight": 1.5, "difficulty": "Medium"},
-    {"subject": "Physics", "chapter": "Mechanics", "topic": "Work, Energy and Power", "weight": 1.2, "difficulty": "Medium"},
-    {"subject": "Physics", "chapter": "Mechanics", "topic": "Rotational Motion", "weight": 1.3, "difficulty": "Hard"},
-    {"subject": "Physics", "chapter": "Mechanics", "topic": "Gravitation", "weight": 1.0, "difficulty": "Medium"},
-    {"subject": "Physics", "chapter": "Properties of Matter", "topic": "Elasticity", "weight": 0.8, "difficulty": "Easy"},
-    {"subject": "Physics", "chapter": "Properties of Matter", "topic": "Fluid Mechanics", "weight": 1.2, "difficulty": "Medium"},
-    {"subject": "Physics", "chapter": "Thermodynamics", "topic": "Kinetic Theory of Gases", "weight": 1.0, "difficulty": "Medium"},
-    {"subject": "Physics", "chapter": "Thermodynamics", "topic": "Laws of Thermodynamics", "weight": 1.2, "difficulty": "Hard"},
-    {"subject": "Physics", "chapter": "Electrostatics", "topic": "Electric Charges and Fields", "weight": 1.3, "difficulty": "Medium"},
-    {"subject": "Physics", "chapter": "Electrostatics", "topic": "Capacitance", "weight": 1.0, "difficulty": "Medium"},
-    {"subject": "Physics", "chapter": "Current Electricity", "topic": "Ohm's Law and Resistance", "weight": 1.1, "difficulty": "Easy"},
-    {"subject": "Physics", "chapter": "Current Electricity", "topic": "Kirchhoff's Laws", "weight": 1.2, "difficulty": "Medium"},
-    {"subject": "Physics", "chapter": "Magnetism", "topic": "Magnetic Effects of Current", "weight": 1.2, "difficulty": "Medium"},
-    {"subject": "Physics", "chapter": "Magnetism", "topic": "Electromagnetic Induction", "weight": 1.4, "difficulty": "Hard"},
-    {"subject": "Physics", "chapter": "Optics", "topic": "Ray Optics", "weight": 1.1, "difficulty": "Medium"},
-    {"subject": "Physics", "chapter": "Optics", "topic": "Wave Optics", "weight": 1.0, "difficulty": "Hard"},
-    {"subject": "Physics", "chapter": "Modern Physics", "topic": "Dual Nature of Matter", "weight": 1.0, "difficulty": "Medium"},
-    {"subject": "Physics", "chapter": "Modern Physics", "topic": "Atoms and Nuclei", "weight": 1.1, "difficulty": "Medium"},
-    {"subject": "Physics", "chapter": "Modern Physics", "topic": "Semiconductor Devices", "weight": 0.9, "difficulty": "Easy"},
+    ("Physics", "Mechanics", "Kinematics", 1.5, "Medium"),
+    ("Physics", "Mechanics", "Laws of Motion", 1.5, "Medium"),
+    ("Physics", "Mechanics", "Work, Energy and Power", 1.2, "Medium"),
+    ("Physics", "Mechanics", "Rotational Motion", 1.3, "Hard"),
+    ("Physics", "Mechanics", "Gravitation", 1.0, "Medium"),
+    ("Physics", "Properties of Matter", "Elasticity", 0.8, "Easy"),
+    ("Physics", "Properties of Matter", "Fluid Mechanics", 1.2, "Medium"),
+    ("Physics", "Thermodynamics", "Kinetic Theory of Gases", 1.0, "Medium"),
+    ("Physics", "Thermodynamics", "Laws of Thermodynamics", 1.2, "Hard"),
+    ("Physics", "Electrostatics", "Electric Charges and Fields", 1.3, "Medium"),
+    ("Physics", "Electrostatics", "Capacitance", 1.0, "Medium"),
+    ("Physics", "Current Electricity", "Ohm's Law and Resistance", 1.1, "Easy"),
+    ("Physics", "Current Electricity", "Kirchhoff's Laws", 1.2, "Medium"),
+    ("Physics", "Magnetism", "Magnetic Effects of Current", 1.2, "Medium"),
+    ("Physics", "Magnetism", "Electromagnetic Induction", 1.4, "Hard"),
+    ("Physics", "Optics", "Ray Optics", 1.1, "Medium"),
+    ("Physics", "Optics", "Wave Optics", 1.0, "Hard"),
+    ("Physics", "Modern Physics", "Dual Nature of Matter", 1.0, "Medium"),
+    ("Physics", "Modern Physics", "Atoms and Nuclei", 1.1, "Medium"),
+    ("Physics", "Modern Physics", "Semiconductor Devices", 0.9, "Easy"),
     
     # CHEMISTRY
-    {"subject": "Chemistry", "chapter": "Physical Chemistry", "topic": "Atomic Structure", "weight": 1.2, "difficulty": "Medium"},
-    {"subject": "Chemistry", "chapter": "Physical Chemistry", "topic": "Chemical Bonding", "weight": 1.3, "difficulty": "Medium"},
-    {"subject": "Chemistry", "chapter": "Physical Chemistry", "topic": "Gaseous State", "weight": 0.9, "difficulty": "Easy"},
-    {"subject": "Chemistry", "chapter": "Physical Chemistry", "topic": "Thermodynamics", "weight": 1.4, "difficulty": "Hard"},
-    {"subject": "Chemistry", "chapter": "Physical Chemistry", "topic": "Chemical Equilibrium", "weight": 1.2, "difficulty": "Medium"},
-    {"subject": "Chemistry", "chapter": "Physical Chemistry", "topic": "Ionic Equilibrium", "weight": 1.3, "difficulty": "Hard"},
-    {"subject": "Chemistry", "chapter": "Physical Chemistry", "topic": "Electrochemistry", "weight": 1.2, "difficulty": "Medium"},
-    {"subject": "Chemistry", "chapter": "Physical Chemistry", "topic": "Chemical Kinetics", "weight": 1.1, "difficulty": "Medium"},
-    {"subject": "Chemistry", "chapter": "Inorganic Chemistry", "topic": "Periodic Table", "weight": 1.0, "difficulty": "Easy"},
-    {"subject": "Chemistry", "chapter": "Inorganic Chemistry", "topic": "s-Block Elements", "weight": 0.8, "difficulty": "Easy"},
-    {"subject": "Chemistry", "chapter": "Inorganic Chemistry", "topic": "p-Block Elements", "weight": 1.3, "difficulty": "Medium"},
-    {"subject": "Chemistry", "chapter": "Inorganic Chemistry", "topic": "d and f Block Elements", "weight": 1.2, "difficulty": "Hard"},
-    {"subject": "Chemistry", "chapter": "Inorganic Chemistry", "topic": "Coordination Compounds", "weight": 1.1, "difficulty": "Medium"},
-    {"subject": "Chemistry", "chapter": "Organic Chemistry", "topic": "Basic Concepts", "weight": 1.0, "difficulty": "Easy"},
-    {"subject": "Chemistry", "chapter": "Organic Chemistry", "topic": "Hydrocarbons", "weight": 1.2, "difficulty": "Medium"},
-    {"subject": "Chemistry", "chapter": "Organic Chemistry", "topic": "Organic Compounds with Functional Groups", "weight": 1.4, "difficulty": "Hard"},
-    {"subject": "Chemistry", "chapter": "Organic Chemistry", "topic": "Biomolecules", "weight": 0.9, "difficulty": "Medium"},
-    {"subject": "Chemistry", "chapter": "Organic Chemistry", "topic": "Polymers", "weight": 0.8, "difficulty": "Easy"},
-    {"subject": "Chemistry", "chapter": "Organic Chemistry", "topic": "Chemistry in Everyday Life", "weight": 0.7, "difficulty": "Easy"},
+    ("Chemistry", "Physical Chemistry", "Atomic Structure", 1.2, "Medium"),
+    ("Chemistry", "Physical Chemistry", "Chemical Bonding", 1.3, "Medium"),
+    ("Chemistry", "Physical Chemistry", "Gaseous State", 0.9, "Easy"),
+    ("Chemistry", "Physical Chemistry", "Thermodynamics", 1.4, "Hard"),
+    ("Chemistry", "Physical Chemistry", "Chemical Equilibrium", 1.2, "Medium"),
+    ("Chemistry", "Physical Chemistry", "Ionic Equilibrium", 1.3, "Hard"),
+    ("Chemistry", "Physical Chemistry", "Electrochemistry", 1.2, "Medium"),
+    ("Chemistry", "Physical Chemistry", "Chemical Kinetics", 1.1, "Medium"),
+    ("Chemistry", "Inorganic Chemistry", "Periodic Table", 1.0, "Easy"),
+    ("Chemistry", "Inorganic Chemistry", "s-Block Elements", 0.8, "Easy"),
+    ("Chemistry", "Inorganic Chemistry", "p-Block Elements", 1.3, "Medium"),
+    ("Chemistry", "Inorganic Chemistry", "d and f Block Elements", 1.2, "Hard"),
+    ("Chemistry", "Inorganic Chemistry", "Coordination Compounds", 1.1, "Medium"),
+    ("Chemistry", "Organic Chemistry", "Basic Concepts", 1.0, "Easy"),
+    ("Chemistry", "Organic Chemistry", "Hydrocarbons", 1.2, "Medium"),
+    ("Chemistry", "Organic Chemistry", "Organic Compounds with Functional Groups", 1.4, "Hard"),
+    ("Chemistry", "Organic Chemistry", "Biomolecules", 0.9, "Medium"),
+    ("Chemistry", "Organic Chemistry", "Polymers", 0.8, "Easy"),
+    ("Chemistry", "Organic Chemistry", "Chemistry in Everyday Life", 0.7, "Easy"),
     
     # MATHEMATICS
-    {"subject": "Mathematics", "chapter": "Algebra", "topic": "Sets and Relations", "weight": 0.9, "difficulty": "Easy"},
-    {"subject": "Mathematics", "chapter": "Algebra", "topic": "Complex Numbers", "weight": 1.2, "difficulty": "Medium"},
-    {"subject": "Mathematics", "chapter": "Algebra", "topic": "Quadratic Equations", "weight": 1.1, "difficulty": "Medium"},
-    {"subject": "Mathematics", "chapter": "Algebra", "topic": "Sequences and Series", "weight": 1.2, "difficulty": "Medium"},
-    {"subject": "Mathematics", "chapter": "Algebra", "topic": "Permutations and Combinations", "weight": 1.3, "difficulty": "Hard"},
-    {"subject": "Mathematics", "chapter": "Algebra", "topic": "Binomial Theorem", "weight": 1.0, "difficulty": "Medium"},
-    {"subject": "Mathematics", "chapter": "Algebra", "topic": "Matrices and Determinants", "weight": 1.4, "difficulty": "Hard"},
-    {"subject": "Mathematics", "chapter": "Trigonometry", "topic": "Trigonometric Functions", "weight": 1.2, "difficulty": "Medium"},
-    {"subject": "Mathematics", "chapter": "Trigonometry", "topic": "Inverse Trigonometric Functions", "weight": 1.0, "difficulty": "Medium"},
-    {"subject": "Mathematics", "chapter": "Trigonometry", "topic": "Trigonometric Equations", "weight": 1.1, "difficulty": "Medium"},
-    {"subject": "Mathematics", "chapter": "Coordinate Geometry", "topic": "Straight Lines", "weight": 1.1, "difficulty": "Easy"},
-    {"subject": "Mathematics", "chapter": "Coordinate Geometry", "topic": "Circles", "weight": 1.2, "difficulty": "Medium"},
-    {"subject": "Mathematics", "chapter": "Coordinate Geometry", "topic": "Conic Sections", "weight": 1.4, "difficulty": "Hard"},
-    {"subject": "Mathematics", "chapter": "Coordinate Geometry", "topic": "3D Geometry", "weight": 1.3, "difficulty": "Hard"},
-    {"subject": "Mathematics", "chapter": "Calculus", "topic": "Limits and Continuity", "weight": 1.2, "difficulty": "Medium"},
-    {"subject": "Mathematics", "chapter": "Calculus", "topic": "Differentiation", "weight": 1.5, "difficulty": "Hard"},
-    {"subject": "Mathematics", "chapter": "Calculus", "topic": "Applications of Derivatives", "weight": 1.3, "difficulty": "Hard"},
-    {"subject": "Mathematics", "chapter": "Calculus", "topic": "Integration", "weight": 1.5, "difficulty": "Hard"},
-    {"subject": "Mathematics", "chapter": "Calculus", "topic": "Differential Equations", "weight": 1.2, "difficulty": "Hard"},
-    {"subject": "Mathematics", "chapter": "Vectors", "topic": "Vector Algebra", "weight": 1.1, "difficulty": "Medium"},
-    {"subject": "Mathematics", "chapter": "Probability", "topic": "Probability Theory", "weight": 1.3, "difficulty": "Medium"},
-    {"subject": "Mathematics", "chapter": "Statistics", "topic": "Mean, Median, Mode", "weight": 0.8, "difficulty": "Easy"},
+    ("Mathematics", "Algebra", "Sets and Relations", 0.9, "Easy"),
+    ("Mathematics", "Algebra", "Complex Numbers", 1.2, "Medium"),
+    ("Mathematics", "Algebra", "Quadratic Equations", 1.1, "Medium"),
+    ("Mathematics", "Algebra", "Sequences and Series", 1.2, "Medium"),
+    ("Mathematics", "Algebra", "Permutations and Combinations", 1.3, "Hard"),
+    ("Mathematics", "Algebra", "Binomial Theorem", 1.0, "Medium"),
+    ("Mathematics", "Algebra", "Matrices and Determinants", 1.4, "Hard"),
+    ("Mathematics", "Trigonometry", "Trigonometric Functions", 1.2, "Medium"),
+    ("Mathematics", "Trigonometry", "Inverse Trigonometric Functions", 1.0, "Medium"),
+    ("Mathematics", "Trigonometry", "Trigonometric Equations", 1.1, "Medium"),
+    ("Mathematics", "Coordinate Geometry", "Straight Lines", 1.1, "Easy"),
+    ("Mathematics", "Coordinate Geometry", "Circles", 1.2, "Medium"),
+    ("Mathematics", "Coordinate Geometry", "Conic Sections", 1.4, "Hard"),
+    ("Mathematics", "Coordinate Geometry", "3D Geometry", 1.3, "Hard"),
+    ("Mathematics", "Calculus", "Limits and Continuity", 1.2, "Medium"),
+    ("Mathematics", "Calculus", "Differentiation", 1.5, "Hard"),
+    ("Mathematics", "Calculus", "Applications of Derivatives", 1.3, "Hard"),
+    ("Mathematics", "Calculus", "Integration", 1.5, "Hard"),
+    ("Mathematics", "Calculus", "Differential Equations", 1.2, "Hard"),
+    ("Mathematics", "Vectors", "Vector Algebra", 1.1, "Medium"),
+    ("Mathematics", "Probability", "Probability Theory", 1.3, "Medium"),
+    ("Mathematics", "Statistics", "Mean, Median, Mode", 0.8, "Easy"),
+)
+
+# Dict form of the syllabus, for readers that want named fields
+JEE_TOPICS = [
+    {"subject": subject, "chapter": chapter, "topic": topic, "weight": weight, "difficulty": difficulty}
+    for subject, chapter, topic, weight, difficulty in JEE_TOPIC_ROWS
 ]
 
 
+INSERT_TOPIC_SQL = """
+    INSERT OR IGNORE INTO topics
+    (subject, chapter_name, topic_name, exam_weight, difficulty_level)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+# Database paths seen seeded by seed_jee_topics_silent in this process
+_SEEDED = set()
+
+
 def seed_jee_topics(db_path=None):
     """
     Seed JEE syllabus topics into the database
@@ -96,33 +118,30 @@ def seed_jee_topics(db_path=None):
     if db_path is None:
         db_path = get_db_path()
     
-    conn = sqlite3.connect(db_path)
+    # Autocommit mode: the check and the inserts run in one explicit
+    # BEGIN IMMEDIATE transaction, so concurrent seeders cannot interleave
+    conn = open_connection(db_path)
     cursor = conn.cursor()
     
     try:
-        # Check if already seeded
-        cursor.execute("SELECT COUNT(*) FROM topics")
-        count = cursor.fetchone()[0]
-        if count > 0:
+        cursor.execute("BEGIN IMMEDIATE")
+        
+        # Check if already seeded (stops at the first row)
+        cursor.execute("SELECT 1 FROM topics LIMIT 1")
+        if cursor.fetchone() is not None:
+            conn.rollback()
             return True  # Already seeded
         
-        inserted_count = 0
-        for topic_data in JEE_TOPICS:
-            cursor.execute("""
-                INSERT OR IGNORE INTO topics 
-                (subject, chapter_name, topic_name, exam_weight, difficulty_level)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                topic_data["subject"],
-                topic_data["chapter"],
-                topic_data["topic"],
-                topic_data["weight"],
-                topic_data["difficulty"]
-            ))
-            if cursor.rowcount > 0:
-                inserted_count += 1
+        # One prepared statement for every row
+        changes_before = conn.total_changes
+        cursor.executemany(INSERT_TOPIC_SQL, JEE_TOPIC_ROWS)
+        inserted_count = conn.total_changes - changes_before
+        
+        # Give the planner statistics for the freshly filled table
+        cursor.execute("ANALYZE topics")
         
         conn.commit()
+        topics_changed(db_path)
         
         print(f"✅ Successfully seeded {inserted_count} JEE topics")
         
@@ -142,48 +161,64 @@ def seed_jee_topics(db_path=None):
     
     except sqlite3.Error as e:
         print(f"❌ Error seeding topics: {e}", file=sys.stderr)
-        conn.rollback()
+        if conn.in_transaction:
+            conn.rollback()
         return False
     
     finally:
         conn.close()
 
 
-def seed_jee_topics_silent(db_path=None):
+def seed_jee_topics_silent(db_path=None, conn=None):
     """
     Seed JEE topics silently (for production/Streamlit Cloud)
     Returns True if successful or already seeded
+    
+    Args:
+        db_path: Path to database file (also names conn's database when
+            conn is given)
+        conn: Open connection to use instead of opening one (no transaction
+            in progress); it is left open, e.g. by
+            bootstrap.prepare_database
     """
     if db_path is None:
         db_path = get_db_path()
     
+    # Already checked by this process - app.py calls this on every rerun
+    if str(db_path) in _SEEDED:
+        return True
+    
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        # Autocommit mode with one explicit BEGIN IMMEDIATE transaction for
+        # the check and the inserts (see seed_jee_topics)
+        owns_conn = conn is None
+        if owns_conn:
+            conn = open_connection(db_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            
+            # Check if already seeded (stops at the first row)
+            cursor.execute("SELECT 1 FROM topics LIMIT 1")
+            seeding = cursor.fetchone() is None
+            if seeding:
+                # Insert topics (one prepared statement), then give the
+                # planner statistics for the freshly filled table
+                cursor.executemany(INSERT_TOPIC_SQL, JEE_TOPIC_ROWS)
+                cursor.execute("ANALYZE topics")
+            
+            conn.commit()
+            if seeding:
+                topics_changed(db_path)
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            if owns_conn:
+                conn.close()
         
-        # Check if already seeded
-        cursor.execute("SELECT COUNT(*) FROM topics")
-        count = cursor.fetchone()[0]
-        if count > 0:
-            conn.close()
-            return True  # Already seeded
-        
-        # Insert topics
-        for topic_data in JEE_TOPICS:
-            cursor.execute("""
-                INSERT OR IGNORE INTO topics 
-                (subject, chapter_name, topic_name, exam_weight, difficulty_level)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                topic_data["subject"],
-                topic_data["chapter"],
-                topic_data["topic"],
-                topic_data["weight"],
-                topic_data["difficulty"]
-            ))
-        
-        conn.commit()
-        conn.close()
+        _SEEDED.add(str(db_path))
         return True
         
     except sqlite3.Error as e:
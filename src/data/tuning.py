@@ -0,0 +1,86 @@
+"""
+Shared SQLite connection tuning
+
+Every connector (the Database class, init/seed scripts and migrations)
+applies the same PRAGMAs through tune_connection(). The scripts open their
+connections with open_connection(), and accept an already open one so a
+caller running several of them in a row can share a single connection.
+The scripts call topics_changed() after writing topics, so memoized topic
+lookups (see Database.invalidate_topic_caches) are dropped.
+"""
+
+import sqlite3
+
+
+# Per-connection settings applied to every new connection
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",     # Safe with WAL, no fsync per commit
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -64000",      # ~64 MB page cache
+    "PRAGMA mmap_size = 268435456",    # 256 MB memory-mapped I/O
+    "PRAGMA busy_timeout = 5000",      # Wait up to 5s on a locked database
+)
+
+_PRAGMA_SCRIPT = ";\n".join(CONNECTION_PRAGMAS) + ";"
+
+# Callbacks run as fn(db_path) by topics_changed()
+_topics_listeners = []
+
+
+def tune_connection(conn: sqlite3.Connection, db_path=None, wal: bool = True):
+    """
+    Apply CONNECTION_PRAGMAS, and optionally switch the file to WAL
+    
+    Args:
+        conn: Freshly opened connection (no transaction in progress)
+        db_path: Path the connection was opened with; WAL is skipped for
+            in-memory databases
+        wal: Set journal_mode=WAL (persistent in the file, so callers that
+            already did it once per process can pass False)
+    """
+    if wal and str(db_path) != ':memory:':
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+        except sqlite3.Error:
+            # Keep the default journal mode (e.g. read-only media)
+            pass
+    
+    conn.executescript(_PRAGMA_SCRIPT)
+
+
+def open_connection(db_path, isolation_level=None) -> sqlite3.Connection:
+    """
+    Open a tuned connection for the init, seed and migration scripts
+    
+    Args:
+        db_path: Path to database file
+        isolation_level: sqlite3 isolation level; the default None is
+            autocommit mode, with transactions started explicitly
+    
+    Returns:
+        Connection with WAL and CONNECTION_PRAGMAS applied
+    """
+    conn = sqlite3.connect(db_path, isolation_level=isolation_level)
+    tune_connection(conn, db_path)
+    return conn
+
+
+def add_topics_listener(callback):
+    """
+    Register a callback to run when a script changes a database's topics
+    
+    Args:
+        callback: Called as callback(db_path)
+    """
+    _topics_listeners.append(callback)
+
+
+def topics_changed(db_path):
+    """
+    Tell registered listeners that the topics in a database changed
+    
+    Args:
+        db_path: Path to database file
+    """
+    for callback in _topics_listeners:
+        callback(db_path)
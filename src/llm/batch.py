@@ -0,0 +1,299 @@
+"""
+Gemini Batch API jobs for bulk generation that can wait
+
+Batch jobs cost about half as much as interactive calls and do not count
+against the per-minute rate limits, but finish within hours rather than
+seconds. They suit precomputation, e.g. every lesson of a subject: the
+results are stored in the LLM cache under the same keys the interactive
+paths use, so later requests are cache hits.
+
+Usage:
+    python -m src.llm.batch precompute --subject Physics [--wait]
+    python -m src.llm.batch ingest batches/<job-id>
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from google.genai import types
+
+from src.data.db import db
+from src.llm.cache import CacheManager, cache_manager
+from src.llm.client import gemini_client, extract_json_text
+from src.llm.models import TaskType, ModelSelector, LessonResponse
+from src.llm.prompts import PromptTemplates, render_template
+from src.utils import fastjson
+
+
+# Job states after which a batch job will not change any more
+TERMINAL_STATES = {
+    types.JobState.JOB_STATE_SUCCEEDED,
+    types.JobState.JOB_STATE_PARTIALLY_SUCCEEDED,
+    types.JobState.JOB_STATE_FAILED,
+    types.JobState.JOB_STATE_CANCELLED,
+    types.JobState.JOB_STATE_EXPIRED,
+}
+
+DEFAULT_POLL_SECONDS = 60
+
+
+@dataclass
+class BatchTask:
+    """One request in a batch, with generate_json / generate_with_cache arguments"""
+    task_type: TaskType
+    prompt_template: str
+    params: Dict[str, Any]
+    temperature: float = 0.7
+    max_tokens: int = 4096
+    as_json: bool = True
+    response_schema: Optional[Any] = None
+
+
+@dataclass
+class BatchHandle:
+    """A submitted batch job"""
+    job_name: str
+    model: str
+    request_count: int
+
+
+def _request_key(task: BatchTask, cache_key: str) -> str:
+    """
+    Key for a request line, echoed back with its response
+    
+    Carries everything needed to cache the response, so ingesting a job
+    needs nothing but its name.
+    """
+    kind = 'json' if task.as_json or task.response_schema is not None else 'text'
+    return f"{task.task_type.value}|{kind}|{cache_key}"
+
+
+def _request_line(task: BatchTask, prompt: str, key: str) -> str:
+    """Serialize one request as a line of the job's JSONL input file"""
+    generation_config = {
+        'temperature': task.temperature,
+        'maxOutputTokens': task.max_tokens,
+    }
+    if task.as_json or task.response_schema is not None:
+        generation_config['responseMimeType'] = 'application/json'
+    if task.response_schema is not None:
+        generation_config['responseJsonSchema'] = task.response_schema.model_json_schema()
+    
+    return json.dumps({
+        'key': key,
+        'request': {
+            'contents': [{'role': 'user', 'parts': [{'text': prompt}]}],
+            'generationConfig': generation_config,
+        },
+    })
+
+
+async def submit_batch(tasks: List[BatchTask],
+                       display_name: str = "mindmentor-batch") -> List[BatchHandle]:
+    """
+    Submit tasks as batch jobs, one per model
+    
+    Tasks whose response is already cached are left out.
+    
+    Args:
+        tasks: Requests to run
+        display_name: Name shown for the jobs in the API console
+    
+    Returns:
+        One handle per submitted job (none if everything was cached)
+    """
+    client = gemini_client.client.aio
+    
+    # Render and key every task as the interactive paths do
+    lines_by_model: Dict[str, List[str]] = {}
+    keys_by_model: Dict[str, List[str]] = {}
+    for task in tasks:
+        model = ModelSelector.get_model_for_task(task.task_type)
+        prompt = render_template(task.prompt_template, task.params)
+        cache_key = cache_manager.generate_cache_key_from_bytes(prompt.encode('utf-8'), model)
+        
+        lines_by_model.setdefault(model, []).append(
+            _request_line(task, prompt, _request_key(task, cache_key))
+        )
+        keys_by_model.setdefault(model, []).append(cache_key)
+    
+    handles = []
+    for model, lines in lines_by_model.items():
+        # Not counted: batch jobs would skew the app's hit/miss stats
+        cached = await cache_manager.aget_many_cached_responses(
+            keys_by_model[model], count_lookups=False
+        )
+        lines = [
+            line for line, cache_key in zip(lines, keys_by_model[model])
+            if cache_key not in cached
+        ]
+        if not lines:
+            continue
+        
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False,
+                                         encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+            path = f.name
+        try:
+            uploaded = await client.files.upload(
+                file=path,
+                config=types.UploadFileConfig(display_name=display_name, mime_type='jsonl')
+            )
+        finally:
+            os.unlink(path)
+        
+        job = await client.batches.create(
+            model=model,
+            src=uploaded.name,
+            config=types.CreateBatchJobConfig(display_name=display_name)
+        )
+        handles.append(BatchHandle(job_name=job.name, model=model, request_count=len(lines)))
+    
+    return handles
+
+
+async def poll_and_ingest(job_name: str,
+                          poll_seconds: float = DEFAULT_POLL_SECONDS) -> int:
+    """
+    Wait for a batch job to finish and store its responses in the LLM cache
+    
+    Args:
+        job_name: BatchHandle.job_name of the job
+        poll_seconds: Time between status checks
+    
+    Returns:
+        Number of responses stored
+    
+    Raises:
+        Exception: If the job failed, was cancelled or expired
+    """
+    client = gemini_client.client.aio
+    
+    job = await client.batches.get(name=job_name)
+    while job.state not in TERMINAL_STATES:
+        await asyncio.sleep(poll_seconds)
+        job = await client.batches.get(name=job_name)
+    
+    if job.state not in (types.JobState.JOB_STATE_SUCCEEDED,
+                         types.JobState.JOB_STATE_PARTIALLY_SUCCEEDED):
+        raise Exception(f"Batch job {job_name} ended in state {job.state.name}: {job.error}")
+    
+    output = await client.files.download(file=job.dest.file_name)
+    model = job.model.removeprefix('models/')
+    
+    stored = 0
+    for line in output.decode('utf-8').splitlines():
+        if not line.strip():
+            continue
+        
+        result = json.loads(line)
+        if 'response' not in result:
+            continue  # Failed request; it will be generated on demand
+        
+        content_type, kind, cache_key = result['key'].split('|', 2)
+        text = types.GenerateContentResponse.model_validate(result['response']).text
+        if not text:
+            continue
+        
+        if kind == 'json':
+            # Truncated or malformed output would only fail later on read
+            try:
+                fastjson.loads(extract_json_text(text))
+            except json.JSONDecodeError:
+                continue
+        
+        cache_manager.queue_response(
+            cache_key=cache_key,
+            response=text,
+            model=model,
+            content_type=content_type
+        )
+        stored += 1
+    
+    CacheManager.flush()
+    return stored
+
+
+def lesson_tasks(subject: Optional[str] = None) -> List[BatchTask]:
+    """
+    Lesson requests for every topic, as the learn page makes them
+    
+    Args:
+        subject: Only topics of this subject (all subjects if None)
+    """
+    return [
+        BatchTask(
+            task_type=TaskType.LESSON_GENERATION,
+            prompt_template=PromptTemplates.LESSON_GENERATION,
+            params={
+                'subject': topic['subject'],
+                'topic_name': topic['topic_name'],
+                'chapter_name': topic['chapter_name'],
+                'difficulty': topic.get('difficulty_level') or 'Medium',
+                'student_level': 'intermediate'
+            },
+            max_tokens=8192,
+            response_schema=LessonResponse
+        )
+        for topic in db.get_all_topics(subject)
+    ]
+
+
+async def _precompute(subject: Optional[str], wait: bool, poll_seconds: float) -> None:
+    """Submit lesson generation for a subject, optionally waiting to ingest it"""
+    handles = await submit_batch(lesson_tasks(subject), display_name="mindmentor-lessons")
+    if not handles:
+        print("All lessons are already cached.")
+        return
+    
+    for handle in handles:
+        print(f"Submitted {handle.job_name} ({handle.request_count} lessons, {handle.model})")
+    
+    if wait:
+        for handle in handles:
+            stored = await poll_and_ingest(handle.job_name, poll_seconds)
+            print(f"Cached {stored} lessons from {handle.job_name}")
+    else:
+        print("Run 'python -m src.llm.batch ingest <job>' once it has finished.")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.llm.batch",
+        description="Precompute LLM content with the Gemini Batch API"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    precompute = commands.add_parser("precompute", help="Submit lesson generation for all topics")
+    precompute.add_argument("--subject", help="Physics, Chemistry or Mathematics (default: all)")
+    precompute.add_argument("--wait", action="store_true", help="Wait for the jobs and ingest them")
+    precompute.add_argument("--poll-seconds", type=float, default=DEFAULT_POLL_SECONDS)
+    
+    ingest = commands.add_parser("ingest", help="Wait for a job and store its results in the cache")
+    ingest.add_argument("job_name")
+    ingest.add_argument("--poll-seconds", type=float, default=DEFAULT_POLL_SECONDS)
+    
+    args = parser.parse_args(argv)
+    
+    try:
+        if args.command == "precompute":
+            subject = args.subject.title() if args.subject else None
+            asyncio.run(_precompute(subject, args.wait, args.poll_seconds))
+        else:
+            stored = asyncio.run(poll_and_ingest(args.job_name, args.poll_seconds))
+            print(f"Cached {stored} responses from {args.job_name}")
+    except Exception as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
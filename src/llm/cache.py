@@ -3,17 +3,227 @@ LLM Response Caching System
 Critical component for API cost control
 """
 
+import asyncio
+import atexit
 import hashlib
 import json
-from typing import Optional, Dict, Any
-from datetime import datetime, timedelta
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
 from src.data.db import db
+from src.utils.compression import compress_text, decompress_text
 from src.utils.config import config
 
 
+# Prefix of every cache key, naming the key format. Bump it when the way keys
+# are derived changes; schema.sql deletes entries with other prefixes, which
+# could never be hit again.
+CACHE_KEY_VERSION = 'v2'
+
+# Canonical encoder for cache-key param values, built once rather than on
+# every json.dumps call
+_PARAM_ENCODER = json.JSONEncoder(sort_keys=True, separators=(',', ':'))
+
+
+def _update_framed(h, data: bytes) -> None:
+    """Feed data to hash h with a length prefix, so field boundaries are unambiguous"""
+    h.update(len(data).to_bytes(8, 'little'))
+    h.update(data)
+
+
+class _ResponseLRU:
+    """
+    Small thread-safe LRU of cache_key -> response with per-entry expiry
+    
+    Sits in front of the SQLite cache so repeated lookups of hot keys in
+    this process don't need a database round trip.
+    """
+    
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the response for key, or None if absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            response, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            
+            self._entries.move_to_end(key)
+            return response
+    
+    def put(self, key: str, response: str, ttl_seconds: float) -> None:
+        """Store response for ttl_seconds, evicting the least recently used entry if full"""
+        if ttl_seconds <= 0:
+            return
+        
+        with self._lock:
+            self._entries[key] = (response, time.monotonic() + ttl_seconds)
+            self._entries.move_to_end(key)
+            
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+
 class CacheManager:
     """Manages LLM response caching"""
     
+    # Snapshot of the cache settings, taken once at import so the per-request
+    # paths don't re-read config; see refresh_config()
+    _enabled: bool = bool(config.ENABLE_LLM_CACHE)
+    _ttl_days: int = config.CACHE_TTL_DAYS
+    
+    # In-process layer in front of the SQLite cache. Hits served from here
+    # are not counted in llm_cache.access_count.
+    _mem = _ResponseLRU(maxsize=512)
+    
+    # Write-behind queue for queue_response. A daemon thread inserts queued
+    # entries in batches of up to WRITE_BATCH_SIZE, at most
+    # WRITE_INTERVAL_SECONDS after the first one arrives; flush() writes
+    # whatever is pending and runs at exit.
+    WRITE_BATCH_SIZE = 32
+    WRITE_INTERVAL_SECONDS = 0.1
+    _pending: "queue.Queue[Tuple]" = queue.Queue()
+    _writer: Optional[threading.Thread] = None
+    _writer_lock = threading.Lock()
+    
+    # Lookups counted by get_cached_response but not yet added to the
+    # cache_counters table; written with each batch, by flush() and before
+    # get_cache_stats reads them
+    _lookups = {'hits': 0, 'misses': 0}
+    _lookups_lock = threading.Lock()
+    
+    @classmethod
+    def refresh_config(cls) -> None:
+        """Re-read ENABLE_LLM_CACHE and CACHE_TTL_DAYS after changing config at runtime"""
+        cls._enabled = bool(config.ENABLE_LLM_CACHE)
+        cls._ttl_days = config.CACHE_TTL_DAYS
+        cls._mem.clear()
+    
+    @classmethod
+    def _ensure_writer(cls) -> None:
+        """Start the write-behind thread on first use"""
+        if cls._writer is not None:
+            return
+        
+        with cls._writer_lock:
+            if cls._writer is None:
+                cls._writer = threading.Thread(
+                    target=cls._write_loop, name="llm-cache-writer", daemon=True
+                )
+                cls._writer.start()
+    
+    @classmethod
+    def _count_lookup(cls, hit: bool) -> None:
+        """Count one cache lookup"""
+        with cls._lookups_lock:
+            cls._lookups['hits' if hit else 'misses'] += 1
+    
+    @classmethod
+    def _persist_lookups(cls) -> None:
+        """Add the pending lookup counts to the cache_counters table"""
+        with cls._lookups_lock:
+            hits, misses = cls._lookups['hits'], cls._lookups['misses']
+            cls._lookups['hits'] = cls._lookups['misses'] = 0
+        
+        if not (hits or misses):
+            return
+        
+        try:
+            db.add_cache_lookups(hits, misses)
+        except Exception:
+            # Keep them for the next write
+            with cls._lookups_lock:
+                cls._lookups['hits'] += hits
+                cls._lookups['misses'] += misses
+            raise
+    
+    @staticmethod
+    def _compressed_columns(response: str) -> Tuple[str, Optional[bytes]]:
+        """Split a response into llm_cache's (response_content, compressed_content)"""
+        packed = compress_text(response)
+        if isinstance(packed, bytes):
+            return '', packed
+        return response, None
+    
+    @classmethod
+    def _persist(cls, batch) -> int:
+        """Insert queued entries, compressing large responses, and the lookup counts"""
+        inserted = db.store_many_in_cache([
+            (key, model, *cls._compressed_columns(response), template, content_type)
+            for key, model, response, template, content_type in batch
+        ])
+        cls._persist_lookups()
+        return inserted
+    
+    @classmethod
+    def _write_loop(cls) -> None:
+        """Collect queued entries into batches and insert them"""
+        while True:
+            batch = [cls._pending.get()]
+            deadline = time.monotonic() + cls.WRITE_INTERVAL_SECONDS
+            
+            while len(batch) < cls.WRITE_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(cls._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            try:
+                cls._persist(batch)
+            except Exception as e:
+                # The responses are still served from memory; losing the
+                # persisted copy only costs a regeneration later
+                print(f"LLM cache write failed for {len(batch)} entries: {e}")
+            finally:
+                for _ in batch:
+                    cls._pending.task_done()
+    
+    @classmethod
+    def flush(cls) -> int:
+        """
+        Write all queued responses to the database now
+        
+        Also waits for a batch the background thread is in the middle of
+        writing, so everything stored before the call is persisted after it.
+        
+        Returns:
+            Number of entries inserted by this call
+        """
+        batch = []
+        while True:
+            try:
+                batch.append(cls._pending.get_nowait())
+            except queue.Empty:
+                break
+        
+        try:
+            inserted = cls._persist(batch)
+        finally:
+            for _ in batch:
+                cls._pending.task_done()
+        
+        cls._pending.join()
+        return inserted
+    
     @staticmethod
     def generate_cache_key(prompt_template: str, params: Dict[str, Any], 
                           model: str) -> str:
@@ -26,20 +236,41 @@ class CacheManager:
             model: Model name being used
             
         Returns:
-            Unique cache key (SHA256 hash)
+            Unique cache key (CACHE_KEY_VERSION prefix and SHA256 hash)
         """
-        # Create a deterministic string from all inputs
-        key_data = {
-            'template': prompt_template,
-            'params': params,
-            'model': model
-        }
+        # Feed each component to the hasher instead of building one JSON
+        # string of everything; param values are still serialized
+        # canonically, but individually.
+        h = hashlib.sha256()
+        _update_framed(h, model.encode('utf-8'))
+        _update_framed(h, prompt_template.encode('utf-8'))
+        
+        for key in sorted(params):
+            _update_framed(h, str(key).encode('utf-8'))
+            _update_framed(h, _PARAM_ENCODER.encode(params[key]).encode('utf-8'))
         
-        # Convert to JSON string with sorted keys for consistency
-        key_string = json.dumps(key_data, sort_keys=True)
+        return f"{CACHE_KEY_VERSION}:{h.hexdigest()}"
+    
+    @staticmethod
+    def generate_cache_key_from_bytes(payload: bytes, model: str) -> str:
+        """
+        Generate a cache key from an already-rendered prompt
         
-        # Hash to create fixed-length key
-        return hashlib.sha256(key_string.encode('utf-8')).hexdigest()
+        Cheaper than generate_cache_key when the caller has filled the
+        template anyway: the rendered text is hashed once and params need no
+        serialization. Keys from the two methods never coincide.
+        
+        Args:
+            payload: Rendered prompt, UTF-8 encoded
+            model: Model name being used
+            
+        Returns:
+            Unique cache key (CACHE_KEY_VERSION prefix and SHA256 hash)
+        """
+        h = hashlib.sha256(b'rendered\0')
+        _update_framed(h, model.encode('utf-8'))
+        _update_framed(h, payload)
+        return f"{CACHE_KEY_VERSION}:{h.hexdigest()}"
     
     @staticmethod
     def get_cached_response(cache_key: str) -> Optional[str]:
@@ -52,23 +283,100 @@ class CacheManager:
         Returns:
             Cached response content, or None if not found
         """
-        if not config.ENABLE_LLM_CACHE:
+        if not CacheManager._enabled:
             return None
         
-        cache_entry = db.get_from_cache(cache_key)
+        response = CacheManager._mem.get(cache_key)
+        if response is None:
+            response = CacheManager._load_response(cache_key)
+        
+        CacheManager._count_lookup(response is not None)
+        return response
+    
+    @staticmethod
+    def _load_response(cache_key: str) -> Optional[str]:
+        """Read a response from the database into the in-process LRU"""
+        # Entries older than the TTL are filtered out by the query
+        cache_entry = db.get_from_cache(cache_key, ttl_days=CacheManager._ttl_days)
         
         if cache_entry:
-            # Check if cache is still valid (based on TTL)
-            created_at = datetime.fromisoformat(cache_entry['created_at'])
-            ttl_days = config.CACHE_TTL_DAYS
-            
-            if datetime.now() - created_at > timedelta(days=ttl_days):
-                # Cache expired (though with 7+ days TTL, this is rare)
+            return CacheManager._entry_response(cache_key, cache_entry)
+        
+        return None
+    
+    @staticmethod
+    def _entry_response(cache_key: str, cache_entry) -> Optional[str]:
+        """Decompress a database cache entry and keep it in the in-process LRU"""
+        compressed = cache_entry['compressed_content']
+        if compressed is None:
+            response = cache_entry['response_content']
+        else:
+            # None if it was compressed with a codec missing here
+            response = decompress_text(compressed)
+            if response is None:
                 return None
+        
+        # Keep it in memory only for what is left of its TTL
+        age = datetime.now() - datetime.fromisoformat(cache_entry['created_at'])
+        CacheManager._mem.put(
+            cache_key, response,
+            CacheManager._ttl_days * 86400 - age.total_seconds()
+        )
+        return response
+    
+    @staticmethod
+    def get_many_cached_responses(cache_keys: List[str],
+                                  count_lookups: bool = True) -> Dict[str, str]:
+        """
+        Retrieve several cached LLM responses at once
+        
+        Keys not in memory are read with a single database query rather than
+        one per key.
+        
+        Args:
+            cache_keys: Unique cache keys
+            count_lookups: Add the lookups to the hit/miss counters; offline
+                jobs pass False so the stats reflect app traffic only
             
-            return cache_entry['response_content']
+        Returns:
+            Dictionary mapping cache key to response; misses are omitted
+        """
+        if not CacheManager._enabled:
+            return {}
         
-        return None
+        found = {}
+        missing = []
+        for cache_key in dict.fromkeys(cache_keys):
+            response = CacheManager._mem.get(cache_key)
+            if response is None:
+                missing.append(cache_key)
+            else:
+                found[cache_key] = response
+        
+        if missing:
+            entries = db.get_many_from_cache(missing, ttl_days=CacheManager._ttl_days)
+            for cache_key, cache_entry in entries.items():
+                response = CacheManager._entry_response(cache_key, cache_entry)
+                if response is not None:
+                    found[cache_key] = response
+        
+        if count_lookups:
+            for cache_key in cache_keys:
+                CacheManager._count_lookup(cache_key in found)
+        return found
+    
+    @staticmethod
+    async def aget_many_cached_responses(cache_keys: List[str],
+                                         count_lookups: bool = True) -> Dict[str, str]:
+        """
+        Async counterpart of get_many_cached_responses
+        
+        The database read runs in a worker thread, so other coroutines (API
+        calls already in flight) keep running meanwhile.
+        """
+        return await asyncio.to_thread(
+            CacheManager.get_many_cached_responses, list(cache_keys), count_lookups
+        )
     
     @staticmethod
     def store_response(cache_key: str, response: str, model: str,
@@ -77,6 +385,9 @@ class CacheManager:
         """
         Store LLM response in cache
         
+        Writes to the database before returning. Callers that don't need
+        the entry ID should use queue_response, which batches the insert.
+        
         Args:
             cache_key: Unique cache key
             response: LLM response content to cache
@@ -85,23 +396,55 @@ class CacheManager:
             content_type: Optional content type (lesson, question, etc.)
             
         Returns:
-            Cache entry ID
+            Cache entry ID, or -1 if caching is disabled
         """
-        if not config.ENABLE_LLM_CACHE:
+        if not CacheManager._enabled:
             return -1
         
+        CacheManager._mem.put(cache_key, response, CacheManager._ttl_days * 86400)
+        
+        response_content, compressed_content = CacheManager._compressed_columns(response)
         return db.store_in_cache(
             cache_key=cache_key,
             model_used=model,
-            response_content=response,
+            response_content=response_content,
             prompt_template=prompt_template,
-            content_type=content_type
+            content_type=content_type,
+            compressed_content=compressed_content
+        )
+    
+    @staticmethod
+    def queue_response(cache_key: str, response: str, model: str,
+                       prompt_template: Optional[str] = None,
+                       content_type: Optional[str] = None) -> None:
+        """
+        Store LLM response in cache without waiting for the database
+        
+        The response is available to get_cached_response immediately; the
+        database insert is queued and done in the background (see flush()).
+        
+        Args:
+            cache_key: Unique cache key
+            response: LLM response content to cache
+            model: Model name that generated the response
+            prompt_template: Optional prompt template
+            content_type: Optional content type (lesson, question, etc.)
+        """
+        if not CacheManager._enabled:
+            return
+        
+        CacheManager._mem.put(cache_key, response, CacheManager._ttl_days * 86400)
+        
+        CacheManager._pending.put_nowait(
+            (cache_key, model, response, prompt_template, content_type)
         )
+        CacheManager._ensure_writer()
     
     @staticmethod
     def get_or_generate(prompt_template: str, params: Dict[str, Any],
                        model: str, generator_func,
-                       content_type: Optional[str] = None) -> tuple[str, bool]:
+                       content_type: Optional[str] = None,
+                       rendered_prompt: Optional[bytes] = None) -> tuple[str, bool]:
         """
         Get cached response or generate new one
         
@@ -113,13 +456,19 @@ class CacheManager:
             model: Model to use for generation
             generator_func: Function to call if cache miss (should return response string)
             content_type: Optional content type for tracking
+            rendered_prompt: The filled prompt as UTF-8 bytes, if the caller
+                has it; the key is then hashed from it instead of from
+                prompt_template and params
             
         Returns:
             Tuple of (response_content, was_cached)
             where was_cached is True if retrieved from cache, False if generated
         """
         # Generate cache key
-        cache_key = CacheManager.generate_cache_key(prompt_template, params, model)
+        if rendered_prompt is not None:
+            cache_key = CacheManager.generate_cache_key_from_bytes(rendered_prompt, model)
+        else:
+            cache_key = CacheManager.generate_cache_key(prompt_template, params, model)
         
         # Try to get from cache
         cached_response = CacheManager.get_cached_response(cache_key)
@@ -132,7 +481,7 @@ class CacheManager:
         response = generator_func()
         
         # Store in cache
-        CacheManager.store_response(
+        CacheManager.queue_response(
             cache_key=cache_key,
             response=response,
             model=model,
@@ -150,22 +499,8 @@ class CacheManager:
         Returns:
             Dictionary with cache stats including hit rate
         """
-        stats = db.get_cache_stats()
-        
-        # Calculate cache hit rate (if we have access count data)
-        total_accesses = stats['total_accesses']
-        total_entries = stats['total_entries']
-        
-        if total_accesses > 0 and total_entries > 0:
-            # Estimate: if average accesses > 1, we had cache hits
-            # Hit rate = (total_accesses - total_entries) / total_accesses
-            estimated_hits = max(0, total_accesses - total_entries)
-            hit_rate = (estimated_hits / total_accesses) * 100
-            stats['estimated_hit_rate_percent'] = round(hit_rate, 2)
-        else:
-            stats['estimated_hit_rate_percent'] = 0.0
-        
-        return stats
+        CacheManager._persist_lookups()
+        return db.get_cache_stats()
     
     @staticmethod
     def clear_old_cache(days: int = 30) -> int:
@@ -178,8 +513,12 @@ class CacheManager:
         Returns:
             Number of entries deleted
         """
+        CacheManager._mem.clear()
         return db.clear_old_cache(days)
 
 
 # Singleton instance
 cache_manager = CacheManager()
+
+# Registered after the database's own atexit hook, so it runs first
+atexit.register(CacheManager.flush)
@@ -3,15 +3,308 @@ Gemini API Client
 Handles all interactions with Google's Gemini API with caching and error handling
 """
 
+import asyncio
+import atexit
 import json
+import random
+import threading
 import time
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterator, List
+import httpx
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 from src.utils.config import config
 from src.llm.cache import cache_manager
-from src.llm.models import TaskType, ModelSelector
-from src.llm.prompts import PromptTemplates
+from src.llm.models import TaskType, ModelSelector, LessonResponse, QuestionSetResponse
+from src.llm.prompts import PromptTemplates, render_template
+from src.utils import fastjson
+
+
+# Default cap on concurrent API calls in GeminiClient.generate_many
+MAX_CONCURRENT_REQUESTS = 4
+
+# Most question requests combined into one API call by generate_questions_batch
+QUESTION_ROWS_PER_CALL = 5
+
+# Retry backoff: attempt n waits a random time in [0, min(RETRY_MAX_SECONDS,
+# RETRY_BASE_SECONDS * 2**n)], or longer if the server asks for it
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 30.0
+
+# After this many transient failures in a row, calls fail immediately for
+# CIRCUIT_COOLDOWN_SECONDS instead of queueing more doomed requests
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_COOLDOWN_SECONDS = 30.0
+
+# HTTP statuses worth retrying: timeouts, rate limits and server errors
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Connection pool for the SDK's synchronous httpx client. httpx closes idle
+# connections after 5 s by default, so calls driven by user interaction
+# (usually further apart) would each pay a new TCP + TLS handshake. No
+# overall read timeout: long generations legitimately take minutes.
+HTTP_CLIENT_ARGS = {
+    'limits': httpx.Limits(
+        max_keepalive_connections=20,
+        max_connections=40,
+        keepalive_expiry=90.0
+    ),
+    'timeout': httpx.Timeout(None, connect=10.0),
+}
+
+
+def partial_json_string(response_text: str, key: str) -> Optional[str]:
+    """
+    Decode the value of string field key from a possibly incomplete JSON
+    response, as far as it has arrived
+    
+    Lets a caller show a long field (e.g. a lesson's explanation) while the
+    rest of the response is still streaming. Assumes key's first occurrence
+    is the field itself, which holds for a leading top-level field.
+    
+    Returns:
+        The decoded text so far, or None if the field has not started
+    """
+    start = response_text.find(f'"{key}"')
+    if start == -1:
+        return None
+    
+    colon = response_text.find(':', start + len(key) + 2)
+    if colon == -1:
+        return None
+    quote = colon + 1
+    while quote < len(response_text) and response_text[quote] in ' \t\r\n':
+        quote += 1
+    if quote >= len(response_text) or response_text[quote] != '"':
+        return None
+    
+    try:
+        return json.decoder.scanstring(response_text, quote + 1, False)[0]
+    except json.JSONDecodeError:
+        pass
+    
+    # Unterminated: close it, first dropping up to five trailing characters
+    # in case the text ends inside an escape sequence such as \u00e9
+    body = response_text[quote + 1:]
+    for cut in range(6):
+        try:
+            return json.decoder.scanstring(body[:len(body) - cut] + '"', 0, False)[0]
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+class RateLimiter:
+    """
+    Client-side token buckets keeping each model under its per-minute limits
+    
+    Every model has a requests/min and a tokens/min bucket that refill
+    continuously. A call reserves its share up front and then waits until
+    the buckets would have held it, so concurrent callers queue in arrival
+    order instead of all hitting the API and getting 429s back. The lock is
+    a threading.Lock because calls arrive from Streamlit's script threads as
+    well as from event loops that asyncio.run creates per call; it is held
+    only for the bookkeeping, never while waiting.
+    """
+    
+    def __init__(self, limits: Dict[str, tuple]):
+        """
+        Args:
+            limits: Model name -> (requests_per_minute, tokens_per_minute);
+                0 disables that limit, models not listed are unlimited
+        """
+        self._lock = threading.Lock()
+        now = time.monotonic()
+        # model -> {'requests' | 'tokens': [capacity, level, last_refill]}
+        self._buckets = {
+            model: {
+                kind: [float(cap), float(cap), now]
+                for kind, cap in zip(('requests', 'tokens'), caps) if cap > 0
+            }
+            for model, caps in limits.items()
+        }
+    
+    def _reserve(self, model: str, tokens: int) -> float:
+        """Take one request and tokens from model's buckets; return the seconds to wait"""
+        buckets = self._buckets.get(model)
+        if not buckets:
+            return 0.0
+        
+        wait = 0.0
+        with self._lock:
+            now = time.monotonic()
+            for kind, bucket in buckets.items():
+                amount = 1 if kind == 'requests' else tokens
+                capacity, level, last = bucket
+                level = min(capacity, level + (now - last) * capacity / 60.0)
+                # Never ask for more than a full bucket, or it could not be satisfied
+                level -= min(amount, capacity)
+                bucket[1], bucket[2] = level, now
+                if level < 0:
+                    wait = max(wait, -level * 60.0 / capacity)
+        return wait
+    
+    def acquire(self, model: str, tokens: int) -> None:
+        """Block until a call to model estimated at tokens tokens is within limits"""
+        wait = self._reserve(model, tokens)
+        if wait > 0:
+            time.sleep(wait)
+    
+    async def aacquire(self, model: str, tokens: int) -> None:
+        """Async counterpart of acquire; waits without blocking the event loop"""
+        wait = self._reserve(model, tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Stops calling the API for a while after repeated transient failures
+    
+    Shared by all callers like the rate limiter. Once the cooldown has
+    passed calls go through again; the first further failure reopens the
+    circuit, the first success closes it.
+    """
+    
+    def __init__(self, threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 cooldown: float = CIRCUIT_COOLDOWN_SECONDS):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+    
+    def check(self) -> None:
+        """
+        Raises:
+            Exception: If the circuit is open
+        """
+        remaining = self._open_until - time.monotonic()
+        if remaining > 0:
+            raise Exception(
+                f"Gemini API calls paused for {remaining:.0f}s after "
+                f"{self._failures} consecutive failures"
+            )
+    
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+    
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.threshold:
+                self._open_until = time.monotonic() + self.cooldown
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Whether a failed call is worth retrying; request errors such as a bad model or prompt are not"""
+    if isinstance(error, errors.APIError):
+        return error.code in TRANSIENT_STATUS_CODES
+    # Network failures, and an empty response (retried as before)
+    return isinstance(error, (httpx.TransportError, ValueError))
+
+
+def retry_after_seconds(error: Exception) -> float:
+    """
+    Delay the server asked for before retrying, 0 if none
+    
+    Read from the Retry-After header or, for RESOURCE_EXHAUSTED errors, the
+    google.rpc.RetryInfo retryDelay (e.g. "36s") in the error details.
+    """
+    if not isinstance(error, errors.APIError):
+        return 0.0
+    
+    headers = getattr(error.response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        pass
+    
+    details = error.details.get('error', error.details) if isinstance(error.details, dict) else {}
+    for detail in details.get('details') or []:
+        delay = detail.get('retryDelay') if isinstance(detail, dict) else None
+        if isinstance(delay, str) and delay.endswith('s'):
+            try:
+                return float(delay[:-1])
+            except ValueError:
+                pass
+    return 0.0
+
+
+def backoff_seconds(attempt: int, error: Exception) -> float:
+    """Full-jitter exponential backoff before retry attempt + 1, at least the server's Retry-After"""
+    wait = random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+    return max(wait, retry_after_seconds(error))
+
+
+def content_config(temperature: float, max_tokens: int, json_mode: bool = False,
+                   response_schema: Optional[Any] = None) -> types.GenerateContentConfig:
+    """
+    Build the generation config for an API call
+    
+    Args:
+        temperature: Sampling temperature (0.0 to 1.0)
+        max_tokens: Maximum tokens in response
+        json_mode: Ask for a bare JSON response (no markdown fences)
+        response_schema: Optional pydantic model the JSON must follow;
+            implies json_mode
+    """
+    if not (json_mode or response_schema is not None):
+        return types.GenerateContentConfig(
+            temperature=temperature,
+            max_output_tokens=max_tokens,
+        )
+    return types.GenerateContentConfig(
+        temperature=temperature,
+        max_output_tokens=max_tokens,
+        response_mime_type="application/json",
+        response_schema=response_schema,
+    )
+
+
+def estimate_tokens(prompt: str, max_tokens: int) -> int:
+    """Rough token count of a call for rate limiting: ~4 characters per prompt token plus the output budget"""
+    return len(prompt) // 4 + max_tokens
+
+
+# Shared by every GeminiClient, since the API limits apply per key and model
+rate_limiter = RateLimiter({
+    ModelSelector.MODELS[tier]: limits for tier, limits in config.RATE_LIMITS.items()
+})
+circuit_breaker = CircuitBreaker()
+
+
+def extract_json_text(response_text: str) -> str:
+    """
+    Strip surrounding whitespace and markdown code fences from an LLM
+    response, leaving the JSON payload
+    
+    An unclosed fence (e.g. a response still being streamed) yields
+    everything after the opening fence.
+    """
+    # Plain str.find (memchr-backed) rather than a fence regex: a lazy
+    # "(.*?)```" match over an 8 KB response measured ~25x slower
+    json_text = response_text.strip()
+    
+    if "```json" in json_text:
+        # Extract JSON from json code block
+        start = json_text.find("```json") + 7
+        end = json_text.find("```", start)
+        if end == -1:  # No closing backticks
+            json_text = json_text[start:].strip()
+        else:
+            json_text = json_text[start:end].strip()
+    elif "```" in json_text:
+        # Extract from generic code block
+        start = json_text.find("```") + 3
+        end = json_text.find("```", start)
+        if end == -1:  # No closing backticks
+            json_text = json_text[start:].strip()
+        else:
+            json_text = json_text[start:end].strip()
+    
+    return json_text
 
 
 class GeminiClient:
@@ -35,8 +328,14 @@ class GeminiClient:
         if not self.api_key:
             raise ValueError("Gemini API key is required")
         
-        # Initialize the client
-        self.client = genai.Client(api_key=self.api_key)
+        # Initialize the client. It keeps one pooled HTTP client for its
+        # lifetime, so create a GeminiClient once and reuse it (the module
+        # level gemini_client) rather than one per request.
+        self.client = genai.Client(
+            api_key=self.api_key,
+            http_options=types.HttpOptions(client_args=dict(HTTP_CLIENT_ARGS))
+        )
+        atexit.register(self.close)
         
         # Track API usage
         self.call_count = 0
@@ -46,7 +345,9 @@ class GeminiClient:
     def _call_api(self, model: str, prompt: str, 
                   temperature: float = 0.7,
                   max_tokens: int = 4096,
-                  max_retries: int = 3) -> str:
+                  max_retries: int = 3,
+                  json_mode: bool = False,
+                  response_schema: Optional[Any] = None) -> str:
         """
         Make API call to Gemini with retry logic
         
@@ -56,6 +357,8 @@ class GeminiClient:
             temperature: Sampling temperature (0.0 to 1.0)
             max_tokens: Maximum tokens in response
             max_retries: Maximum number of retry attempts
+            json_mode: Request a bare JSON response
+            response_schema: Optional pydantic model for the JSON response
             
         Returns:
             Response text from the model
@@ -63,41 +366,93 @@ class GeminiClient:
         Raises:
             Exception: If all retries fail
         """
+        est_tokens = estimate_tokens(prompt, max_tokens)
+        
         for attempt in range(max_retries):
+            circuit_breaker.check()
             try:
+                rate_limiter.acquire(model, est_tokens)
                 response = self.client.models.generate_content(
                     model=model,
                     contents=prompt,
-                    config=types.GenerateContentConfig(
-                        temperature=temperature,
-                        max_output_tokens=max_tokens,
-                    )
+                    config=content_config(temperature, max_tokens, json_mode, response_schema)
                 )
                 
                 self.call_count += 1
                 
                 # Ensure we got a valid response
                 if response and response.text:
+                    circuit_breaker.record_success()
                     return response.text
                 else:
                     raise ValueError(f"Empty response from model {model}")
             
             except Exception as e:
+                if not is_transient_error(e):
+                    # Retrying would fail the same way
+                    raise Exception(f"Gemini API call failed: {str(e)}")
+                
+                circuit_breaker.record_failure()
                 if attempt < max_retries - 1:
-                    # Wait before retry (exponential backoff)
-                    wait_time = (2 ** attempt) * 1
-                    time.sleep(wait_time)
+                    # Wait before retry (jittered exponential backoff)
+                    time.sleep(backoff_seconds(attempt, e))
                     continue
                 else:
                     # Final attempt failed
                     raise Exception(f"Gemini API call failed after {max_retries} attempts: {str(e)}")
     
+    def _stream_api(self, model: str, prompt: str,
+                    temperature: float = 0.7,
+                    max_tokens: int = 4096,
+                    json_mode: bool = False,
+                    response_schema: Optional[Any] = None) -> Iterator[str]:
+        """
+        Stream a Gemini response as text chunks
+        
+        Unlike _call_api there is no retry: chunks may already have been
+        handed to the caller when a failure happens.
+        
+        Args:
+            model: Model name to use
+            prompt: Prompt text
+            temperature: Sampling temperature (0.0 to 1.0)
+            max_tokens: Maximum tokens in response
+            json_mode: Request a bare JSON response
+            response_schema: Optional pydantic model for the JSON response
+            
+        Yields:
+            Response text chunks as they arrive
+        """
+        circuit_breaker.check()
+        try:
+            rate_limiter.acquire(model, estimate_tokens(prompt, max_tokens))
+            stream = self.client.models.generate_content_stream(
+                model=model,
+                contents=prompt,
+                config=content_config(temperature, max_tokens, json_mode, response_schema)
+            )
+            
+            self.call_count += 1
+            
+            for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+            
+            circuit_breaker.record_success()
+        
+        except Exception as e:
+            if is_transient_error(e):
+                circuit_breaker.record_failure()
+            raise Exception(f"Gemini streaming call failed: {str(e)}")
+    
     def generate_with_cache(self, task_type: TaskType,
                           prompt_template: str,
                           params: Dict[str, Any],
                           temperature: float = 0.7,
                           max_tokens: int = 4096,
-                          force_refresh: bool = False) -> tuple[str, bool]:
+                          force_refresh: bool = False,
+                          json_mode: bool = False,
+                          response_schema: Optional[Any] = None) -> tuple[str, bool]:
         """
         Generate content with automatic caching
         
@@ -110,6 +465,8 @@ class GeminiClient:
             temperature: Sampling temperature
             max_tokens: Maximum tokens in response
             force_refresh: If True, bypass cache and generate new response
+            json_mode: Request a bare JSON response
+            response_schema: Optional pydantic model for the JSON response
             
         Returns:
             Tuple of (response_text, was_cached)
@@ -118,22 +475,25 @@ class GeminiClient:
         model = ModelSelector.get_model_for_task(task_type)
         
         # Fill template
-        filled_prompt = prompt_template.format(**params)
+        filled_prompt = render_template(prompt_template, params)
         
         # Determine content type for tracking
         content_type = task_type.value
         
         # Generator function for cache
         def generator():
-            return self._call_api(model, filled_prompt, temperature, max_tokens)
+            return self._call_api(model, filled_prompt, temperature, max_tokens,
+                                  json_mode=json_mode, response_schema=response_schema)
         
         if force_refresh:
             # Bypass cache
             response = generator()
             self.cache_misses += 1
             # Still store in cache for future
-            cache_manager.store_response(
-                cache_key=cache_manager.generate_cache_key(prompt_template, params, model),
+            cache_manager.queue_response(
+                cache_key=cache_manager.generate_cache_key_from_bytes(
+                    filled_prompt.encode('utf-8'), model
+                ),
                 response=response,
                 model=model,
                 prompt_template=prompt_template,
@@ -147,7 +507,8 @@ class GeminiClient:
             params=params,
             model=model,
             generator_func=generator,
-            content_type=content_type
+            content_type=content_type,
+            rendered_prompt=filled_prompt.encode('utf-8')
         )
         
         # Update stats
@@ -163,10 +524,14 @@ class GeminiClient:
                      params: Dict[str, Any],
                      temperature: float = 0.7,
                      max_tokens: int = 4096,
-                     force_refresh: bool = False) -> tuple[Dict, bool]:
+                     force_refresh: bool = False,
+                     response_schema: Optional[Any] = None) -> tuple[Dict, bool]:
         """
         Generate content and parse as JSON
         
+        Uses the API's JSON mode, so the response is bare JSON; the fence
+        stripping in _parse_json_response remains for older cache entries.
+        
         Args:
             task_type: Type of task
             prompt_template: Prompt template string
@@ -174,6 +539,8 @@ class GeminiClient:
             temperature: Sampling temperature
             max_tokens: Maximum tokens in response
             force_refresh: If True, bypass cache
+            response_schema: Optional pydantic model the response must follow
+                (see src/llm/models.py)
             
         Returns:
             Tuple of (parsed_json_dict, was_cached)
@@ -187,9 +554,23 @@ class GeminiClient:
             params=params,
             temperature=temperature,
             max_tokens=max_tokens,
-            force_refresh=force_refresh
+            force_refresh=force_refresh,
+            json_mode=True,
+            response_schema=response_schema
         )
         
+        return self._parse_json_response(response_text, was_cached)
+    
+    def _parse_json_response(self, response_text: str, was_cached: bool) -> tuple[Dict, bool]:
+        """
+        Parse an LLM response as JSON (shared by generate_json and agenerate_json)
+        
+        Returns:
+            Tuple of (parsed_json_dict, was_cached)
+            
+        Raises:
+            ValueError: If response is not valid JSON
+        """
         # Parse JSON
         try:
             # Handle None response
@@ -197,26 +578,9 @@ class GeminiClient:
                 raise ValueError("Empty response from LLM")
             
             # Try to find JSON in response (handle markdown code blocks)
-            json_text = response_text.strip()
-            
-            if "```json" in json_text:
-                # Extract JSON from json code block
-                start = json_text.find("```json") + 7
-                end = json_text.find("```", start)
-                if end == -1:  # No closing backticks
-                    json_text = json_text[start:].strip()
-                else:
-                    json_text = json_text[start:end].strip()
-            elif "```" in json_text:
-                # Extract from generic code block
-                start = json_text.find("```") + 3
-                end = json_text.find("```", start)
-                if end == -1:  # No closing backticks
-                    json_text = json_text[start:].strip()
-                else:
-                    json_text = json_text[start:end].strip()
+            json_text = extract_json_text(response_text)
             
-            parsed = json.loads(json_text)
+            parsed = fastjson.loads(json_text)
             return parsed, was_cached
         
         except json.JSONDecodeError as e:
@@ -248,6 +612,386 @@ class GeminiClient:
         except Exception as e:
             raise ValueError(f"Error processing LLM response: {str(e)}")
     
+    async def _acall_api(self, model: str, prompt: str,
+                         temperature: float = 0.7,
+                         max_tokens: int = 4096,
+                         max_retries: int = 3,
+                         json_mode: bool = False,
+                         response_schema: Optional[Any] = None) -> str:
+        """
+        Async counterpart of _call_api, using the SDK's asyncio client
+        
+        Args:
+            model: Model name to use
+            prompt: Prompt text
+            temperature: Sampling temperature (0.0 to 1.0)
+            max_tokens: Maximum tokens in response
+            max_retries: Maximum number of retry attempts
+            json_mode: Request a bare JSON response
+            response_schema: Optional pydantic model for the JSON response
+            
+        Returns:
+            Response text from the model
+            
+        Raises:
+            Exception: If all retries fail
+        """
+        est_tokens = estimate_tokens(prompt, max_tokens)
+        
+        for attempt in range(max_retries):
+            circuit_breaker.check()
+            try:
+                await rate_limiter.aacquire(model, est_tokens)
+                response = await self.client.aio.models.generate_content(
+                    model=model,
+                    contents=prompt,
+                    config=content_config(temperature, max_tokens, json_mode, response_schema)
+                )
+                
+                self.call_count += 1
+                
+                if response and response.text:
+                    circuit_breaker.record_success()
+                    return response.text
+                else:
+                    raise ValueError(f"Empty response from model {model}")
+            
+            except Exception as e:
+                if not is_transient_error(e):
+                    raise Exception(f"Gemini API call failed: {str(e)}")
+                
+                circuit_breaker.record_failure()
+                if attempt < max_retries - 1:
+                    # Back off without blocking the other requests on the loop
+                    await asyncio.sleep(backoff_seconds(attempt, e))
+                    continue
+                else:
+                    raise Exception(f"Gemini API call failed after {max_retries} attempts: {str(e)}")
+    
+    async def agenerate_with_cache(self, task_type: TaskType,
+                                   prompt_template: str,
+                                   params: Dict[str, Any],
+                                   temperature: float = 0.7,
+                                   max_tokens: int = 4096,
+                                   json_mode: bool = False,
+                                   response_schema: Optional[Any] = None) -> tuple[str, bool]:
+        """
+        Async counterpart of generate_with_cache (same cache entries)
+        
+        Only the API call is awaited; cache reads and writes are local
+        SQLite calls.
+        
+        Returns:
+            Tuple of (response_text, was_cached)
+        """
+        model = ModelSelector.get_model_for_task(task_type)
+        filled_prompt = render_template(prompt_template, params)
+        cache_key = cache_manager.generate_cache_key_from_bytes(filled_prompt.encode('utf-8'), model)
+        
+        cached_response = cache_manager.get_cached_response(cache_key)
+        if cached_response is not None:
+            self.cache_hits += 1
+            return cached_response, True
+        
+        response = await self._acall_api(model, filled_prompt, temperature, max_tokens,
+                                         json_mode=json_mode, response_schema=response_schema)
+        self.cache_misses += 1
+        
+        cache_manager.queue_response(
+            cache_key=cache_key,
+            response=response,
+            model=model,
+            prompt_template=prompt_template,
+            content_type=task_type.value
+        )
+        return response, False
+    
+    async def agenerate_json(self, task_type: TaskType,
+                             prompt_template: str,
+                             params: Dict[str, Any],
+                             temperature: float = 0.7,
+                             max_tokens: int = 4096,
+                             response_schema: Optional[Any] = None) -> tuple[Dict, bool]:
+        """
+        Async counterpart of generate_json
+        
+        Returns:
+            Tuple of (parsed_json_dict, was_cached)
+            
+        Raises:
+            ValueError: If response is not valid JSON
+        """
+        response_text, was_cached = await self.agenerate_with_cache(
+            task_type=task_type,
+            prompt_template=prompt_template,
+            params=params,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            json_mode=True,
+            response_schema=response_schema
+        )
+        return self._parse_json_response(response_text, was_cached)
+    
+    async def generate_many(self, specs: List[Dict],
+                            as_json: bool = False,
+                            max_concurrency: int = MAX_CONCURRENT_REQUESTS) -> List[tuple]:
+        """
+        Run several cached generations concurrently
+        
+        All cache lookups are done first, in one database query off the
+        event loop; only the misses are then sent to the API, overlapping
+        their network round trips. Identical requests are sent once.
+        
+        Args:
+            specs: agenerate_with_cache keyword arguments, one dict per request
+            as_json: Parse each response as JSON (as agenerate_json does)
+            max_concurrency: Most API calls in flight at once (keeps bursts
+                under the provider's rate limit)
+        
+        Returns:
+            One (response, was_cached) tuple per spec, in spec order
+        """
+        # Render and key every request as agenerate_with_cache does
+        requests = []
+        for spec in specs:
+            model = ModelSelector.get_model_for_task(spec['task_type'])
+            filled_prompt = render_template(spec['prompt_template'], spec['params'])
+            cache_key = cache_manager.generate_cache_key_from_bytes(filled_prompt.encode('utf-8'), model)
+            requests.append((spec, model, filled_prompt, cache_key))
+        
+        cached = await cache_manager.aget_many_cached_responses([r[3] for r in requests])
+        
+        misses = {}
+        for spec, model, filled_prompt, cache_key in requests:
+            if cache_key not in cached and cache_key not in misses:
+                misses[cache_key] = (spec, model, filled_prompt)
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def fetch(cache_key: str, spec: Dict, model: str, filled_prompt: str) -> str:
+            async with semaphore:
+                response = await self._acall_api(
+                    model, filled_prompt,
+                    spec.get('temperature', 0.7), spec.get('max_tokens', 4096),
+                    json_mode=as_json, response_schema=spec.get('response_schema')
+                )
+            
+            # Stored as each call finishes, so one failure doesn't lose the rest
+            self.cache_misses += 1
+            cache_manager.queue_response(
+                cache_key=cache_key,
+                response=response,
+                model=model,
+                prompt_template=spec['prompt_template'],
+                content_type=spec['task_type'].value
+            )
+            return response
+        
+        responses = await asyncio.gather(
+            *(fetch(cache_key, *miss) for cache_key, miss in misses.items())
+        )
+        generated = dict(zip(misses, responses))
+        
+        results = []
+        for spec, model, filled_prompt, cache_key in requests:
+            if cache_key in cached:
+                self.cache_hits += 1
+                result = (cached[cache_key], True)
+            else:
+                result = (generated[cache_key], False)
+            results.append(self._parse_json_response(*result) if as_json else result)
+        
+        return results
+    
+    def generate_json_stream(self, task_type: TaskType,
+                             prompt_template: str,
+                             params: Dict[str, Any],
+                             temperature: float = 0.7,
+                             max_tokens: int = 4096,
+                             response_schema: Optional[Any] = None) -> Iterator[str]:
+        """
+        Stream the raw text of a JSON response, sharing generate_json's cache
+        
+        A cache hit yields the stored response as a single chunk. On a miss
+        the chunks are yielded as the model produces them, and the response
+        is cached once the received text parses as JSON, so a caller may stop
+        iterating as soon as it has a complete document.
+        
+        Args:
+            task_type: Type of task
+            prompt_template: Prompt template string
+            params: Parameters to fill template
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens in response
+            response_schema: Optional pydantic model the response must follow
+            
+        Yields:
+            Response text chunks (join them and pass through
+            extract_json_text before parsing)
+        """
+        chunks, _ = self.stream_json(task_type, prompt_template, params,
+                                     temperature, max_tokens, response_schema)
+        yield from chunks
+    
+    def stream_json(self, task_type: TaskType,
+                    prompt_template: str,
+                    params: Dict[str, Any],
+                    temperature: float = 0.7,
+                    max_tokens: int = 4096,
+                    response_schema: Optional[Any] = None) -> tuple[Iterator[str], bool]:
+        """
+        generate_json_stream that looks up the cache immediately and says
+        whether it hit, for callers that display the cache status
+        
+        Returns:
+            Tuple of (response text chunks, was_cached)
+        """
+        model = ModelSelector.get_model_for_task(task_type)
+        filled_prompt = render_template(prompt_template, params)
+        cache_key = cache_manager.generate_cache_key_from_bytes(filled_prompt.encode('utf-8'), model)
+        
+        cached_response = cache_manager.get_cached_response(cache_key)
+        if cached_response is not None:
+            self.cache_hits += 1
+            return iter([cached_response]), True
+        
+        self.cache_misses += 1
+        chunks = self._stream_and_cache(task_type, prompt_template, model, filled_prompt,
+                                        cache_key, temperature, max_tokens, response_schema)
+        return chunks, False
+    
+    def _stream_and_cache(self, task_type: TaskType, prompt_template: str,
+                          model: str, filled_prompt: str, cache_key: str,
+                          temperature: float, max_tokens: int,
+                          response_schema: Optional[Any]) -> Iterator[str]:
+        """Stream a JSON response from the API, caching it if it is complete"""
+        chunks = []
+        
+        try:
+            for chunk in self._stream_api(model, filled_prompt, temperature, max_tokens,
+                                          json_mode=True, response_schema=response_schema):
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            # Runs on exhaustion and when the caller stops early; a truncated
+            # or failed stream does not parse and is never cached
+            response = "".join(chunks)
+            try:
+                fastjson.loads(extract_json_text(response))
+            except json.JSONDecodeError:
+                pass
+            else:
+                cache_manager.queue_response(
+                    cache_key=cache_key,
+                    response=response,
+                    model=model,
+                    prompt_template=prompt_template,
+                    content_type=task_type.value
+                )
+    
+    def generate_questions_batch(self, specs: List[Dict],
+                                 rows_per_call: int = QUESTION_ROWS_PER_CALL) -> List[tuple[Dict, bool]]:
+        """
+        Generate practice questions for several topics with fewer API calls
+        
+        Each spec is cached exactly like the equivalent generate_questions call,
+        so earlier results are reused and later single calls hit the cache.
+        Only the misses are sent, up to rows_per_call specs per request, and the
+        combined response is split back per spec.
+        
+        Args:
+            specs: generate_questions keyword arguments, one dict per request
+            rows_per_call: Most specs combined into one API call
+        
+        Returns:
+            One (questions_dict, was_cached) tuple per spec, in spec order
+        """
+        model = ModelSelector.get_model_for_task(TaskType.QUESTION_GENERATION)
+        results: List[Optional[tuple[Dict, bool]]] = [None] * len(specs)
+        misses = []
+        
+        for index, spec in enumerate(specs):
+            params = {
+                'subject': spec['subject'],
+                'topic_name': spec['topic_name'],
+                'question_type': spec.get('question_type', 'MCQ'),
+                'difficulty': spec.get('difficulty', 'Medium'),
+                'count': spec.get('count', 5),
+                'exam_level': spec.get('exam_level', 'Main')
+            }
+            cache_key = cache_manager.generate_cache_key_from_bytes(
+                render_template(PromptTemplates.QUESTION_GENERATION, params).encode('utf-8'), model
+            )
+            
+            cached_response = cache_manager.get_cached_response(cache_key)
+            if cached_response is not None:
+                self.cache_hits += 1
+                results[index] = self._parse_json_response(cached_response, True)
+            else:
+                misses.append((index, params, cache_key))
+        
+        for start in range(0, len(misses), rows_per_call):
+            batch = misses[start:start + rows_per_call]
+            
+            requests = '\n'.join(
+                f"{number}. {params['count']} {params['question_type']} questions on "
+                f"{params['subject']} - {params['topic_name']} "
+                f"(Difficulty: {params['difficulty']}, JEE {params['exam_level']} level)"
+                for number, (_, params, _) in enumerate(batch)
+            )
+            response_text = self._call_api(
+                model,
+                render_template(PromptTemplates.BATCH_QUESTION_GENERATION, {'requests': requests}),
+                max_tokens=4096 * len(batch),
+                json_mode=True
+            )
+            self.cache_misses += len(batch)
+            
+            response_data, _ = self._parse_json_response(response_text, False)
+            entries = response_data.get('results', []) if isinstance(response_data, dict) else []
+            
+            # Demultiplex by request number
+            by_number = {
+                entry.get('index'): entry.get('questions', [])
+                for entry in entries
+                if isinstance(entry, dict)
+            }
+            
+            for number, (index, params, cache_key) in enumerate(batch):
+                questions = by_number.get(number) or []
+                result = {'questions': questions}
+                results[index] = (result, False)
+                
+                # Cache under the single-request key; empty results are retried
+                if questions:
+                    cache_manager.queue_response(
+                        cache_key=cache_key,
+                        response=fastjson.dumps(result),
+                        model=model,
+                        prompt_template=PromptTemplates.QUESTION_GENERATION,
+                        content_type=TaskType.QUESTION_GENERATION.value
+                    )
+        
+        return results
+    
+    def stream_text(self, model: str, prompt: str,
+                    temperature: float = 0.7,
+                    max_tokens: int = 4096) -> Iterator[str]:
+        """
+        Stream a response without caching it, e.g. for chat replies that
+        depend on the conversation so far
+        
+        Args:
+            model: Model name to use
+            prompt: Prompt text
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens in response
+            
+        Yields:
+            Response text chunks as they arrive
+        """
+        yield from self._stream_api(model, prompt, temperature, max_tokens)
+    
     def get_session_stats(self) -> Dict[str, Any]:
         """
         Get statistics for current session
@@ -271,6 +1015,35 @@ class GeminiClient:
         self.call_count = 0
         self.cache_hits = 0
         self.cache_misses = 0
+    
+    def prewarm(self, background: bool = True) -> None:
+        """
+        Open a pooled connection to the API before the first real request
+        
+        Issues a cheap metadata call (models.get) so the TCP + TLS handshake
+        is already done when a user asks for content. Failures are ignored;
+        the first real request simply connects as usual.
+        
+        Args:
+            background: Run the call on a daemon thread instead of blocking
+        """
+        def warm():
+            try:
+                self.client.models.get(model=config.DEFAULT_MODEL)
+            except Exception:
+                pass
+        
+        if background:
+            threading.Thread(target=warm, name="gemini-prewarm", daemon=True).start()
+        else:
+            warm()
+    
+    def close(self):
+        """Close the pooled HTTP connections (registered with atexit)"""
+        try:
+            self.client.close()
+        except Exception:
+            pass
 
 
 # Singleton instance
@@ -289,8 +1062,6 @@ def generate_lesson(subject: str, topic_name: str, chapter_name: str,
     Returns:
         Tuple of (lesson_dict, was_cached)
     """
-    from src.llm.prompts import PromptTemplates
-    
     return gemini_client.generate_json(
         task_type=TaskType.LESSON_GENERATION,
         prompt_template=PromptTemplates.LESSON_GENERATION,
@@ -302,7 +1073,35 @@ def generate_lesson(subject: str, topic_name: str, chapter_name: str,
             'student_level': student_level
         },
         max_tokens=8192,  # Lessons need more tokens
-        force_refresh=force_refresh
+        force_refresh=force_refresh,
+        response_schema=LessonResponse
+    )
+
+
+def generate_lesson_stream(subject: str, topic_name: str, chapter_name: str,
+                           difficulty: str = "Medium",
+                           student_level: str = "intermediate") -> tuple[Iterator[str], bool]:
+    """
+    Stream a lesson for a topic as it is generated (same cache as generate_lesson)
+    
+    The explanation comes first in the response; partial_json_string
+    decodes it from the text received so far.
+    
+    Returns:
+        Tuple of (response text chunks, was_cached)
+    """
+    return gemini_client.stream_json(
+        task_type=TaskType.LESSON_GENERATION,
+        prompt_template=PromptTemplates.LESSON_GENERATION,
+        params={
+            'subject': subject,
+            'topic_name': topic_name,
+            'chapter_name': chapter_name,
+            'difficulty': difficulty,
+            'student_level': student_level
+        },
+        max_tokens=8192,
+        response_schema=LessonResponse
     )
 
 
@@ -317,8 +1116,6 @@ def generate_questions(subject: str, topic_name: str,
     Returns:
         Tuple of (questions_dict, was_cached)
     """
-    from src.llm.prompts import PromptTemplates
-    
     return gemini_client.generate_json(
         task_type=TaskType.QUESTION_GENERATION,
         prompt_template=PromptTemplates.QUESTION_GENERATION,
@@ -329,10 +1126,24 @@ def generate_questions(subject: str, topic_name: str,
             'difficulty': difficulty,
             'count': count,
             'exam_level': exam_level
-        }
+        },
+        response_schema=QuestionSetResponse
     )
 
 
+def generate_questions_batch(specs: List[Dict],
+                             rows_per_call: int = QUESTION_ROWS_PER_CALL) -> List[tuple[Dict, bool]]:
+    """
+    Generate practice questions for several topics with fewer API calls
+    
+    See GeminiClient.generate_questions_batch.
+    
+    Returns:
+        One (questions_dict, was_cached) tuple per spec, in spec order
+    """
+    return gemini_client.generate_questions_batch(specs, rows_per_call)
+
+
 def get_hint(question_text: str, subject: str, topic_name: str) -> tuple[str, bool]:
     """
     Get a hint for a question
@@ -340,8 +1151,6 @@ def get_hint(question_text: str, subject: str, topic_name: str) -> tuple[str, bo
     Returns:
         Tuple of (hint_text, was_cached)
     """
-    from src.llm.prompts import PromptTemplates
-    
     return gemini_client.generate_with_cache(
         task_type=TaskType.HINT_GENERATION,
         prompt_template=PromptTemplates.HINT_GENERATION,
@@ -361,8 +1170,6 @@ def explain_concept(subject: str, topic_name: str, concept: str,
     Returns:
         Tuple of (explanation_text, was_cached)
     """
-    from src.llm.prompts import PromptTemplates
-    
     return gemini_client.generate_with_cache(
         task_type=TaskType.CONCEPT_EXPLANATION,
         prompt_template=PromptTemplates.CONCEPT_EXPLANATION,
@@ -4,7 +4,8 @@ Chooses the appropriate model based on task complexity to minimize API costs
 """
 
 from enum import Enum
-from typing import Dict
+from typing import Dict, List, Optional
+from pydantic import BaseModel
 
 
 class TaskType(Enum):
@@ -27,6 +28,46 @@ class TaskType(Enum):
     QUICK_ANSWER = "quick_answer"
 
 
+# ===== RESPONSE SCHEMAS =====
+# Passed as response_schema to generate_json so the API returns JSON in
+# exactly the shape the matching prompt in prompts.py describes
+
+class LessonExample(BaseModel):
+    """Worked example in a lesson"""
+    problem: str
+    solution: str
+
+
+class LessonResponse(BaseModel):
+    """Response to PromptTemplates.LESSON_GENERATION"""
+    explanation: str
+    key_points: List[str]
+    formulas: List[str]
+    examples: List[LessonExample]
+    common_mistakes: List[str]
+    jee_tips: List[str]
+
+
+class GeneratedQuestion(BaseModel):
+    """One question from PromptTemplates.QUESTION_GENERATION"""
+    question_text: str
+    type: str
+    correct_answer: str
+    explanation: str
+    difficulty: str
+    marks: int
+    options: Optional[List[str]] = None  # MCQ only
+    units: Optional[str] = None  # NUMERIC only
+    key_points: Optional[List[str]] = None  # DESCRIPTIVE only
+    sample_answer: Optional[str] = None  # DESCRIPTIVE only
+    marking_scheme: Optional[str] = None  # DESCRIPTIVE only
+
+
+class QuestionSetResponse(BaseModel):
+    """Response to PromptTemplates.QUESTION_GENERATION"""
+    questions: List[GeneratedQuestion]
+
+
 class ModelSelector:
     """Selects the appropriate Gemini model based on task requirements."""
     
@@ -3,7 +3,9 @@ Prompt templates for LLM interactions
 Organized by task type with clear, structured prompts
 """
 
-from typing import Dict, Any
+import string
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
 
 
 class PromptTemplates:
@@ -107,6 +109,60 @@ Format as valid JSON (ensure all strings are properly escaped):
     ]
 }}"""
     
+    # Several QUESTION_GENERATION requests in one call; {requests} is a
+    # numbered list, one line per request
+    BATCH_QUESTION_GENERATION = """You are creating JEE practice questions for several requests at once.
+
+Requests:
+{requests}
+
+For MCQ questions, provide:
+- Question text
+- 4 options (A, B, C, D)
+- Correct answer
+- Brief explanation
+
+For NUMERIC questions, provide:
+- Question text
+- Correct numerical answer
+- Units (if applicable)
+- Brief explanation
+
+For DESCRIPTIVE questions, provide:
+- Question text
+- Key points that should be in the answer
+- Sample answer
+- Marking scheme
+
+IMPORTANT: 
+- For mathematical expressions, use simple text notation or Unicode symbols instead of LaTeX
+- Avoid backslashes in text (they break JSON parsing)
+- Use ^ for superscripts (e.g., x^2 instead of x²)
+- Use / for fractions (e.g., 1/2 instead of ½)
+- "index" must match the request number, and each request must get exactly the number of questions it asks for
+
+Format as valid JSON (ensure all strings are properly escaped):
+{{
+    "results": [
+        {{
+            "index": 0,
+            "questions": [
+                {{
+                    "question_text": "...",
+                    "type": "MCQ",
+                    "options": ["A", "B", "C", "D"],  // for MCQ only
+                    "correct_answer": "...",
+                    "explanation": "...",
+                    "difficulty": "Medium",
+                    "marks": 4
+                }},
+                ...
+            ]
+        }},
+        ...
+    ]
+}}"""
+    
     # ===== HINT GENERATION =====
     
     HINT_GENERATION = """A student is stuck on this JEE question:
@@ -228,8 +284,45 @@ If the question is off-topic, gently redirect to JEE preparation topics."""
         Returns:
             Filled template string
         """
-        template = cls.get_template(template_name)
-        return template.format(**kwargs)
+        return render_template(cls.get_template(template_name), kwargs)
+
+
+@lru_cache(maxsize=64)
+def _compile_template(template: str) -> Optional[Tuple[Tuple[str, Optional[str]], ...]]:
+    """
+    Split a template into (literal, field_name) segments, parsed once
+    
+    Returns None for templates using anything beyond plain {name} fields
+    (format specs, conversions, positional or dotted fields), which
+    render_template leaves to str.format.
+    """
+    segments = []
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        if field is not None and (spec or conversion or not field.isidentifier()):
+            return None
+        segments.append((literal, field))
+    return tuple(segments)
+
+
+def render_template(template: str, params: Dict[str, Any]) -> str:
+    """
+    Fill a template, equivalent to template.format(**params)
+    
+    The template is parsed once and cached, so each call only joins the
+    literal text with the formatted values instead of re-parsing the
+    whole prompt.
+    
+    Raises:
+        KeyError: If a field has no value in params
+    """
+    segments = _compile_template(template)
+    if segments is None:
+        return template.format(**params)
+    
+    return ''.join([
+        literal + format(params[field]) if field is not None else literal
+        for literal, field in segments
+    ])
 
 
 # Convenience functions
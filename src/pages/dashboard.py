@@ -4,10 +4,54 @@ Enhanced Analytics Dashboard
 
 import streamlit as st
 from src.core.auth import SessionManager
-from src.data.db import Database
+from src.core.bootstrap import get_db, get_analytics
 from src.core.analytics import AnalyticsEngine
 
 
+# Profile-derived analytics are cached per (user_id, profiles_version). The
+# version is read from student_profiles (Database.get_profiles_version), so
+# any write to the user's profiles - from any session or page - changes the
+# key, while sidebar reruns reuse the results after one cheap query.
+# Arguments prefixed with an underscore are excluded from the cache key.
+#
+# Profiles are fetched at most once per version and handed to every
+# profile-based method, instead of each method querying them again.
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_profiles(_analytics: AnalyticsEngine, user_id: int, profiles_version: tuple):
+    return _analytics.get_profiles(user_id)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_overview(_analytics: AnalyticsEngine, _profiles, user_id: int, profiles_version: tuple):
+    return _analytics.get_learning_overview(user_id, profiles=_profiles)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_subject_breakdown(_analytics: AnalyticsEngine, _profiles, user_id: int, profiles_version: tuple):
+    return _analytics.get_subject_breakdown(user_id, profiles=_profiles)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_mastery_distribution(_analytics: AnalyticsEngine, user_id: int, profiles_version: tuple):
+    return _analytics.get_mastery_distribution(user_id)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_weak_topics(_analytics: AnalyticsEngine, user_id: int, profiles_version: tuple, limit: int):
+    return _analytics.get_weak_topics(user_id, limit=limit)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_strong_topics(_analytics: AnalyticsEngine, user_id: int, profiles_version: tuple, limit: int):
+    return _analytics.get_strong_topics(user_id, limit=limit)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_recommendations(_analytics: AnalyticsEngine, _profiles, user_id: int, profiles_version: tuple, limit: int):
+    return _analytics.get_topic_recommendations(user_id, limit=limit, profiles=_profiles)
+
+
 def show_dashboard():
     """Display enhanced analytics dashboard"""
     
@@ -17,7 +61,7 @@ def show_dashboard():
         st.stop()
     
     user_id = SessionManager.get_user_id(st.session_state)
-    db = Database()
+    db = get_db()
     user = db.get_user_by_id(user_id)
     
     if not user:
@@ -25,7 +69,9 @@ def show_dashboard():
         st.stop()
     
     # Initialize analytics
-    analytics = AnalyticsEngine(db)
+    analytics = get_analytics(db)
+    version = db.get_profiles_version(user_id)
+    profiles = _cached_profiles(analytics, user_id, version)
     
     # ===== HEADER =====
     st.title(f"Welcome back, {user['name']}! 👋")
@@ -36,7 +82,7 @@ def show_dashboard():
     # ===== OVERVIEW METRICS =====
     st.subheader("📊 Learning Overview")
     
-    overview = analytics.get_learning_overview(user_id)
+    overview = _cached_overview(analytics, profiles, user_id, version)
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -98,7 +144,7 @@ def show_dashboard():
     if overview['topics_started'] > 0:
         st.subheader("📚 Subject-wise Performance")
         
-        subject_stats = analytics.get_subject_breakdown(user_id)
+        subject_stats = _cached_subject_breakdown(analytics, profiles, user_id, version)
         
         if subject_stats:
             col1, col2, col3 = st.columns(3)
@@ -123,7 +169,7 @@ def show_dashboard():
     if overview['topics_started'] > 0:
         st.subheader("📈 Mastery Distribution")
         
-        distribution = analytics.get_mastery_distribution(user_id)
+        distribution = _cached_mastery_distribution(analytics, user_id, version)
         
         col1, col2 = st.columns([2, 1])
         
@@ -148,7 +194,7 @@ def show_dashboard():
         
         with col1:
             st.subheader("🔴 Topics Needing Attention")
-            weak_topics = analytics.get_weak_topics(user_id, limit=5)
+            weak_topics = _cached_weak_topics(analytics, user_id, version, limit=5)
             
             if weak_topics:
                 for topic in weak_topics:
@@ -164,7 +210,7 @@ def show_dashboard():
         
         with col2:
             st.subheader("🟢 Strong Topics")
-            strong_topics = analytics.get_strong_topics(user_id, limit=5)
+            strong_topics = _cached_strong_topics(analytics, user_id, version, limit=5)
             
             if strong_topics:
                 for topic in strong_topics:
@@ -183,7 +229,7 @@ def show_dashboard():
     # ===== RECOMMENDATIONS =====
     st.subheader("💡 What to Study Next")
     
-    recommendations = analytics.get_topic_recommendations(user_id, limit=5)
+    recommendations = _cached_recommendations(analytics, profiles, user_id, version, limit=5)
     
     if recommendations:
         for rec in recommendations:
@@ -210,9 +256,9 @@ def show_dashboard():
             for activity in activities[:10]:
                 col1, col2 = st.columns([3, 1])
                 with col1:
-                    st.write(f"**{activity['topic_name']}** ({activity['subject']})")
+                    st.write(f"**{activity.topic_name}** ({activity.subject})")
                 with col2:
-                    timestamp = activity['timestamp']
+                    timestamp = activity.timestamp
                     st.caption(timestamp[:10] if isinstance(timestamp, str) else str(timestamp))
         else:
             st.info("No recent activity in the last 7 days. Start learning!")
@@ -19,6 +19,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 
 from src.data.db import Database
 from src.core.auth import SessionManager
+from src.core.bootstrap import get_db
 
 
 def init_learn_state():
@@ -170,17 +171,42 @@ def render_chat_interface(db: Database, user_id: int, topic_id: int):
 
 def generate_initial_lesson(topic: Dict):
     """Generate initial lesson content using LLM"""
-    from src.llm.client import generate_lesson
+    from src.llm.client import (
+        generate_lesson, generate_lesson_stream, partial_json_string, extract_json_text
+    )
+    from src.utils import fastjson
+    
+    lesson_args = dict(
+        subject=topic['subject'],
+        topic_name=topic['topic_name'],
+        chapter_name=topic['chapter_name'],
+        difficulty=topic.get('difficulty_level', 'Medium'),
+        student_level='intermediate'  # TODO: Get from student profile
+    )
     
     try:
-        # Generate lesson
-        lesson_data, was_cached = generate_lesson(
-            subject=topic['subject'],
-            topic_name=topic['topic_name'],
-            chapter_name=topic['chapter_name'],
-            difficulty=topic.get('difficulty_level', 'Medium'),
-            student_level='intermediate'  # TODO: Get from student profile
-        )
+        preview = st.empty()
+        try:
+            # Stream the lesson, showing the explanation as it is written
+            chunks, was_cached = generate_lesson_stream(**lesson_args)
+            
+            received = []
+            shown = None
+            for chunk in chunks:
+                received.append(chunk)
+                explanation = partial_json_string(''.join(received), 'explanation')
+                if explanation and explanation != shown:
+                    preview.markdown(explanation)
+                    shown = explanation
+            
+            lesson_data = fastjson.loads(extract_json_text(''.join(received)))
+        except Exception as e:
+            # Streaming calls are not retried, so a dropped or truncated
+            # stream falls back to generate_lesson, which retries
+            print(f"Lesson stream failed, generating without streaming: {e}")
+            lesson_data, was_cached = generate_lesson(**lesson_args)
+        finally:
+            preview.empty()  # display_lesson renders the full lesson
         
         # Store in session state
         st.session_state.current_lesson = lesson_data
@@ -280,8 +306,9 @@ def handle_user_question(db: Database, user_id: int, topic: Dict, question: str)
                 if not conversation_history:
                     conversation_history = "This is the start of the conversation."
                 
-                # Generate response WITHOUT caching (chat is conversational/context-dependent)
-                response = gemini_client._call_api(
+                # Generate response WITHOUT caching (chat is conversational/context-dependent),
+                # displaying it as it streams in
+                response = st.write_stream(gemini_client.stream_text(
                     model='gemini-2.5-flash',  # Use Flash for chat
                     prompt=PromptTemplates.CHAT_QA.format(
                         topic_name=topic['topic_name'],
@@ -290,10 +317,7 @@ def handle_user_question(db: Database, user_id: int, topic: Dict, question: str)
                         conversation_history=conversation_history
                     ),
                     temperature=0.7
-                )
-                
-                # Display response
-                st.markdown(response)
+                ))
                 
                 # Add to chat history
                 st.session_state.chat_history.append({
@@ -465,7 +489,7 @@ def main():
     init_learn_state()
     
     # Get database connection
-    db = Database()
+    db = get_db()
     
     # Render appropriate interface
     if st.session_state.learning_mode == 'chat' and st.session_state.selected_topic_id:
@@ -8,6 +8,7 @@ import time
 
 from src.data.db import Database
 from src.core.auth import SessionManager
+from src.core.bootstrap import get_db
 from src.core.simple_quiz import SimpleQuizGenerator
 
 
@@ -174,7 +175,7 @@ def show_quiz_taking():
         
         if st.button("Submit Quiz", type="primary", use_container_width=True, disabled=answered == 0):
             # Grade the quiz
-            db = Database()
+            db = get_db()
             user_id = SessionManager.get_user_id(st.session_state)
             quiz_gen = SimpleQuizGenerator(db)
             
@@ -301,7 +302,7 @@ def main():
     # Initialize state
     init_quiz_state()
     
-    db = Database()
+    db = get_db()
     user_id = SessionManager.get_user_id(st.session_state)
     
     # Route to appropriate screen
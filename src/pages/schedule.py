@@ -7,8 +7,8 @@ from datetime import datetime, timedelta, date
 from typing import List, Optional
 
 from src.core.scheduler import StudyScheduler, DailySchedule
-from src.data.db import Database
 from src.core.auth import SessionManager
+from src.core.bootstrap import get_db
 
 
 def show_schedule_page():
@@ -21,7 +21,7 @@ def show_schedule_page():
         st.stop()
     
     # Initialize
-    db = Database()
+    db = get_db()
     user_id = SessionManager.get_user_id(st.session_state)
     
     if not user_id:
@@ -30,6 +30,14 @@ def show_schedule_page():
     
     scheduler = StudyScheduler(db, user_id)
     
+    try:
+        render_schedule(scheduler, user_id)
+    finally:
+        scheduler.close()
+
+
+def render_schedule(scheduler: StudyScheduler, user_id: int):
+    """Render the schedule controls and daily plans"""
     # Sidebar controls
     with st.sidebar:
         st.header("⚙️ Schedule Settings")
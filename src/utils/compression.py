@@ -0,0 +1,59 @@
+"""
+Compression helpers for large cached text
+
+Responses are compressed with zstandard when it is installed and with zlib
+otherwise. Compressed values are bytes and short or incompressible text is
+kept as str, so callers can store bytes in a BLOB column and str in a TEXT
+one. The codec is detected from the frame header, so values written by
+either codec can be read back where zstandard is available.
+"""
+
+import zlib
+from typing import Optional, Union
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+    _ZSTD_COMPRESSOR = zstandard.ZstdCompressor(level=3)
+    _ZSTD_DECOMPRESSOR = zstandard.ZstdDecompressor()
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+# Text shorter than this (in UTF-8 bytes) is stored as-is
+MIN_COMPRESS_BYTES = 1024
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+def compress_text(text: str) -> Union[str, bytes]:
+    """Compress text if it is large enough to benefit, else return it unchanged"""
+    data = text.encode('utf-8')
+    if len(data) < MIN_COMPRESS_BYTES:
+        return text
+    
+    if ZSTD_AVAILABLE:
+        packed = _ZSTD_COMPRESSOR.compress(data)
+    else:
+        packed = zlib.compress(data)
+    
+    return packed if len(packed) < len(data) else text
+
+
+def decompress_text(value: Union[str, bytes]) -> Optional[str]:
+    """
+    Reverse compress_text
+    
+    Returns:
+        The original text, or None if the value was written with zstandard
+        and it is not installed here
+    """
+    if isinstance(value, str):
+        return value
+    
+    if value[:4] == ZSTD_MAGIC:
+        if not ZSTD_AVAILABLE:
+            return None
+        return _ZSTD_DECOMPRESSOR.decompress(value).decode('utf-8')
+    
+    return zlib.decompress(value).decode('utf-8')
@@ -41,6 +41,15 @@ class Config:
         "flash_lite": "gemini-2.5-flash-lite"  # Simple tasks
     }
     
+    # Client-side rate limits per model tier as (requests/min, tokens/min),
+    # applied before each API call; 0 disables a limit. Defaults are the
+    # Gemini API free-tier limits - raise them for paid tiers.
+    RATE_LIMITS = {
+        "pro": (int(os.getenv("GEMINI_PRO_RPM", "5")), int(os.getenv("GEMINI_PRO_TPM", "250000"))),
+        "flash": (int(os.getenv("GEMINI_FLASH_RPM", "10")), int(os.getenv("GEMINI_FLASH_TPM", "250000"))),
+        "flash_lite": (int(os.getenv("GEMINI_FLASH_LITE_RPM", "15")), int(os.getenv("GEMINI_FLASH_LITE_TPM", "250000")))
+    }
+    
     @classmethod
     def validate(cls):
         """Validate required configuration"""
@@ -0,0 +1,30 @@
+"""
+JSON helpers backed by orjson when it is installed
+
+orjson is several times faster than the standard library for the small
+payloads the app serializes on hot paths. Both functions fall back to the
+json module, and always return/accept str so callers can bind the result
+to SQLite TEXT columns either way.
+"""
+
+import json
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def dumps(obj) -> str:
+    """Serialize obj to a JSON string"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
+def loads(data):
+    """Parse a JSON string or bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
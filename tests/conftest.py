@@ -0,0 +1,51 @@
+"""
+Shared pytest setup
+
+The LLM client refuses to import without an API key. The unit tests never
+call the API, so they get a placeholder key; test_llm.py does call it and is
+only collected when a real key is configured.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from dotenv import load_dotenv
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+load_dotenv(dotenv_path=PROJECT_ROOT / ".env")
+
+collect_ignore = []
+if not os.getenv("GEMINI_API_KEY"):
+    collect_ignore.append("test_llm.py")
+    os.environ["GEMINI_API_KEY"] = "test-key"
+
+from src.data.db import Database
+from src.data.init_db import init_database_silent
+from src.data.seed_jee_data import seed_jee_topics_silent
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Database on a fresh file with the schema applied"""
+    db_path = tmp_path / "test.db"
+    assert init_database_silent(db_path)
+    
+    database = Database(db_path)
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def user_id(database):
+    """A student in the test database"""
+    return database.create_user("student", "x", "Student", daily_hours=4)
+
+
+@pytest.fixture
+def topics(database):
+    """The JEE syllabus, seeded into the test database"""
+    assert seed_jee_topics_silent(database.db_path)
+    return database.get_all_topics()
@@ -0,0 +1,159 @@
+"""
+Tests for AnalyticsEngine against the original Python implementations
+"""
+
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from src.core.analytics import AnalyticsEngine
+
+
+@pytest.fixture
+def analytics(database):
+    return AnalyticsEngine(database)
+
+
+def add_study_days(database, user_id, days):
+    """One chat message per (possibly repeated) study day"""
+    with database.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO chat_history (user_id, role, message, timestamp) VALUES (?, 'user', 'hi', ?)",
+            [(user_id, f"{day.isoformat()} 10:{i % 60:02d}:00") for i, day in enumerate(days)]
+        )
+        conn.commit()
+
+
+def original_streak(days, today):
+    """The Python loops get_study_streak replaced"""
+    dates = sorted({day.isoformat() for day in days}, reverse=True)
+    if not dates:
+        return {'current_streak': 0, 'longest_streak': 0, 'last_study_date': None}
+    
+    current_streak = 0
+    for i, date_str in enumerate(dates):
+        if datetime.strptime(date_str, '%Y-%m-%d').date() == today - timedelta(days=i):
+            current_streak += 1
+        else:
+            break
+    
+    longest_streak = 1
+    current_run = 1
+    for i in range(1, len(dates)):
+        prev_date = datetime.strptime(dates[i-1], '%Y-%m-%d').date()
+        curr_date = datetime.strptime(dates[i], '%Y-%m-%d').date()
+        if (prev_date - curr_date).days == 1:
+            current_run += 1
+            longest_streak = max(longest_streak, current_run)
+        else:
+            current_run = 1
+    
+    return {
+        'current_streak': current_streak,
+        'longest_streak': longest_streak,
+        'last_study_date': dates[0]
+    }
+
+
+class TestStudyStreak:
+    def test_no_history(self, analytics, user_id):
+        assert analytics.get_study_streak(user_id) == original_streak([], date.today())
+    
+    def test_current_run_ends_today(self, database, analytics, user_id):
+        today = date.today()
+        days = [today, today, today - timedelta(days=1), today - timedelta(days=2),
+                today - timedelta(days=5)]
+        add_study_days(database, user_id, days)
+        
+        streak = analytics.get_study_streak(user_id)
+        assert streak == {'current_streak': 3, 'longest_streak': 3,
+                          'last_study_date': today.isoformat()}
+    
+    def test_run_ending_yesterday_is_not_current(self, database, analytics, user_id):
+        yesterday = date.today() - timedelta(days=1)
+        add_study_days(database, user_id, [yesterday, yesterday - timedelta(days=1)])
+        
+        streak = analytics.get_study_streak(user_id)
+        assert streak['current_streak'] == 0
+        assert streak['longest_streak'] == 2
+    
+    def test_other_users_are_ignored(self, database, analytics, user_id):
+        other = database.create_user("other", "x", "Other")
+        add_study_days(database, other, [date.today()])
+        
+        assert analytics.get_study_streak(user_id)['current_streak'] == 0
+    
+    @pytest.mark.parametrize("seed", range(20))
+    def test_matches_original(self, database, analytics, user_id, seed):
+        rng = random.Random(seed)
+        today = date.today()
+        days = [today - timedelta(days=rng.randrange(40)) for _ in range(rng.randrange(1, 40))]
+        add_study_days(database, user_id, days)
+        
+        assert analytics.get_study_streak(user_id) == original_streak(days, today)
+
+
+def add_profiles(database, user_id, mastery_by_topic):
+    with database.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO student_profiles (user_id, topic_id, mastery_score) VALUES (?, ?, ?)",
+            [(user_id, topic_id, mastery) for topic_id, mastery in mastery_by_topic.items()]
+        )
+        conn.commit()
+
+
+def original_recommendations(database, user_id, limit):
+    """The sort get_topic_recommendations replaced"""
+    profiles = database.get_all_student_profiles(user_id)
+    studied_topic_ids = {p['topic_id'] for p in profiles}
+    
+    weak_topics = [
+        {
+            'topic': database.get_topic_by_id(p['topic_id']),
+            'reason': f"Low mastery ({p['mastery_score']*100:.0f}%)",
+            'priority': p.get('exam_weight', 1.0) * (1 - p['mastery_score'])
+        }
+        for p in profiles if p['mastery_score'] < 0.5
+    ]
+    unstudied = [
+        {'topic': t, 'reason': "Not started yet - High JEE importance",
+         'priority': t.get('exam_weight', 1.0)}
+        for t in database.get_all_topics() if t['id'] not in studied_topic_ids
+    ]
+    
+    recommendations = weak_topics + unstudied
+    recommendations.sort(key=lambda x: x['priority'], reverse=True)
+    return recommendations[:limit]
+
+
+def summary(recommendations):
+    return [(r['topic']['id'], r['reason'], pytest.approx(r['priority'])) for r in recommendations]
+
+
+class TestTopicRecommendations:
+    def test_no_candidates(self, database, analytics, user_id, topics):
+        add_profiles(database, user_id, {t['id']: 0.9 for t in topics})
+        assert analytics.get_topic_recommendations(user_id) == []
+    
+    def test_ties_keep_weak_topics_first(self, database, analytics, user_id, topics):
+        # Mastery 0 gives priority 1.0, tying with unstudied weight-1.0
+        # topics; the original stable sort listed the weak topics first
+        add_profiles(database, user_id, {t['id']: 0.0 for t in topics[::2]})
+        
+        limit = len(topics)
+        recommendations = analytics.get_topic_recommendations(user_id, limit=limit)
+        assert summary(recommendations) == summary(original_recommendations(database, user_id, limit))
+    
+    @pytest.mark.parametrize("limit", [0, 1, 5, 20, 1000])
+    @pytest.mark.parametrize("seed", range(5))
+    def test_matches_original(self, database, analytics, user_id, topics, seed, limit):
+        rng = random.Random(seed)
+        studied = rng.sample(topics, rng.randrange(len(topics)))
+        # Coarse mastery values so priorities tie often
+        add_profiles(database, user_id, {
+            t['id']: rng.choice([0.0, 0.1, 0.25, 0.4, 0.5, 0.8]) for t in studied
+        })
+        
+        assert summary(analytics.get_topic_recommendations(user_id, limit=limit)) == \
+            summary(original_recommendations(database, user_id, limit))
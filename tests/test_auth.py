@@ -0,0 +1,49 @@
+"""
+Tests for AuthService input validation against the original str checks
+"""
+
+import pytest
+
+from src.core.auth import AuthService
+
+
+def original_username_error(username):
+    if len(username) < 3:
+        return "Username must be at least 3 characters long"
+    if len(username) > 50:
+        return "Username must be less than 50 characters"
+    if not username.isalnum() and '_' not in username:
+        return "Username can only contain letters, numbers, and underscores"
+    if not username[0].isalpha():
+        return "Username must start with a letter"
+    return ""
+
+
+def original_email_error(email):
+    if not email:
+        return ""
+    if '@' not in email or '.' not in email:
+        return "Invalid email format"
+    if len(email) > 255:
+        return "Email must be less than 255 characters"
+    return ""
+
+
+@pytest.mark.parametrize("username", [
+    "", "ab", "abc", "a" * 50, "a" * 51, "student_1", "_student", "1student",
+    "ab-c_", "ab-c", "ab c", "Ödön", "ännie_", "学生学生", "x²y", "a\n_", "___",
+])
+def test_username_rules_unchanged(username):
+    valid, error = AuthService.validate_username(username)
+    assert error == original_username_error(username)
+    assert valid == (error == "")
+
+
+@pytest.mark.parametrize("email", [
+    "", "a@b.c", "student@example.com", "no-at.example.com", "no-dot@example",
+    "@.", "a.b@c", "a b@c.d", "a@@b..c", "x" * 250 + "@b.com", "é@ü.ß", "a@b\n.c",
+])
+def test_email_rules_unchanged(email):
+    valid, error = AuthService.validate_email(email)
+    assert error == original_email_error(email)
+    assert valid == (error == "")
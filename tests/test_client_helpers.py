@@ -0,0 +1,114 @@
+"""
+Tests for the LLM client's helpers: streaming JSON field extraction, the
+client-side rate limiter and the circuit breaker
+"""
+
+import json
+
+import pytest
+
+from src.llm import client as client_module
+from src.llm.client import CircuitBreaker, RateLimiter, partial_json_string
+
+
+class TestPartialJsonString:
+    RESPONSE = json.dumps({
+        'explanation': 'Velocity is "speed" with direction\né \\ done',
+        'key_points': ['a', 'b'],
+    })
+    
+    def test_complete_response(self):
+        assert partial_json_string(self.RESPONSE, 'explanation') == \
+            json.loads(self.RESPONSE)['explanation']
+    
+    def test_every_prefix_decodes_to_a_prefix_of_the_value(self):
+        value = json.loads(self.RESPONSE)['explanation']
+        for end in range(len(self.RESPONSE) + 1):
+            text = partial_json_string(self.RESPONSE[:end], 'explanation')
+            if text is not None:
+                assert value.startswith(text), self.RESPONSE[:end]
+    
+    def test_field_not_started(self):
+        assert partial_json_string('', 'explanation') is None
+        assert partial_json_string('{"explanation"', 'explanation') is None
+        assert partial_json_string('{"explanation": ', 'explanation') is None
+    
+    def test_field_just_opened(self):
+        assert partial_json_string('{"explanation": "', 'explanation') == ''
+    
+    def test_inside_escape_sequence(self):
+        assert partial_json_string('{"explanation": "caf\\u00', 'explanation') == 'caf'
+    
+    def test_non_string_field(self):
+        assert partial_json_string('{"explanation": [1, 2]}', 'explanation') is None
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic for the client module"""
+    now = [1000.0]
+    monkeypatch.setattr(client_module.time, 'monotonic', lambda: now[0])
+    return now
+
+
+class TestRateLimiter:
+    def test_unlisted_model_is_unlimited(self, clock):
+        limiter = RateLimiter({'model': (1, 0)})
+        for _ in range(10):
+            assert limiter._reserve('other', 10_000) == 0
+    
+    def test_requests_per_minute(self, clock):
+        limiter = RateLimiter({'model': (2, 0)})
+        assert limiter._reserve('model', 100) == 0
+        assert limiter._reserve('model', 100) == 0
+        # The bucket refills at 2 per minute, so the third call waits 30s
+        assert limiter._reserve('model', 100) == pytest.approx(30)
+        
+        clock[0] += 60
+        assert limiter._reserve('model', 100) == pytest.approx(0)
+    
+    def test_tokens_per_minute(self, clock):
+        limiter = RateLimiter({'model': (0, 1000)})
+        assert limiter._reserve('model', 1000) == 0
+        assert limiter._reserve('model', 500) == pytest.approx(30)
+    
+    def test_call_larger_than_bucket_waits_for_a_full_bucket(self, clock):
+        limiter = RateLimiter({'model': (0, 1000)})
+        assert limiter._reserve('model', 5000) == 0
+        assert limiter._reserve('model', 5000) == pytest.approx(60)
+    
+    def test_longest_wait_of_both_buckets(self, clock):
+        limiter = RateLimiter({'model': (60, 1000)})
+        limiter._reserve('model', 1000)
+        # Requests would allow another call after 1s, tokens only after 30s
+        assert limiter._reserve('model', 500) == pytest.approx(30)
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_failures(self, clock):
+        breaker = CircuitBreaker(threshold=2, cooldown=30)
+        breaker.record_failure()
+        breaker.check()
+        
+        breaker.record_failure()
+        with pytest.raises(Exception, match="paused"):
+            breaker.check()
+    
+    def test_success_resets_the_failure_count(self, clock):
+        breaker = CircuitBreaker(threshold=2, cooldown=30)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.check()
+    
+    def test_closes_after_cooldown_and_reopens_on_next_failure(self, clock):
+        breaker = CircuitBreaker(threshold=2, cooldown=30)
+        breaker.record_failure()
+        breaker.record_failure()
+        
+        clock[0] += 30
+        breaker.check()
+        
+        breaker.record_failure()
+        with pytest.raises(Exception):
+            breaker.check()
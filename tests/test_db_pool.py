@@ -0,0 +1,90 @@
+"""
+Tests for Database connection pooling
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+
+def test_nested_blocks_share_one_connection(database):
+    with database.get_connection() as outer:
+        with database.get_connection() as inner:
+            assert inner is outer
+
+
+def test_connections_are_reused_across_threads(database):
+    def work(i):
+        with database.get_connection() as conn:
+            conn.execute(
+                "INSERT INTO users (username, password_hash, name) VALUES (?, 'x', 'n')",
+                (f"user{i}",)
+            )
+            conn.commit()
+    
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(200)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert database._rw_created <= database.RW_POOL_SIZE
+    with database.get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 200
+
+
+def test_pool_is_bounded_under_concurrency(database):
+    # Each thread holds its connection until RW_POOL_SIZE threads hold one,
+    # so the pool must hand out its maximum and make the rest wait
+    barrier = threading.Barrier(database.RW_POOL_SIZE, timeout=10)
+    held = set()
+    lock = threading.Lock()
+    
+    def work():
+        with database.get_connection() as conn:
+            with lock:
+                held.add(id(conn))
+            barrier.wait()
+    
+    threads = [threading.Thread(target=work) for _ in range(database.RW_POOL_SIZE * 3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert not barrier.broken
+    assert len(held) == database.RW_POOL_SIZE
+    assert database._rw_created == database.RW_POOL_SIZE
+
+
+def test_uncommitted_work_is_rolled_back(database):
+    with database.get_connection() as conn:
+        conn.execute("INSERT INTO users (username, password_hash, name) VALUES ('a', 'x', 'n')")
+    
+    with database.get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0
+
+
+def test_close_closes_connections_returned_later(database):
+    with database.get_connection() as conn:
+        database.close()
+    
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    
+    # The database stays usable with fresh connections
+    with database.get_connection() as fresh:
+        assert fresh is not conn
+        assert fresh.execute("SELECT 1").fetchone()[0] == 1
+
+
+def test_read_connections_are_pooled(database):
+    with database.get_read_connection() as first:
+        pass
+    with database.get_read_connection() as second:
+        assert second is first
+    
+    with pytest.raises(sqlite3.OperationalError):
+        with database.get_read_connection() as conn:
+            conn.execute("INSERT INTO users (username, password_hash, name) VALUES ('a', 'x', 'n')")
@@ -0,0 +1,138 @@
+"""
+Tests for database creation and the in-place upgrade of older databases
+"""
+
+import sqlite3
+
+import pytest
+
+from src.data import init_db, tuning
+from src.data.init_db import get_schema_path, init_database_silent, upgrade_database
+
+
+@pytest.fixture
+def changed_paths(monkeypatch):
+    """Database paths reported through topics_changed"""
+    paths = []
+    monkeypatch.setattr(tuning, '_topics_listeners', [paths.append])
+    return paths
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    """
+    A database from before schedule_items, last_interval_days and
+    compressed_content, holding data in the old formats
+    """
+    db_path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(get_schema_path().read_text())
+    conn.executescript("""
+        DROP TABLE schedule_items;
+        DROP TABLE llm_cache;
+        DROP TABLE student_profiles;
+        
+        CREATE TABLE llm_cache (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cache_key TEXT UNIQUE NOT NULL,
+            model_used TEXT NOT NULL,
+            prompt_template TEXT,
+            response_content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            access_count INTEGER DEFAULT 1,
+            content_type TEXT
+        );
+        CREATE TABLE student_profiles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            topic_id INTEGER NOT NULL,
+            mastery_score REAL DEFAULT 0.0,
+            last_attempt_date DATE,
+            total_attempts INTEGER DEFAULT 0,
+            correct_attempts INTEGER DEFAULT 0,
+            accuracy REAL DEFAULT 0.0,
+            avg_time_seconds REAL,
+            revision_count INTEGER DEFAULT 0,
+            next_review_date DATE,
+            weak_concepts TEXT,
+            strength_level TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, topic_id)
+        );
+        
+        INSERT INTO users (id, username, password_hash, name) VALUES (1, 'student', 'x', 'Student');
+        INSERT INTO topics (id, subject, chapter_name, topic_name) VALUES (1, 'Physics', 'Optics', 'Lenses');
+        INSERT INTO student_profiles (user_id, topic_id, revision_count) VALUES (1, 1, 2);
+        INSERT INTO schedules (user_id, date, planned_items) VALUES (1, '2026-01-01',
+            '[{"topic_id": 1, "topic_name": "Lenses", "subject": "Physics",
+               "activity_type": "learn", "duration_minutes": 60}]');
+    """)
+    conn.executemany(
+        "INSERT INTO llm_cache (cache_key, model_used, response_content) VALUES (?, 'model', ?)",
+        [('0123abcd', 'unversioned key'),
+         ('v2:compressed', b'compressed bytes'),
+         ('v2:plain', 'plain text')]
+    )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def test_creates_a_new_database(tmp_path, changed_paths):
+    db_path = tmp_path / "new.db"
+    assert init_database_silent(db_path)
+    
+    with sqlite3.connect(db_path) as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'users', 'topics', 'llm_cache', 'schedule_items', 'student_profiles'} <= tables
+    assert changed_paths == [db_path]
+
+
+def test_repeat_calls_skip_the_database(tmp_path, monkeypatch):
+    db_path = tmp_path / "new.db"
+    assert init_database_silent(db_path)
+    
+    def fail(*args, **kwargs):
+        raise AssertionError("database opened again")
+    monkeypatch.setattr(init_db.sqlite3, 'connect', fail)
+    
+    assert init_database_silent(db_path)
+
+
+def test_upgrades_a_legacy_database(legacy_db, changed_paths):
+    assert init_database_silent(legacy_db)
+    assert changed_paths == [legacy_db]
+    
+    conn = sqlite3.connect(legacy_db)
+    conn.row_factory = sqlite3.Row
+    
+    # Compressed responses move out of response_content; unversioned keys go
+    cache = {
+        row['cache_key']: (row['response_content'], row['compressed_content'])
+        for row in conn.execute("SELECT * FROM llm_cache")
+    }
+    assert cache == {
+        'v2:compressed': ('', b'compressed bytes'),
+        'v2:plain': ('plain text', None),
+    }
+    
+    profile = conn.execute("SELECT revision_count, last_interval_days FROM student_profiles").fetchone()
+    assert tuple(profile) == (2, 0)
+    
+    items = conn.execute(
+        "SELECT position, topic_id, topic_name, activity_type, duration_minutes FROM schedule_items"
+    ).fetchall()
+    assert [tuple(item) for item in items] == [(0, 1, 'Lenses', 'learn', 60)]
+    conn.close()
+
+
+def test_upgrade_is_idempotent(legacy_db, changed_paths):
+    schema_sql = get_schema_path().read_text()
+    
+    assert upgrade_database(legacy_db, schema_sql)
+    assert not upgrade_database(legacy_db, schema_sql)
+    assert changed_paths == [legacy_db]
+    
+    with sqlite3.connect(legacy_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM schedule_items").fetchone()[0] == 1
@@ -0,0 +1,124 @@
+"""
+Tests for the LLM response cache: the in-process LRU, the write-behind
+queue, compressed storage and the exact lookup counters
+"""
+
+import pytest
+
+from src.llm import cache as cache_module
+from src.llm.cache import CacheManager, _ResponseLRU, CACHE_KEY_VERSION
+
+
+@pytest.fixture
+def cache(database, monkeypatch):
+    """CacheManager writing to the test database, with empty in-process state"""
+    CacheManager.flush()
+    monkeypatch.setattr(cache_module, 'db', database)
+    monkeypatch.setattr(CacheManager, '_enabled', True)
+    monkeypatch.setattr(CacheManager, '_mem', _ResponseLRU(maxsize=512))
+    monkeypatch.setattr(CacheManager, '_lookups', {'hits': 0, 'misses': 0})
+    yield CacheManager
+    CacheManager.flush()
+
+
+class TestResponseLRU:
+    def test_evicts_least_recently_used(self):
+        lru = _ResponseLRU(maxsize=2)
+        lru.put('a', 'A', 60)
+        lru.put('b', 'B', 60)
+        assert lru.get('a') == 'A'  # 'b' is now the least recently used
+        
+        lru.put('c', 'C', 60)
+        assert lru.get('b') is None
+        assert lru.get('a') == 'A'
+        assert lru.get('c') == 'C'
+    
+    def test_entries_expire(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(cache_module.time, 'monotonic', lambda: now[0])
+        
+        lru = _ResponseLRU()
+        lru.put('a', 'A', 10)
+        assert lru.get('a') == 'A'
+        
+        now[0] += 10
+        assert lru.get('a') is None
+    
+    def test_non_positive_ttl_is_not_stored(self):
+        lru = _ResponseLRU()
+        lru.put('a', 'A', 0)
+        assert lru.get('a') is None
+
+
+def test_cache_keys_are_versioned():
+    key = CacheManager.generate_cache_key("Explain {topic}", {'topic': 'optics'}, 'model')
+    rendered_key = CacheManager.generate_cache_key_from_bytes(b"Explain optics", 'model')
+    
+    assert key.startswith(f"{CACHE_KEY_VERSION}:")
+    assert rendered_key.startswith(f"{CACHE_KEY_VERSION}:")
+    assert key != rendered_key
+
+
+def test_queued_response_is_served_before_it_is_written(cache, database):
+    cache.queue_response('key', 'response', 'model')
+    assert cache.get_cached_response('key') == 'response'
+    
+    cache.flush()
+    entry = database.get_from_cache('key')
+    assert entry['response_content'] == 'response'
+    assert entry['model_used'] == 'model'
+
+
+def test_flush_writes_every_queued_response(cache, database):
+    for i in range(100):
+        cache.queue_response(f'key{i}', f'response{i}', 'model')
+    cache.flush()
+    
+    entries = database.get_many_from_cache([f'key{i}' for i in range(100)])
+    assert len(entries) == 100
+
+
+def test_store_response_returns_entry_id(cache, database):
+    entry_id = cache.store_response('key', 'response', 'model')
+    
+    assert entry_id > 0
+    assert database.get_from_cache('key')['id'] == entry_id
+    # Storing the same key again keeps the original entry
+    assert cache.store_response('key', 'other', 'model') == entry_id
+
+
+def test_large_responses_are_stored_compressed(cache, database):
+    response = "Newton's laws of motion. " * 200
+    cache.store_response('key', response, 'model')
+    
+    entry = database.get_from_cache('key')
+    assert entry['response_content'] == ''
+    assert isinstance(entry['compressed_content'], bytes)
+    assert len(entry['compressed_content']) < len(response)
+    
+    cache._mem.clear()
+    assert cache.get_cached_response('key') == response
+
+
+def test_lookup_counters_are_exact(cache):
+    cache.queue_response('key', 'response', 'model')
+    
+    assert cache.get_cached_response('key') == 'response'
+    assert cache.get_cached_response('key') == 'response'
+    assert cache.get_cached_response('missing') is None
+    cache.get_many_cached_responses(['key', 'missing', 'other'])
+    
+    stats = cache.get_cache_stats()
+    assert stats['cache_hits'] == 3
+    assert stats['cache_misses'] == 3
+
+
+def test_uncounted_lookups_leave_the_counters_alone(cache):
+    cache.queue_response('key', 'response', 'model')
+    
+    found = cache.get_many_cached_responses(['key', 'missing'], count_lookups=False)
+    
+    assert found == {'key': 'response'}
+    stats = cache.get_cache_stats()
+    assert stats['cache_hits'] == 0
+    assert stats['cache_misses'] == 0
@@ -0,0 +1,52 @@
+"""
+Tests for render_template against str.format
+"""
+
+import string
+
+import pytest
+
+from src.llm.prompts import PromptTemplates, render_template
+
+TEMPLATE_NAMES = [
+    name for name, value in vars(PromptTemplates).items()
+    if name.isupper() and isinstance(value, str)
+]
+
+
+@pytest.mark.parametrize("name", TEMPLATE_NAMES)
+def test_matches_format_for_every_prompt(name):
+    template = getattr(PromptTemplates, name)
+    params = {
+        field: f"<{field} {{value}} ✓>"
+        for _, field, _, _ in string.Formatter().parse(template)
+        if field
+    }
+    assert render_template(template, params) == template.format(**params)
+
+
+@pytest.mark.parametrize("template", [
+    "",
+    "no fields at all",
+    "{a}{b}",
+    "literal {{braces}} around {a}",
+    "{a} then {a} again",
+    "{a:>6} padded",           # Format spec: left to str.format
+    "{a!r} repr",              # Conversion: left to str.format
+])
+def test_matches_format(template):
+    params = {'a': 'x', 'b': 3}
+    assert render_template(template, params) == template.format(**params)
+
+
+def test_non_string_values_are_formatted():
+    assert render_template("{n} questions, {ratio}", {'n': 5, 'ratio': 0.5}) == "5 questions, 0.5"
+
+
+def test_missing_field_raises_key_error():
+    with pytest.raises(KeyError):
+        render_template("Explain {topic}", {})
+
+
+def test_extra_params_are_ignored():
+    assert render_template("Explain {topic}", {'topic': 'optics', 'unused': 1}) == "Explain optics"
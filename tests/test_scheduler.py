@@ -0,0 +1,273 @@
+"""
+Tests for StudyScheduler: schedule generation, storage, completion and stats
+"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from src.core.scheduler import StudyScheduler
+
+START = date(2026, 3, 2)
+
+
+@pytest.fixture
+def scheduler(database, user_id, topics):
+    with StudyScheduler(database, user_id) as scheduler:
+        yield scheduler
+
+
+def add_profiles(database, user_id, rows):
+    """rows: (topic_id, mastery_score, accuracy, next_review_date)"""
+    with database.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO student_profiles "
+            "(user_id, topic_id, mastery_score, accuracy, next_review_date) VALUES (?, ?, ?, ?, ?)",
+            [(user_id, *row) for row in rows]
+        )
+        conn.commit()
+
+
+# The per-day queries generate_schedule replaced, with t.id added as the
+# last sort key (the originals left ties in an unspecified order)
+ORIGINAL_QUERIES = {
+    'revise': """
+        SELECT sp.topic_id, t.exam_weight, sp.mastery_score
+        FROM student_profiles sp JOIN topics t ON sp.topic_id = t.id
+        WHERE sp.user_id = ? AND sp.next_review_date <= ? AND sp.mastery_score < 1.0
+            AND t.subject IN ({subjects}) AND sp.topic_id NOT IN ({exclude})
+        ORDER BY sp.next_review_date ASC, t.exam_weight DESC, t.id
+        LIMIT 5
+    """,
+    'practice': """
+        SELECT sp.topic_id, t.exam_weight, sp.mastery_score, sp.accuracy
+        FROM student_profiles sp JOIN topics t ON sp.topic_id = t.id
+        WHERE sp.user_id = ? AND sp.mastery_score < 0.6 AND sp.mastery_score > 0
+            AND t.subject IN ({subjects}) AND sp.topic_id NOT IN ({exclude})
+        ORDER BY sp.mastery_score ASC, t.exam_weight DESC, t.id
+        LIMIT 2
+    """,
+    'learn': """
+        SELECT t.id AS topic_id, t.exam_weight
+        FROM topics t
+        WHERE NOT EXISTS (SELECT 1 FROM student_profiles sp WHERE sp.user_id = ? AND sp.topic_id = t.id)
+            AND t.subject IN ({subjects}) AND t.id NOT IN ({exclude})
+        ORDER BY t.exam_weight DESC, t.difficulty_level ASC, t.id
+        LIMIT 3
+    """,
+}
+
+DURATIONS = {'revise': 30, 'practice': 45, 'learn': 60}
+
+
+def original_schedule(database, user_id, daily_minutes, num_days, subjects):
+    """(date, total_minutes, [(topic_id, activity_type)]) per day, the original way"""
+    days = []
+    scheduled = set()
+    with database.get_connection() as conn:
+        for offset in range(num_days):
+            day = START + timedelta(days=offset)
+            remaining = daily_minutes
+            items = []
+            for activity, query in ORIGINAL_QUERIES.items():
+                if activity != 'revise' and remaining < DURATIONS[activity]:
+                    continue
+                params = [user_id] + ([day.isoformat()] if activity == 'revise' else [])
+                rows = conn.execute(
+                    query.format(subjects=','.join('?' * len(subjects)),
+                                 exclude=','.join('?' * len(scheduled)) or '-1'),
+                    params + list(subjects) + list(scheduled)
+                ).fetchall()
+                for row in rows:
+                    if remaining >= DURATIONS[activity]:
+                        items.append((row['topic_id'], activity))
+                        remaining -= DURATIONS[activity]
+            scheduled.update(topic_id for topic_id, _ in items)
+            days.append((day, daily_minutes - remaining, items))
+    return days
+
+
+class TestGenerateSchedule:
+    def test_new_student_learns_the_heaviest_topics_first(self, scheduler, topics):
+        schedules = scheduler.generate_schedule(START, num_days=2)
+        
+        learn_order = sorted(topics, key=lambda t: (-t['exam_weight'], t['difficulty_level'], t['id']))
+        assert [[i.topic_id for i in s.items] for s in schedules] == [
+            [t['id'] for t in learn_order[:3]],
+            [t['id'] for t in learn_order[3:6]],
+        ]
+        assert all(i.activity_type == 'learn' for s in schedules for i in s.items)
+        assert [s.total_minutes for s in schedules] == [180, 180]
+    
+    def test_no_days(self, scheduler):
+        assert scheduler.generate_schedule(START, num_days=0) == []
+    
+    def test_keeps_saved_completion_and_notes(self, database, user_id, scheduler):
+        with database.get_connection() as conn:
+            conn.execute(
+                "INSERT INTO schedules (user_id, date, completion_percentage, notes) "
+                "VALUES (?, ?, 50, 'halfway')", (user_id, START.isoformat())
+            )
+            conn.commit()
+        
+        first, second = scheduler.generate_schedule(START, num_days=2)
+        assert (first.completion_percentage, first.notes) == (50, 'halfway')
+        assert (second.completion_percentage, second.notes) == (0.0, '')
+    
+    @pytest.mark.parametrize("subjects", [None, ['Physics'], ['Chemistry', 'Mathematics']])
+    @pytest.mark.parametrize("seed", range(4))
+    def test_matches_original_per_day_queries(self, database, topics, seed, subjects):
+        rng = random.Random(seed)
+        daily_hours = rng.choice([1, 2, 4, 6])
+        user_id = database.create_user(f"user{seed}", "x", "User", daily_hours=daily_hours)
+        add_profiles(database, user_id, [
+            (
+                t['id'],
+                rng.choice([0.0, 0.2, 0.5, 0.7, 1.0]),
+                rng.random(),
+                (START + timedelta(days=rng.randrange(-3, 10))).isoformat()
+            )
+            for t in rng.sample(topics, rng.randrange(len(topics)))
+        ])
+        
+        with StudyScheduler(database, user_id) as scheduler:
+            schedules = scheduler.generate_schedule(START, num_days=7, focus_subjects=subjects)
+        
+        expected = original_schedule(
+            database, user_id, daily_hours * 60, 7, subjects or StudyScheduler.ALL_SUBJECTS
+        )
+        assert [
+            (s.date, s.total_minutes, [(i.topic_id, i.activity_type) for i in s.items])
+            for s in schedules
+        ] == expected
+
+
+def saved_items(database, user_id, day):
+    with database.get_connection() as conn:
+        return [tuple(row) for row in conn.execute(
+            """
+            SELECT si.position, si.topic_id, si.activity_type, si.duration_minutes, si.completed
+            FROM schedule_items si JOIN schedules s ON s.id = si.schedule_id
+            WHERE s.user_id = ? AND s.date = ?
+            ORDER BY si.position
+            """, (user_id, day.isoformat())
+        )]
+
+
+class TestSaveSchedule:
+    def test_items_are_stored_in_order(self, database, user_id, scheduler):
+        day = scheduler.generate_schedule(START, num_days=1)[0]
+        assert scheduler.save_schedule(day)
+        
+        assert saved_items(database, user_id, START) == [
+            (position, item.topic_id, item.activity_type, item.duration_minutes, 0)
+            for position, item in enumerate(day.items)
+        ]
+        with database.get_connection() as conn:
+            row = conn.execute(
+                "SELECT planned_items FROM schedules WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        assert row['planned_items'] is None
+    
+    def test_saving_again_replaces_items_and_keeps_completed_ones(self, database, user_id, scheduler):
+        day = scheduler.generate_schedule(START, num_days=1)[0]
+        scheduler.save_schedule(day)
+        done = day.items[1].topic_id
+        with database.get_connection() as conn:
+            conn.execute("UPDATE schedule_items SET completed = 1 WHERE topic_id = ?", (done,))
+            conn.commit()
+        
+        day.items = day.items[1:]
+        day.notes = 'shorter day'
+        scheduler.save_schedule(day)
+        
+        assert [(topic_id, completed) for _, topic_id, _, _, completed
+                in saved_items(database, user_id, START)] == \
+            [(item.topic_id, int(item.topic_id == done)) for item in day.items]
+        with database.get_connection() as conn:
+            rows = conn.execute("SELECT notes FROM schedules WHERE user_id = ?", (user_id,)).fetchall()
+        assert [row['notes'] for row in rows] == ['shorter day']
+
+
+def saved_day(database, user_id, day):
+    with database.get_connection() as conn:
+        row = conn.execute(
+            "SELECT completed, completion_percentage FROM schedules WHERE user_id = ? AND date = ?",
+            (user_id, day.isoformat())
+        ).fetchone()
+    return row['completed'], row['completion_percentage']
+
+
+class TestMarkItemCompleted:
+    def test_completion_follows_the_items(self, database, user_id, scheduler):
+        day = scheduler.generate_schedule(START, num_days=1)[0]
+        scheduler.save_schedule(day)
+        first, second, third = (item.topic_id for item in day.items)
+        
+        assert scheduler.mark_item_completed(START, first)
+        assert saved_day(database, user_id, START) == (0, pytest.approx(100 / 3))
+        
+        # Marking an item twice changes nothing
+        assert scheduler.mark_item_completed(START, first)
+        assert saved_day(database, user_id, START) == (0, pytest.approx(100 / 3))
+        
+        scheduler.mark_item_completed(START, second)
+        scheduler.mark_item_completed(START, third)
+        assert saved_day(database, user_id, START) == (1, 100)
+    
+    def test_unsaved_day(self, scheduler, topics):
+        assert not scheduler.mark_item_completed(START, topics[0]['id'])
+    
+    def test_quality_schedules_the_next_review(self, database, user_id, scheduler, topics):
+        topic_id = topics[0]['id']
+        add_profiles(database, user_id, [(topic_id, 0.5, 0.5, START.isoformat())])
+        scheduler.save_schedule(scheduler.generate_schedule(START, num_days=1)[0])
+        
+        assert scheduler.mark_item_completed(START, topic_id, quality=5)
+        
+        with database.get_connection() as conn:
+            row = conn.execute(
+                "SELECT revision_count, last_interval_days, next_review_date FROM student_profiles "
+                "WHERE user_id = ? AND topic_id = ?", (user_id, topic_id)
+            ).fetchone()
+        assert (row['revision_count'], row['last_interval_days']) == (1, 1)
+        assert row['next_review_date'] == (date.today() + timedelta(days=1)).isoformat()
+
+
+class TestScheduleStats:
+    def test_no_schedules(self, scheduler):
+        assert scheduler.get_schedule_stats(START, START + timedelta(days=6)) == {
+            'total_days': 0,
+            'completed_days': 0,
+            'avg_completion': 0.0,
+            'total_topics_scheduled': 0,
+            'total_topics_completed': 0
+        }
+    
+    def test_aggregates_days_and_items(self, scheduler):
+        first, second, third = scheduler.generate_schedule(START, num_days=3)
+        third.items = []
+        for day in (first, second, third):
+            scheduler.save_schedule(day)
+        for item in first.items:
+            scheduler.mark_item_completed(first.date, item.topic_id)
+        scheduler.mark_item_completed(second.date, second.items[0].topic_id)
+        
+        assert scheduler.get_schedule_stats(START, START + timedelta(days=6)) == {
+            'total_days': 3,
+            'completed_days': 1,
+            'avg_completion': round((100 + 100 / 3 + 0) / 3, 1),
+            'total_topics_scheduled': 6,
+            'total_topics_completed': 4
+        }
+        # Only days inside the range count
+        assert scheduler.get_schedule_stats(START, START)['total_days'] == 1
+    
+    def test_days_without_items_still_count(self, scheduler):
+        day = scheduler.generate_schedule(START, num_days=1)[0]
+        day.items = []
+        scheduler.save_schedule(day)
+        
+        stats = scheduler.get_schedule_stats(START, START)
+        assert (stats['total_days'], stats['total_topics_scheduled']) == (1, 0)
@@ -0,0 +1,177 @@
+"""
+Tests for SimpleQuizGenerator
+"""
+
+import json
+
+import pytest
+
+from src.core.simple_quiz import QuizResult, SimpleQuizGenerator
+
+QUESTION = {
+    'question': 'What is the SI unit of force?',
+    'option_a': 'Joule',
+    'option_b': 'Newton',
+    'option_c': 'Watt',
+    'option_d': 'Pascal',
+    'correct_answer': 'B',
+    'explanation': 'One newton accelerates one kilogram at one metre per second squared.',
+}
+
+
+@pytest.fixture
+def topic_id(database):
+    with database.get_connection() as conn:
+        cursor = conn.execute(
+            "INSERT INTO topics (subject, chapter_name, topic_name, difficulty_level) "
+            "VALUES ('Physics', 'Laws of Motion', 'Newton''s Laws', 'Medium')"
+        )
+        conn.commit()
+        return cursor.lastrowid
+
+
+class FakeStream:
+    """Stands in for gemini_client, recording how many chunks were read"""
+    
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.read = 0
+    
+    def generate_json_stream(self, **kwargs):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+
+def test_generate_quiz_stops_reading_at_a_complete_document(database, topic_id):
+    text = json.dumps([QUESTION])
+    llm = FakeStream([text[:40], text[40:-1], text[-1:], '\n', 'trailing chunk'])
+    generator = SimpleQuizGenerator(database)
+    generator.llm = llm
+    
+    questions = generator.generate_quiz(1, [topic_id], num_questions=1)
+    
+    assert [q.correct_answer for q in questions] == ['B']
+    assert questions[0].topic_id == topic_id
+    assert llm.read == 3
+
+
+def test_generate_quiz_parses_a_fenced_response_at_the_end(database, topic_id):
+    # No chunk ends in a bracket, so the full text is parsed once the stream ends
+    llm = FakeStream(['```json\n' + json.dumps([QUESTION]) + '\n```'])
+    generator = SimpleQuizGenerator(database)
+    generator.llm = llm
+    
+    questions = generator.generate_quiz(1, [topic_id], num_questions=1)
+    
+    assert [q.question_text for q in questions] == [QUESTION['question']]
+
+
+def quiz_result(answers):
+    """QuizResult for a list of is_correct flags"""
+    correct = sum(answers)
+    return QuizResult(
+        total_questions=len(answers),
+        correct_answers=correct,
+        score_percentage=100 * correct / len(answers) if answers else 0,
+        question_results=[
+            {'question_id': i, 'user_answer': 'A', 'correct_answer': 'A' if ok else 'B',
+             'is_correct': ok}
+            for i, ok in enumerate(answers, 1)
+        ]
+    )
+
+
+def test_save_quiz_attempt_records_one_attempt_per_question(database, user_id, topics):
+    generator = SimpleQuizGenerator(database)
+    generator.save_quiz_attempt(
+        user_id, [topics[0]['id'], topics[1]['id']], quiz_result([True, False, True, True]), 2
+    )
+    
+    with database.get_connection() as conn:
+        rows = conn.execute(
+            "SELECT topic_id, question_id, correctness, score, time_taken_seconds, timestamp "
+            "FROM attempts WHERE user_id = ? ORDER BY question_id", (user_id,)
+        ).fetchall()
+    
+    assert [tuple(row)[:5] for row in rows] == [
+        (topics[0]['id'], 1, 1, 1.0, 30.0),
+        (topics[0]['id'], 2, 0, 0.0, 30.0),
+        (topics[0]['id'], 3, 1, 1.0, 30.0),
+        (topics[0]['id'], 4, 1, 1.0, 30.0),
+    ]
+    assert len({row['timestamp'] for row in rows}) == 1
+
+
+
+def profile(database, user_id, topic_id):
+    return dict(database.get_student_profile(user_id, topic_id))
+
+
+class TestProfileUpsert:
+    def test_first_attempt_creates_the_profile(self, database, user_id, topics):
+        topic_id = topics[0]['id']
+        SimpleQuizGenerator(database).save_quiz_attempt(
+            user_id, [topic_id], quiz_result([True, False, False, False]), 4
+        )
+        
+        row = profile(database, user_id, topic_id)
+        assert (row['total_attempts'], row['correct_attempts']) == (4, 1)
+        assert row['accuracy'] == pytest.approx(0.25)
+        assert row['mastery_score'] == pytest.approx(0.3)
+        assert row['next_review_date'] == row['last_attempt_date']
+    
+    def test_later_attempts_accumulate(self, database, user_id, topics):
+        topic_id = topics[0]['id']
+        generator = SimpleQuizGenerator(database)
+        generator.save_quiz_attempt(user_id, [topic_id], quiz_result([True, False]), 2)
+        with database.get_connection() as conn:
+            # Scheduler-owned columns must survive the update
+            conn.execute(
+                "UPDATE student_profiles SET next_review_date = '2000-01-01', revision_count = 3 "
+                "WHERE user_id = ? AND topic_id = ?", (user_id, topic_id)
+            )
+            conn.commit()
+        
+        generator.save_quiz_attempt(user_id, [topic_id], quiz_result([True, True, True, False]), 2)
+        
+        row = profile(database, user_id, topic_id)
+        assert (row['total_attempts'], row['correct_attempts']) == (6, 4)
+        assert row['accuracy'] == pytest.approx(4 / 6)
+        assert row['mastery_score'] == pytest.approx(0.8)
+        assert (row['next_review_date'], row['revision_count']) == ('2000-01-01', 3)
+    
+    def test_mastery_is_capped(self, database, user_id, topics):
+        topic_id = topics[0]['id']
+        SimpleQuizGenerator(database).save_quiz_attempt(
+            user_id, [topic_id], quiz_result([True] * 5), 5
+        )
+        assert profile(database, user_id, topic_id)['mastery_score'] == 1.0
+    
+    def test_profile_without_totals(self, database, user_id, topics):
+        # Profiles created elsewhere may have NULL totals, counted as 0
+        topic_id = topics[0]['id']
+        with database.get_connection() as conn:
+            conn.execute(
+                "INSERT INTO student_profiles (user_id, topic_id, total_attempts, correct_attempts) "
+                "VALUES (?, ?, NULL, NULL)", (user_id, topic_id)
+            )
+            conn.commit()
+        
+        SimpleQuizGenerator(database).save_quiz_attempt(
+            user_id, [topic_id], quiz_result([True, False]), 1
+        )
+        
+        row = profile(database, user_id, topic_id)
+        assert (row['total_attempts'], row['correct_attempts']) == (2, 1)
+        assert row['mastery_score'] == pytest.approx(0.6)
+    
+    def test_each_topic_is_updated_once(self, database, user_id, topics):
+        topic_ids = [topics[0]['id'], topics[1]['id'], topics[0]['id']]
+        SimpleQuizGenerator(database).save_quiz_attempt(
+            user_id, topic_ids, quiz_result([True, False, True]), 3
+        )
+        
+        for topic_id in topic_ids[:2]:
+            row = profile(database, user_id, topic_id)
+            assert (row['total_attempts'], row['correct_attempts']) == (3, 2)
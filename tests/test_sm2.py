@@ -0,0 +1,64 @@
+"""
+Tests for the batch SM-2 kernels against StudyScheduler.sm2_interval
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from src.core import sm2_numba
+from src.core.scheduler import StudyScheduler
+
+# Every combination of review history, recall quality and stored interval
+CASES = list(itertools.product(range(6), range(6), (0, 1, 6, 15, 40)))
+
+
+def _arrays():
+    revision_count, quality, last_interval = (np.array(column) for column in zip(*CASES))
+    return revision_count, quality.astype(np.float64), last_interval.astype(np.float64)
+
+
+def _expected():
+    intervals = [StudyScheduler.sm2_interval(rc, q, last) for rc, q, last in CASES]
+    revisions = [0 if q < 3 else rc + 1 for rc, q, _ in CASES]
+    return intervals, revisions
+
+
+def _check(kernel, *args):
+    interval_days, new_revision_count = kernel(
+        *_arrays(), StudyScheduler.DEFAULT_EASE_FACTOR, StudyScheduler.MIN_EASE_FACTOR, *args
+    )
+    intervals, revisions = _expected()
+    assert interval_days.tolist() == intervals
+    assert new_revision_count.tolist() == revisions
+
+
+def test_numpy_kernel_matches_scalar():
+    _check(sm2_numba._sm2_batch_numpy)
+
+
+@pytest.mark.skipif(not sm2_numba.NUMBA_AVAILABLE, reason="numba is not installed")
+def test_numba_kernel_matches_scalar():
+    _check(sm2_numba._sm2_batch_numba, sm2_numba.INITIAL_INTERVALS)
+
+
+def test_sm2_batch_matches_scalar():
+    _check(sm2_numba.sm2_batch)
+
+
+def test_legacy_row_estimates_the_previous_interval():
+    # A profile at revision 2 with no stored interval was last reviewed
+    # after 6 days, so it grows like one that stored 6
+    assert StudyScheduler.sm2_interval(2, 5, 0) == StudyScheduler.sm2_interval(2, 5, 6) == 15
+    
+    interval_days, _ = sm2_numba.sm2_batch([2, 2], [5, 5], [0, 6], 2.5, 1.3)
+    assert interval_days.tolist() == [15, 15]
+
+
+def test_sm2_batch_accepts_lists():
+    interval_days, new_revision_count = sm2_numba.sm2_batch(
+        [0, 1, 2], [5, 5, 2], [0, 0, 6], 2.5, 1.3
+    )
+    assert interval_days.tolist() == [1, 6, 1]
+    assert new_revision_count.tolist() == [1, 2, 0]